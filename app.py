@@ -1,15 +1,38 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, make_response
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, make_response, Response, stream_with_context, g, has_request_context
+from flask import template_rendered, before_render_template
 from flask_sqlalchemy import SQLAlchemy
+import click
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 import os
 import sys
+import random
 import time
 import io
 import csv
+import zlib
+import json
+import base64
+import hashlib
+import hmac
+import bisect
+import copy
+import pickle
+import threading
+from collections import OrderedDict, Counter, deque
 from functools import wraps
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from sqlalchemy.exc import OperationalError, ProgrammingError
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func, case, text, tuple_, literal, literal_column, select, insert, bindparam, Integer, Float
+from sqlalchemy import inspect as sqlalchemy_inspect
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, selectinload, Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 app = Flask(__name__)
 
@@ -32,6 +55,135 @@ def get_database_url():
 app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Filas por bloque en la exportación CSV (tamaño del lote del cursor y de cada envío)
+EXPORT_BLOQUE_FILAS = int(os.environ.get('EXPORT_BLOQUE_FILAS', 1000))
+
+# Inicio de sesión: hilos que verifican contraseñas (el hash consume CPU), logins
+# en espera antes de responder 503 y segundos máximos de espera de la verificación
+LOGIN_HASH_HILOS = int(os.environ.get('LOGIN_HASH_HILOS', 2))
+LOGIN_COLA_MAX = int(os.environ.get('LOGIN_COLA_MAX', 2))
+LOGIN_TIMEOUT = float(os.environ.get('LOGIN_TIMEOUT', 10))
+# Intentos fallidos permitidos por usuario y por IP dentro de la ventana (segundos)
+LOGIN_FALLOS_USUARIO = int(os.environ.get('LOGIN_FALLOS_USUARIO', 5))
+LOGIN_FALLOS_IP = int(os.environ.get('LOGIN_FALLOS_IP', 20))
+LOGIN_VENTANA = int(os.environ.get('LOGIN_VENTANA', 900))
+# Detrás de un proxy de confianza (router de Heroku) la IP real es la última de X-Forwarded-For
+LOGIN_IP_DESDE_PROXY = os.environ.get('LOGIN_IP_DESDE_PROXY', 'False').lower() == 'true'
+# Método de hash de contraseñas (p. ej. 'pbkdf2:sha256:600000' o 'scrypt'; por defecto el
+# de Werkzeug). Al cambiarlo, cada contraseña se re-hashea en su siguiente login.
+PASSWORD_HASH_METODO = os.environ.get('PASSWORD_HASH_METODO')
+
+# Segundos que cada worker confía en la época de autenticación y el rol cacheados
+# de un usuario antes de volver a consultarlos (retraso máximo de una revocación)
+AUTORIZACION_TTL = int(os.environ.get('AUTORIZACION_TTL', 30))
+
+# Segundos que se reutiliza un conteo total del filtro de actividades (modo 'estimado')
+CONTEO_CACHE_TTL = int(os.environ.get('CONTEO_CACHE_TTL', 60))
+
+# Caché de vistas: TTL, tamaño del LRU en memoria y Redis opcional para compartirla entre workers
+CACHE_VISTAS_TTL = int(os.environ.get('CACHE_VISTAS_TTL', 30))
+CACHE_VISTAS_MAX = int(os.environ.get('CACHE_VISTAS_MAX', 256))
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+# Máximo de combinaciones interno x externo aceptadas en un guardado por lote
+ESTRATEGIAS_LOTE_MAX = int(os.environ.get('ESTRATEGIAS_LOTE_MAX', 2500))
+
+# /metrics (Prometheus): abierto a estas IPs (el propio host por defecto), a un
+# token Bearer y a los administradores con sesión iniciada
+METRICAS_IPS = {ip.strip() for ip in os.environ.get('METRICAS_IPS', '127.0.0.1,::1').split(',') if ip.strip()}
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+# Consultas lentas: umbral en ms (0 desactiva), capacidad del buffer circular y
+# EXPLAIN ANALYZE en PostgreSQL (vuelve a ejecutar la consulta: usar con cuidado)
+CONSULTAS_LENTAS_MS = float(os.environ.get('CONSULTAS_LENTAS_MS', 250))
+CONSULTAS_LENTAS_MAX = int(os.environ.get('CONSULTAS_LENTAS_MAX', 100))
+CONSULTAS_LENTAS_ANALYZE = os.environ.get('CONSULTAS_LENTAS_ANALYZE', 'False').lower() == 'true'
+
+# ==================== POOL DE CONEXIONES ====================
+
+# Cada worker de gunicorn tiene su propio pool. Con DB_MAX_CONNECTIONS el pool
+# (size + overflow) de cada worker se limita a DB_MAX_CONNECTIONS / WEB_CONCURRENCY
+# para no superar el límite de conexiones de PostgreSQL.
+DB_POOL_SIZE = os.environ.get('DB_POOL_SIZE')
+DB_MAX_OVERFLOW = os.environ.get('DB_MAX_OVERFLOW')
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'True').lower() == 'true'
+DB_MAX_CONNECTIONS = os.environ.get('DB_MAX_CONNECTIONS')
+# PgBouncer en modo transacción: sin sentencias preparadas del lado del servidor
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'False').lower() == 'true'
+
+metricas_pool = {
+    'checkouts': 0,
+    'espera_total': 0.0,
+    'espera_max': 0.0,
+    'timeouts': 0
+}
+_metricas_pool_lock = threading.Lock()
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout (incluye abrir conexiones nuevas)"""
+    
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with _metricas_pool_lock:
+                metricas_pool['timeouts'] += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with _metricas_pool_lock:
+                metricas_pool['checkouts'] += 1
+                metricas_pool['espera_total'] += espera
+                metricas_pool['espera_max'] = max(metricas_pool['espera_max'], espera)
+
+def tamano_pool():
+    """(pool_size, max_overflow) de este worker según la configuración"""
+    workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    hilos = max(1, int(os.environ.get('GUNICORN_THREADS', 1)))
+    
+    # Por defecto una conexión fija por hilo del worker (mínimo 5, como SQLAlchemy)
+    pool_size = int(DB_POOL_SIZE) if DB_POOL_SIZE else max(5, hilos)
+    max_overflow = int(DB_MAX_OVERFLOW) if DB_MAX_OVERFLOW else 10
+    
+    if DB_MAX_CONNECTIONS:
+        presupuesto = max(1, int(DB_MAX_CONNECTIONS) // workers)
+        pool_size = min(pool_size, presupuesto)
+        max_overflow = max(0, min(max_overflow, presupuesto - pool_size))
+    
+    if pool_size + max_overflow < hilos:
+        print(f"⚠️  Pool ({pool_size}+{max_overflow}) menor que los hilos por worker ({hilos}): habrá esperas de conexión")
+    
+    return pool_size, max_overflow
+
+def opciones_motor(db_url):
+    """Opciones del engine de SQLAlchemy (SQLite conserva las de Flask-SQLAlchemy)"""
+    if db_url.startswith('sqlite'):
+        return {}
+    
+    pool_size, max_overflow = tamano_pool()
+    opciones = {
+        'poolclass': PoolMedido,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING
+    }
+    
+    if DB_PGBOUNCER:
+        # psycopg2 no usa sentencias preparadas; psycopg 3 sí, hay que desactivarlas
+        if db_url.startswith('postgresql+psycopg:') or db_url.startswith('postgresql+psycopg_async:'):
+            opciones['connect_args'] = {'prepare_threshold': None}
+    
+    print(f"🔌 Pool de conexiones: size={pool_size}, overflow={max_overflow}, "
+          f"recycle={DB_POOL_RECYCLE}s, pre_ping={DB_POOL_PRE_PING}, pgbouncer={DB_PGBOUNCER}")
+    return opciones
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_motor(app.config['SQLALCHEMY_DATABASE_URI'])
+
 db = SQLAlchemy(app)
 
 # ==================== MODELOS DE BASE DE DATOS ====================
@@ -43,10 +195,16 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     rol = db.Column(db.String(20), nullable=False, default='user')
+    # Se incrementa para invalidar las sesiones abiertas (ver usuario_autorizado)
+    auth_epoch = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = generar_hash(password)
+    
+    def revocar_sesiones(self):
+        """Invalida las sesiones abiertas (en cada worker, como mucho tras AUTORIZACION_TTL)"""
+        self.auth_epoch = (self.auth_epoch or 0) + 1
     
     def check_password(self, password):
         return check_password_hash(self.password, password)
@@ -65,8 +223,21 @@ class AspectoAmbiental(db.Model):
     
     # Relación
     creador = db.relationship('User', backref=db.backref('aspectos', lazy=True))
+    
+    # Índices para los filtros más usados: casi todas las páginas filtran por fuente
+    # (y a veces tipo/aspecto) y ordenan por fecha de creación descendente
+    __table_args__ = (
+        db.Index('ix_aspectos_fuente_created_at', 'fuente', 'created_at'),
+        db.Index('ix_aspectos_fuente_tipo', 'fuente', 'tipo'),
+        # Matriz FODA: bloque ascendente y fecha descendente (el sentido mixto debe estar en el índice)
+        db.Index('ix_aspectos_fuente_aspecto_created_desc', fuente, aspecto, created_at.desc()),
+        db.Index('ix_aspectos_created_at', 'created_at'),
+    )
 
 # Tabla: Estrategias FODA Cruzado (actualizada con campos de eje)
+# Una fila por estrategia; los elementos que cruza están en estrategia_elementos.
+# Las columnas elemento_* son heredadas (antes había una fila por pareja) y
+# guardan solo el primer interno y externo.
 class EstrategiaFodaCruzado(db.Model):
     __tablename__ = 'estrategias_foda_cruzado'
     
@@ -83,9 +254,45 @@ class EstrategiaFodaCruzado(db.Model):
     eje_texto = db.Column(db.String(200), nullable=True)  # Nuevo campo: texto del eje
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     creador_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    # Marca de migración: las filas que escribe este código ya tienen sus elementos
+    # en estrategia_elementos; las de versiones anteriores (una fila por pareja,
+    # sin esta columna) quedan en false hasta que normalizar_estrategias las procesa
+    elementos_normalizados = db.Column(db.Boolean, nullable=False, default=True, server_default=text('false'))
     
     # Relación
     creador = db.relationship('User', backref=db.backref('estrategias_foda', lazy=True))
+    
+    __table_args__ = (
+        # Conteos y páginas del grafo por eje (/api/red/grafo)
+        db.Index('ix_estrategias_eje_tipo_cruce', 'eje_id', 'tipo_cruce'),
+    )
+
+# Tabla: elementos FODA (aspectos internos y externos) que cruza cada estrategia
+# Como las columnas elemento_* de antes, el enlace guarda una copia del texto y no
+# tiene clave foránea al aspecto: borrar un aspecto en FODA externo/interno no
+# quita el elemento de las estrategias que lo cruzan.
+class EstrategiaElemento(db.Model):
+    __tablename__ = 'estrategia_elementos'
+    
+    estrategia_id = db.Column(db.Integer, db.ForeignKey('estrategias_foda_cruzado.id', ondelete='CASCADE'), primary_key=True)
+    rol = db.Column(db.String(10), primary_key=True)  # interno, externo
+    aspecto_id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # fortaleza, debilidad, oportunidad, amenaza
+    texto = db.Column(db.String(500), nullable=True)  # texto del aspecto al enlazarlo o al borrarlo
+    
+    # Relaciones (el ORM borra los enlaces también en SQLite, que no aplica ON DELETE)
+    estrategia = db.relationship('EstrategiaFodaCruzado', backref=db.backref(
+        'elementos', lazy=True, cascade='all, delete-orphan', order_by='EstrategiaElemento.aspecto_id'
+    ))
+    # Solo lectura: el aspecto puede no existir ya
+    aspecto = db.relationship(
+        'AspectoAmbiental', primaryjoin='foreign(EstrategiaElemento.aspecto_id) == AspectoAmbiental.id', viewonly=True
+    )
+    
+    __table_args__ = (
+        # Estrategias que cruzan un aspecto (borrado del aspecto)
+        db.Index('ix_estrategia_elementos_aspecto', 'aspecto_id'),
+    )
 
 # ==================== MODELOS PARA ACTIVIDADES Y TAREAS ====================
 
@@ -94,7 +301,7 @@ class ActividadEstrategia(db.Model):
     __tablename__ = 'actividades_estrategia'
     
     id = db.Column(db.Integer, primary_key=True)
-    estrategia_id = db.Column(db.Integer, db.ForeignKey('estrategias_foda_cruzado.id'), nullable=False)
+    estrategia_id = db.Column(db.Integer, db.ForeignKey('estrategias_foda_cruzado.id'), nullable=False, index=True)
     nombre = db.Column(db.String(200), nullable=False)
     descripcion = db.Column(db.Text, nullable=True)
     responsable = db.Column(db.String(100), nullable=True)
@@ -112,7 +319,7 @@ class TareaActividad(db.Model):
     __tablename__ = 'tareas_actividad'
     
     id = db.Column(db.Integer, primary_key=True)
-    actividad_id = db.Column(db.Integer, db.ForeignKey('actividades_estrategia.id'), nullable=False)
+    actividad_id = db.Column(db.Integer, db.ForeignKey('actividades_estrategia.id'), nullable=False, index=True)
     nombre = db.Column(db.String(200), nullable=False)
     descripcion = db.Column(db.Text, nullable=True)
     responsable = db.Column(db.String(100), nullable=True)
@@ -126,12 +333,726 @@ class TareaActividad(db.Model):
     actividad = db.relationship('ActividadEstrategia', backref=db.backref('tareas_actividad', lazy=True, cascade='all, delete-orphan'))
     creador = db.relationship('User', backref=db.backref('tareas_actividad_creadas', lazy=True))
 
+# Contadores por (tabla, fuente, polaridad, día): las estadísticas se leen de aquí
+# en vez de contar filas. Se mantienen en la misma transacción que cada alta o
+# baja (ver CONTADORES RESUMEN) y "flask reconciliar-contadores" los recalcula.
+class ContadorResumen(db.Model):
+    __tablename__ = 'contadores_resumen'
+    
+    tabla = db.Column(db.String(30), primary_key=True)  # aspectos, estrategias, actividades, tareas
+    fuente = db.Column(db.String(200), primary_key=True, default='')  # solo aspectos
+    polaridad = db.Column(db.String(20), primary_key=True, default='')  # Positivo/Negativo o con_eje/sin_eje
+    dia = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+# ==================== CONSULTAS Y SERIALIZACIÓN COMPARTIDAS ====================
+
+def con_creador(query, modelo):
+    """Carga el creador en la misma consulta (JOIN) para evitar un SELECT por fila
+    
+    Solo se traen id y username del usuario; el hash de contraseña no se carga.
+    """
+    return query.options(
+        joinedload(modelo.creador).load_only(User.id, User.username)
+    )
+
+def nombre_creador(registro, por_defecto=None):
+    return registro.creador.username if registro.creador else por_defecto
+
+def serializar_aspecto(a):
+    return {
+        'id': a.id,
+        'actividad': a.actividad,
+        'tipo': a.tipo,
+        'aspecto': a.aspecto,
+        'fuente': a.fuente,
+        'created_at': a.created_at.isoformat() if a.created_at else None,
+        'updated_at': a.updated_at.isoformat() if a.updated_at else None,
+        'creador': nombre_creador(a)
+    }
+
+def con_elementos(query):
+    """Carga los elementos de cada estrategia y su texto (aspecto.actividad) en
+    una consulta aparte por lotes de ids, en vez de un SELECT por estrategia"""
+    return query.options(
+        selectinload(EstrategiaFodaCruzado.elementos).joinedload(EstrategiaElemento.aspecto).load_only(
+            AspectoAmbiental.id, AspectoAmbiental.actividad
+        )
+    )
+
+def serializar_elementos(e, rol):
+    # Texto actual del aspecto; si se borró, la copia guardada en el enlace
+    elementos = [
+        {'id': el.aspecto_id, 'tipo': el.tipo, 'texto': el.aspecto.actividad if el.aspecto else el.texto}
+        for el in e.elementos if el.rol == rol
+    ]
+    if not elementos:
+        # Estrategia del formato anterior sin enlaces para este rol (p. ej. "Múltiples: ...")
+        elementos.append({
+            'id': getattr(e, f'elemento_{rol}_id'),
+            'tipo': getattr(e, f'elemento_{rol}_tipo'),
+            'texto': getattr(e, f'elemento_{rol}_texto')
+        })
+    return elementos
+
+def serializar_estrategia(e):
+    """Estrategia ya agrupada: una entrada con todos los elementos que cruza"""
+    return {
+        'id': e.id,
+        'tipo_cruce': e.tipo_cruce,
+        'elementos_internos': serializar_elementos(e, 'interno'),
+        'elementos_externos': serializar_elementos(e, 'externo'),
+        'estrategia': e.estrategia,
+        'eje_id': e.eje_id,
+        'eje_texto': e.eje_texto,
+        'fecha_creacion': e.fecha_creacion.isoformat() if e.fecha_creacion else None,
+        'creador': nombre_creador(e)
+    }
+
+def serializar_actividad(a):
+    return {
+        'id': a.id,
+        'estrategia_id': a.estrategia_id,
+        'nombre': a.nombre,
+        'descripcion': a.descripcion,
+        'responsable': a.responsable,
+        'fecha_inicio': a.fecha_inicio.isoformat() if a.fecha_inicio else None,
+        'fecha_fin': a.fecha_fin.isoformat() if a.fecha_fin else None,
+        'fecha_creacion': a.fecha_creacion.isoformat() if a.fecha_creacion else None,
+        'creador': nombre_creador(a)
+    }
+
+def serializar_tarea(t):
+    return {
+        'id': t.id,
+        'actividad_id': t.actividad_id,
+        'nombre': t.nombre,
+        'descripcion': t.descripcion,
+        'responsable': t.responsable,
+        'fecha_inicio': t.fecha_inicio.isoformat() if t.fecha_inicio else None,
+        'fecha_fin': t.fecha_fin.isoformat() if t.fecha_fin else None,
+        'estado': t.estado,
+        'fecha_creacion': t.fecha_creacion.isoformat() if t.fecha_creacion else None,
+        'creador': nombre_creador(t)
+    }
+
+# ==================== INGESTA MASIVA DE ASPECTOS ====================
+
+TIPOS_ASPECTO = ['Positivo', 'Negativo']
+
+# Categorías válidas de cada matriz FODA
+ASPECTOS_FODA_EXT = ['POLITICO', 'ECONOMICO', 'SOCIAL', 'TECNOLOGICO', 'ECOLOGICO', 'LEGAL']
+ASPECTOS_FODA_INT = [
+    'ADMINISTRACIÓN Y GERENCIA',
+    'MARKETING Y VENTAS',
+    'OPERACIONES Y LOGÍSTICA',
+    'FINANZAS Y CONTABILIDAD',
+    'RECURSOS HUMANOS',
+    'SISTEMAS DE INFORMACIÓN',
+    'TECNOLOGÍA'
+]
+
+# Bloques del CANVA (campo tipo de los aspectos con fuente='canva')
+BLOQUES_CANVA = [
+    {'nombre': 'Mapeo de Actores y Comunidades Afectadas', 'icono': 'fas fa-users'},
+    {'nombre': 'Propuesta de Valor', 'icono': 'fas fa-gem'},
+    {'nombre': 'Canales', 'icono': 'fas fa-broadcast-tower'},
+    {'nombre': 'Relación con Actores', 'icono': 'fas fa-handshake'},
+    {'nombre': 'Fuentes de Ingreso', 'icono': 'fas fa-money-bill-wave'},
+    {'nombre': 'Recursos Clave', 'icono': 'fas fa-tools'},
+    {'nombre': 'Actividades Clave', 'icono': 'fas fa-tasks'},
+    {'nombre': 'Socios Clave', 'icono': 'fas fa-handshake'},
+    {'nombre': 'Estructura de Costes', 'icono': 'fas fa-calculator'}
+]
+
+def validar_aspecto_lote(item, aspectos_validos):
+    """Devuelve el motivo de rechazo de una actividad arrastrada o None si es válida"""
+    if not isinstance(item, dict):
+        return 'Formato inválido'
+    actividad = item.get('actividad')
+    if not actividad or not isinstance(actividad, str) or not actividad.strip():
+        return 'La actividad es obligatoria'
+    if len(actividad.strip()) > 500:
+        return 'La actividad supera los 500 caracteres'
+    if item.get('tipo') not in TIPOS_ASPECTO:
+        return 'Tipo inválido'
+    if item.get('aspecto_nuevo') not in aspectos_validos:
+        return 'Aspecto inválido'
+    return None
+
+def insertar_aspectos_lote(items, fuente, aspectos_validos):
+    """Valida todo el lote antes de escribir e inserta las filas válidas con un
+    único INSERT de varias filas (sin crear objetos ORM).
+    
+    Devuelve (aceptadas, rechazadas); rechazadas es una lista de
+    {'indice', 'actividad', 'motivo'}. No hace commit.
+    """
+    filas = []
+    rechazadas = []
+    
+    for indice, item in enumerate(items):
+        motivo = validar_aspecto_lote(item, aspectos_validos)
+        if motivo:
+            rechazadas.append({
+                'indice': indice,
+                'actividad': item.get('actividad') if isinstance(item, dict) else None,
+                'motivo': motivo
+            })
+            continue
+        filas.append({
+            'actividad': item['actividad'].strip(),
+            'tipo': item['tipo'],
+            'aspecto': item['aspecto_nuevo'],
+            'fuente': fuente,
+            'created_by': session['user_id']
+        })
+    
+    if filas:
+        db.session.execute(insert(AspectoAmbiental), filas)
+        ajustar_contadores(db.session.connection(), contar_filas_lote('aspectos', filas))
+    
+    return len(filas), rechazadas
+
+def respuesta_lote_aspectos(actividades, fuente, aspectos_validos, destino):
+    """Inserta el lote, hace commit si hubo filas válidas y arma la respuesta común"""
+    guardadas, rechazadas = insertar_aspectos_lote(actividades, fuente, aspectos_validos)
+    
+    if guardadas == 0:
+        return jsonify({
+            'success': False,
+            'message': 'No se pudo guardar ninguna actividad (datos inválidos)',
+            'guardadas': 0,
+            'rechazadas': rechazadas
+        }), 400
+    
+    db.session.commit()
+    invalidar_cache('aspectos')
+    
+    mensaje = f'{guardadas} actividades guardadas en {destino}'
+    if rechazadas:
+        mensaje += f' ({len(rechazadas)} rechazadas)'
+    return jsonify({
+        'success': True,
+        'message': mensaje,
+        'guardadas': guardadas,
+        'rechazadas': rechazadas
+    })
+
+# ==================== CACHÉ DE VISTAS ====================
+
+class CacheLRU:
+    """Caché en memoria del proceso: LRU con expiración por TTL
+    
+    Cada worker tiene la suya y las versiones de etiqueta de un worker no llegan
+    a los demás; por eso vista_cacheada añade a la clave las marcas de las tablas
+    en la BD (compartidas por todos los workers). Con CacheRedis las versiones ya
+    son compartidas y esa consulta se omite.
+    """
+    nombre = 'lru'
+    compartida = False
+    
+    def __init__(self, max_entradas, ttl):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._versiones = {}
+        self._lock = threading.Lock()
+    
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return False, None
+            expira, valor = entrada
+            if expira < time.time():
+                del self._datos[clave]
+                return False, None
+            self._datos.move_to_end(clave)
+            return True, valor
+    
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.time() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+    
+    def versiones(self, etiquetas):
+        with self._lock:
+            return [self._versiones.get(e, 0) for e in etiquetas]
+    
+    def incrementar_version(self, etiqueta):
+        with self._lock:
+            self._versiones[etiqueta] = self._versiones.get(etiqueta, 0) + 1
+    
+    def entradas(self):
+        return len(self._datos)
+
+class CacheRedis:
+    """Caché compartida entre workers en Redis (requiere el paquete redis)"""
+    nombre = 'redis'
+    compartida = True
+    
+    def __init__(self, url, ttl):
+        import redis
+        self._cliente = redis.Redis.from_url(url)
+        self.ttl = ttl
+    
+    def obtener(self, clave):
+        valor = self._cliente.get(clave)
+        if valor is None:
+            return False, None
+        return True, pickle.loads(valor)
+    
+    def guardar(self, clave, valor):
+        self._cliente.setex(clave, self.ttl, pickle.dumps(valor))
+    
+    def versiones(self, etiquetas):
+        return [int(v or 0) for v in self._cliente.mget([f'version:{e}' for e in etiquetas])]
+    
+    def incrementar_version(self, etiqueta):
+        self._cliente.incr(f'version:{etiqueta}')
+    
+    def entradas(self):
+        return None
+
+def crear_cache_vistas():
+    if CACHE_REDIS_URL:
+        try:
+            cache = CacheRedis(CACHE_REDIS_URL, CACHE_VISTAS_TTL)
+            print("📦 Caché de vistas: Redis compartido")
+            return cache
+        except ImportError:
+            print("⚠️  CACHE_REDIS_URL definido pero el paquete redis no está instalado. Usando LRU en memoria.")
+    return CacheLRU(CACHE_VISTAS_MAX, CACHE_VISTAS_TTL)
+
+cache_vistas = crear_cache_vistas()
+cache_metricas = {
+    'aciertos': Counter(),
+    'fallos': Counter(),
+    'invalidaciones': Counter()
+}
+
+def vista_cacheada(nombre, etiquetas, calcular):
+    """Devuelve el modelo de vista cacheado o lo calcula y lo guarda
+    
+    La clave incluye la versión de cada etiqueta (tabla) de la que depende la
+    vista; invalidar_cache() sube esa versión y las entradas viejas dejan de
+    usarse. Con la caché en memoria del proceso también incluye las marcas de
+    esas tablas en la BD, para que una escritura atendida por otro worker
+    invalide la entrada sin esperar al TTL. El valor debe ser datos planos
+    (dicts/listas), no objetos ORM.
+    """
+    try:
+        versiones = cache_vistas.versiones(etiquetas)
+        clave = f"vista:{nombre}:" + ':'.join(f"{e}{v}" for e, v in zip(etiquetas, versiones))
+        if not cache_vistas.compartida:
+            clave += ':' + marca_etiquetas(etiquetas)
+        encontrado, valor = cache_vistas.obtener(clave)
+    except Exception as e:
+        print(f"⚠️  Error leyendo la caché de vistas: {e}")
+        return calcular()
+    
+    if encontrado:
+        cache_metricas['aciertos'][nombre] += 1
+        return valor
+    
+    cache_metricas['fallos'][nombre] += 1
+    valor = calcular()
+    try:
+        cache_vistas.guardar(clave, valor)
+    except Exception as e:
+        print(f"⚠️  Error guardando en la caché de vistas: {e}")
+    return valor
+
+def marca_etiquetas(etiquetas):
+    """Huella de las marcas en BD (filas, MAX(id), MAX(fecha)) de las tablas de las etiquetas
+    
+    Los clústeres del grafo ('red:<eje>') dependen de la tabla de estrategias.
+    """
+    tablas = tuple(sorted({'estrategias' if e.startswith('red:') else e for e in etiquetas} & set(COLUMNAS_MODIFICACION)))
+    if not tablas:
+        return ''
+    # Una sola consulta por petición aunque se lean varias vistas (p. ej. los ejes del grafo)
+    memo = g.setdefault('marcas_vistas', {}) if has_request_context() else {}
+    if tablas not in memo:
+        memo[tablas] = hashlib.sha1(repr(marcas_tablas(tablas)).encode()).hexdigest()[:16]
+    return memo[tablas]
+
+def invalidar_cache(*etiquetas):
+    """Invalida las vistas que dependen de las tablas indicadas (llamar tras el commit)"""
+    if has_request_context():
+        g.pop('marcas_vistas', None)
+    for etiqueta in etiquetas:
+        try:
+            cache_vistas.incrementar_version(etiqueta)
+            cache_metricas['invalidaciones'][etiqueta] += 1
+        except Exception as e:
+            print(f"⚠️  Error invalidando la caché ({etiqueta}): {e}")
+
+def registro_a_dict(registro):
+    """Copia las columnas de un registro ORM a un dict apto para la caché y las plantillas"""
+    return {c.name: getattr(registro, c.name) for c in registro.__table__.columns}
+
+# ==================== MÉTRICAS POR ENDPOINT (PROMETHEUS) ====================
+
+# Límites de los histogramas (formato Prometheus: cada bucket cuenta valor <= le)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_SENTENCIAS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+BUCKETS_TAMANO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+class Histograma:
+    """Histograma acumulativo con límites fijos (suma y conteo incluidos)"""
+    
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+    
+    def observar(self, valor):
+        self.cuentas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+class MetricasEndpoint:
+    """Acumulados de un (endpoint, método, status) en este worker"""
+    
+    def __init__(self):
+        self.latencia = Histograma(BUCKETS_LATENCIA)
+        self.sentencias = Histograma(BUCKETS_SENTENCIAS)
+        self.tamano = Histograma(BUCKETS_TAMANO)
+        self.sql_segundos = 0.0
+        self.plantilla_segundos = 0.0
+        self.plantillas = 0
+
+# (endpoint, método, status) -> MetricasEndpoint. Cada worker de gunicorn lleva
+# los suyos (como las métricas del pool y de la caché).
+metricas_endpoints = {}
+_metricas_endpoints_lock = threading.Lock()
+_metricas_inicio = time.time()
+
+def metricas_peticion():
+    """Contadores de la petición en curso o None fuera de una petición (CLI, arranque)"""
+    if not has_request_context():
+        return None
+    return g.get('metricas_peticion')
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _metricas_antes_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info['inicio_sentencia'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _metricas_despues_sql(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop('inicio_sentencia', None)
+    if inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    
+    actual = metricas_peticion()
+    if actual is not None:
+        actual['sql_sentencias'] += 1
+        actual['sql_segundos'] += duracion
+    
+    if CONSULTAS_LENTAS_MS and duracion * 1000 >= CONSULTAS_LENTAS_MS:
+        registrar_consulta_lenta(conn, statement, parameters, executemany, duracion)
+
+@before_render_template.connect_via(app)
+def _metricas_antes_plantilla(sender, template, context, **extra):
+    actual = metricas_peticion()
+    if actual is not None:
+        actual['plantilla_inicio'] = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _metricas_despues_plantilla(sender, template, context, **extra):
+    actual = metricas_peticion()
+    if actual is not None and actual.get('plantilla_inicio') is not None:
+        actual['plantilla_segundos'] += time.perf_counter() - actual.pop('plantilla_inicio')
+        actual['plantillas'] += 1
+
+@app.before_request
+def iniciar_metricas_peticion():
+    g.metricas_peticion = {
+        'inicio': time.perf_counter(),
+        'sql_sentencias': 0,
+        'sql_segundos': 0.0,
+        'plantilla_segundos': 0.0,
+        'plantillas': 0
+    }
+
+def registrar_metricas(clave, actual, tamano):
+    latencia = time.perf_counter() - actual['inicio']
+    with _metricas_endpoints_lock:
+        metricas = metricas_endpoints.get(clave)
+        if metricas is None:
+            metricas = metricas_endpoints[clave] = MetricasEndpoint()
+        metricas.latencia.observar(latencia)
+        metricas.sentencias.observar(actual['sql_sentencias'])
+        metricas.tamano.observar(tamano)
+        metricas.sql_segundos += actual['sql_segundos']
+        metricas.plantilla_segundos += actual['plantilla_segundos']
+        metricas.plantillas += actual['plantillas']
+
+@app.after_request
+def finalizar_metricas_peticion(response):
+    actual = g.get('metricas_peticion')
+    if actual is None or request.endpoint == 'metrics':
+        return response
+    
+    clave = (request.endpoint or 'sin_ruta', request.method, str(response.status_code))
+    
+    if response.content_length is not None or not response.is_streamed:
+        registrar_metricas(clave, actual, response.calculate_content_length() or 0)
+        return response
+    
+    # Respuestas en streaming (exportación CSV): la duración, el SQL y los bytes
+    # se siguen acumulando mientras se envía el cuerpo; se registran al cerrar
+    enviados = [0]
+    
+    def contar_bytes(cuerpo):
+        for trozo in cuerpo:
+            if isinstance(trozo, str):
+                trozo = trozo.encode('utf-8')
+            enviados[0] += len(trozo)
+            yield trozo
+    
+    response.response = contar_bytes(response.response)
+    response.call_on_close(lambda: registrar_metricas(clave, actual, enviados[0]))
+    return response
+
+def _etiquetas(**valores):
+    partes = []
+    for nombre, valor in valores.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+def _lineas_histograma(nombre, histograma, etiquetas):
+    lineas = []
+    acumulado = 0
+    for limite, cuenta in zip(list(histograma.limites) + ['+Inf'], histograma.cuentas):
+        acumulado += cuenta
+        lineas.append(f"{nombre}_bucket{_etiquetas(**etiquetas, le=limite)} {acumulado}")
+    lineas.append(f"{nombre}_sum{_etiquetas(**etiquetas)} {histograma.suma}")
+    lineas.append(f"{nombre}_count{_etiquetas(**etiquetas)} {histograma.total}")
+    return lineas
+
+def exportar_metricas_prometheus():
+    """Métricas de este worker en formato de texto de Prometheus (versión 0.0.4)"""
+    with _metricas_endpoints_lock:
+        copia = {clave: copy.deepcopy(m) for clave, m in metricas_endpoints.items()}
+    
+    familias = [
+        ('flask_http_request_duration_seconds', 'histogram', 'Latencia de la petición por endpoint',
+         lambda m: m.latencia),
+        ('flask_http_request_sql_statements', 'histogram', 'Sentencias SQL ejecutadas por petición',
+         lambda m: m.sentencias),
+        ('flask_http_response_size_bytes', 'histogram', 'Tamaño del cuerpo de la respuesta',
+         lambda m: m.tamano),
+        ('flask_sql_duration_seconds_total', 'counter', 'Tiempo total en la base de datos',
+         lambda m: m.sql_segundos),
+        ('flask_template_render_seconds_total', 'counter', 'Tiempo total renderizando plantillas',
+         lambda m: m.plantilla_segundos),
+        ('flask_template_renders_total', 'counter', 'Plantillas renderizadas',
+         lambda m: m.plantillas),
+    ]
+    
+    lineas = []
+    for nombre, tipo, ayuda, valor in familias:
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for (endpoint, metodo, status), metricas in sorted(copia.items()):
+            etiquetas = {'endpoint': endpoint, 'method': metodo, 'status': status}
+            if tipo == 'histogram':
+                lineas += _lineas_histograma(nombre, valor(metricas), etiquetas)
+            else:
+                lineas.append(f"{nombre}{_etiquetas(**etiquetas)} {valor(metricas)}")
+    
+    with _metricas_pool_lock:
+        pool = dict(metricas_pool)
+    lineas += [
+        "# HELP flask_db_pool_wait_seconds_total Espera acumulada por conexiones del pool",
+        "# TYPE flask_db_pool_wait_seconds_total counter",
+        f"flask_db_pool_wait_seconds_total {pool['espera_total']}",
+        "# HELP flask_db_pool_timeouts_total Checkouts del pool que agotaron el timeout",
+        "# TYPE flask_db_pool_timeouts_total counter",
+        f"flask_db_pool_timeouts_total {pool['timeouts']}",
+        "# HELP flask_worker_start_time_seconds Arranque de este worker (cada worker tiene sus métricas)",
+        "# TYPE flask_worker_start_time_seconds gauge",
+        f"flask_worker_start_time_seconds{_etiquetas(pid=os.getpid())} {_metricas_inicio}",
+    ]
+    return '\n'.join(lineas) + '\n'
+
+# ==================== CONSULTAS LENTAS ====================
+
+# Últimas consultas lentas de este worker (las más antiguas se descartan)
+consultas_lentas = deque(maxlen=CONSULTAS_LENTAS_MAX)
+_consultas_lentas_lock = threading.Lock()
+# Huella de la consulta -> momento de su último EXPLAIN, para no repetir el plan
+# de una misma consulta lenta en cada petición
+_ultimo_plan = OrderedDict()
+PLAN_INTERVALO = 60
+
+def redactar_valor(valor):
+    """Oculta textos y binarios (pueden ser datos personales); conserva números y fechas"""
+    if isinstance(valor, str):
+        return f'<texto len={len(valor)}>'
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return f'<binario len={len(valor)}>'
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, (int, float, bool)) or valor is None:
+        return valor
+    return f'<{type(valor).__name__}>'
+
+def redactar_parametros(parametros, executemany=False):
+    if executemany:
+        filas = list(parametros)
+        return {'filas': len(filas), 'primeras': [redactar_parametros(f) for f in filas[:3]]}
+    if isinstance(parametros, dict):
+        return {clave: redactar_valor(valor) for clave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [redactar_valor(valor) for valor in parametros]
+    return redactar_valor(parametros)
+
+def huella_consulta(sentencia):
+    """Identificador estable de la forma de la consulta (sin valores: van como parámetros)"""
+    return hashlib.sha1(' '.join(sentencia.split()).encode('utf-8')).hexdigest()[:12]
+
+def plan_consulta(conn, sentencia, parametros):
+    """EXPLAIN de un SELECT sobre la misma conexión (ve los datos de la transacción en curso).
+    
+    Usa el cursor del driver directamente para no disparar los eventos del engine.
+    En PostgreSQL va dentro de un SAVEPOINT: un EXPLAIN fallido no debe abortar la
+    transacción de la petición. EXPLAIN ANALYZE vuelve a ejecutar la consulta, por
+    eso solo se aplica a SELECT y solo si CONSULTAS_LENTAS_ANALYZE está activo.
+    """
+    if not sentencia.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    
+    dialecto = conn.dialect.name
+    if dialecto == 'sqlite':
+        explain = 'EXPLAIN QUERY PLAN ' + sentencia
+    elif dialecto == 'postgresql':
+        explain = ('EXPLAIN (ANALYZE, BUFFERS) ' if CONSULTAS_LENTAS_ANALYZE else 'EXPLAIN ') + sentencia
+    else:
+        return None
+    
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if dialecto == 'postgresql':
+            cursor.execute('SAVEPOINT plan_consulta_lenta')
+        try:
+            cursor.execute(explain, parametros)
+            filas = cursor.fetchall()
+        except Exception as e:
+            if dialecto == 'postgresql':
+                cursor.execute('ROLLBACK TO SAVEPOINT plan_consulta_lenta')
+            return f'(no se pudo obtener el plan: {e})'
+        if dialecto == 'postgresql':
+            cursor.execute('RELEASE SAVEPOINT plan_consulta_lenta')
+    finally:
+        cursor.close()
+    
+    if dialecto == 'sqlite':
+        # Filas (id, padre, -, detalle): se indenta según la profundidad en el árbol
+        profundidad = {0: -1}
+        lineas = []
+        for id_nodo, padre, _, detalle in filas:
+            profundidad[id_nodo] = profundidad.get(padre, -1) + 1
+            lineas.append('  ' * profundidad[id_nodo] + detalle)
+        return '\n'.join(lineas)
+    return '\n'.join(fila[0] for fila in filas)
+
+def registrar_consulta_lenta(conn, sentencia, parametros, executemany, duracion):
+    huella = huella_consulta(sentencia)
+    
+    plan = None
+    if not executemany:
+        ahora = time.time()
+        with _consultas_lentas_lock:
+            debe_explicar = ahora - _ultimo_plan.get(huella, 0) >= PLAN_INTERVALO
+            if debe_explicar:
+                _ultimo_plan[huella] = ahora
+                _ultimo_plan.move_to_end(huella)
+                while len(_ultimo_plan) > 1000:
+                    _ultimo_plan.popitem(last=False)
+        if debe_explicar:
+            try:
+                plan = plan_consulta(conn, sentencia, parametros)
+            except Exception as e:
+                plan = f'(no se pudo obtener el plan: {e})'
+    
+    captura = {
+        'fecha': datetime.utcnow().isoformat(timespec='seconds'),
+        'duracion_ms': round(duracion * 1000, 1),
+        'huella': huella,
+        'sql': sentencia[:10000],
+        'parametros': redactar_parametros(parametros, executemany),
+        'endpoint': request.endpoint if has_request_context() else None,
+        'ruta': f'{request.method} {request.path}' if has_request_context() else None,
+        'usuario_id': session.get('user_id') if has_request_context() else None,
+        'plan': plan
+    }
+    with _consultas_lentas_lock:
+        consultas_lentas.append(captura)
+    print(f"🐢 Consulta lenta ({captura['duracion_ms']} ms) en {captura['ruta'] or 'fuera de petición'}: {' '.join(sentencia.split())[:200]}")
+
 # ==================== DECORADORES DE AUTENTICACIÓN ====================
 
+# user_id -> ((auth_epoch, rol) o None si el usuario ya no existe, expiración)
+_epocas_usuarios = OrderedDict()
+_epocas_lock = threading.Lock()
+EPOCAS_MAX = 4096
+
+def epoca_usuario(user_id):
+    """(auth_epoch, rol) vigentes del usuario; consulta la BD solo si no está en caché o expiró"""
+    ahora = time.monotonic()
+    with _epocas_lock:
+        entrada = _epocas_usuarios.get(user_id)
+        if entrada and entrada[1] > ahora:
+            return entrada[0]
+    
+    fila = db.session.query(User.auth_epoch, User.rol).filter(User.id == user_id).first()
+    vigente = (fila[0] or 0, fila[1]) if fila else None
+    
+    with _epocas_lock:
+        _epocas_usuarios[user_id] = (vigente, ahora + AUTORIZACION_TTL)
+        _epocas_usuarios.move_to_end(user_id)
+        while len(_epocas_usuarios) > EPOCAS_MAX:
+            _epocas_usuarios.popitem(last=False)
+    return vigente
+
+def olvidar_epoca(user_id):
+    with _epocas_lock:
+        _epocas_usuarios.pop(user_id, None)
+
+def usuario_autorizado():
+    """Contexto de autorización de la petición a partir de la sesión firmada
+    
+    Confía en el user_id y el rol de la cookie (firmada con SECRET_KEY) y solo
+    comprueba, con la caché de épocas, que la sesión no se revocó ni cambió el
+    rol del usuario. Devuelve {'id', 'username', 'rol'} o None (y limpia la sesión).
+    """
+    if 'usuario_autorizado' in g:
+        return g.usuario_autorizado
+    
+    contexto = None
+    user_id = session.get('user_id')
+    if user_id is not None:
+        # Las sesiones anteriores a auth_epoch cuentan como época 0
+        if epoca_usuario(user_id) == (session.get('auth_epoch', 0), session.get('rol')):
+            contexto = {'id': user_id, 'username': session.get('username'), 'rol': session.get('rol')}
+        else:
+            session.clear()
+    
+    g.usuario_autorizado = contexto
+    return contexto
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if usuario_autorizado() is None:
             return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
@@ -139,14 +1060,657 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        usuario = usuario_autorizado()
+        if usuario is None:
             return redirect(url_for('login'))
-        user = User.query.get(session['user_id'])
-        if user.rol != 'admin':
+        if usuario['rol'] != 'admin':
             return redirect(url_for('inicio'))
         return f(*args, **kwargs)
     return decorated_function
 
+# ==================== RESPUESTAS CONDICIONALES (ETag) ====================
+
+# Tabla -> (modelo, columna de fecha que refleja su última modificación).
+# Solo los aspectos se editan (updated_at); el resto solo recibe altas y bajas,
+# que ya cambian el conteo o el id máximo.
+COLUMNAS_MODIFICACION = {
+    'aspectos': (AspectoAmbiental, AspectoAmbiental.updated_at),
+    'estrategias': (EstrategiaFodaCruzado, EstrategiaFodaCruzado.fecha_creacion),
+    'actividades': (ActividadEstrategia, ActividadEstrategia.fecha_creacion),
+    'tareas': (TareaActividad, TareaActividad.fecha_creacion),
+    'usuarios': (User, User.created_at)
+}
+
+def marcas_tablas(tablas):
+    """Nivel de agua de cada tabla (filas, MAX(id), MAX(fecha)) en un solo SELECT.
+    
+    El número de filas sale de los contadores resumen cuando la tabla los tiene.
+    """
+    columnas = []
+    for tabla in tablas:
+        modelo, fecha = COLUMNAS_MODIFICACION[tabla]
+        if tabla in TABLAS_CONTADAS:
+            filas = select(func.coalesce(func.sum(ContadorResumen.total), 0)).where(
+                ContadorResumen.tabla == tabla
+            ).scalar_subquery()
+        else:
+            filas = select(func.count(modelo.id)).scalar_subquery()
+        columnas += [
+            filas,
+            select(func.max(modelo.id)).scalar_subquery(),
+            select(func.max(fecha)).scalar_subquery()
+        ]
+    return tuple(db.session.execute(select(*columnas)).one())
+
+def respuesta_condicional(*tablas, extra=None):
+    """Añade ETag y Last-Modified a una API de lectura y responde 304 sin
+    consultar ni serializar si el cliente ya tiene la versión actual.
+    
+    El ETag sale de la URL y de las marcas de las tablas indicadas; extra es una
+    función opcional con otros datos de los que dependa la respuesta.
+    """
+    def decorador(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                marcas = marcas_tablas(tablas)
+                partes = [request.full_path] + [str(m) for m in marcas]
+                if extra:
+                    partes.append(str(extra()))
+                etag = hashlib.sha1('|'.join(partes).encode()).hexdigest()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️  No se pudo calcular el ETag de {request.path}: {e}")
+                return f(*args, **kwargs)
+            
+            if request.if_none_match.contains(etag):
+                respuesta = Response(status=304)
+            else:
+                respuesta = make_response(f(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            
+            respuesta.set_etag(etag)
+            fechas = [m for m in marcas[2::3] if m]
+            if fechas:
+                respuesta.last_modified = max(fechas)
+            # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+            respuesta.headers['Cache-Control'] = 'private, no-cache'
+            return respuesta
+        return decorated_function
+    return decorador
+
+def contar_aspectos_recientes(dias=7):
+    """Aspectos creados en los últimos días (cambia con el tiempo aunque no haya escrituras)"""
+    desde = (datetime.utcnow() - timedelta(days=dias)).date()
+    return sum(totales_contadores('aspectos', desde=desde).values())
+
+# ==================== CONTADORES RESUMEN ====================
+
+# Tablas con contadores: nombre -> modelo
+TABLAS_CONTADAS = {
+    'aspectos': AspectoAmbiental,
+    'estrategias': EstrategiaFodaCruzado,
+    'actividades': ActividadEstrategia,
+    'tareas': TareaActividad
+}
+MODELOS_CONTADOS = {modelo: nombre for nombre, modelo in TABLAS_CONTADAS.items()}
+
+# Atributos de los que depende la clave del contador de cada tabla
+CAMPOS_CONTADOR = {
+    'aspectos': ('fuente', 'tipo', 'aspecto', 'created_at'),
+    'estrategias': ('eje_id', 'fecha_creacion'),
+    'actividades': ('fecha_creacion',),
+    'tareas': ('fecha_creacion',)
+}
+
+def polaridad_aspecto(fuente, tipo, aspecto):
+    """Positivo/Negativo: en FODA es el tipo; en el CANVA va como prefijo del aspecto ('Positivo: ...')"""
+    if fuente == 'canva':
+        prefijo, separador, _ = (aspecto or '').partition(':')
+        tipo = prefijo if separador else ''
+    return tipo if tipo in TIPOS_ASPECTO else ''
+
+def clave_contador(tabla, valores):
+    """(tabla, fuente, polaridad, día) de una fila dada como dict de atributos"""
+    fecha = valores.get('created_at' if tabla == 'aspectos' else 'fecha_creacion') or datetime.utcnow()
+    dia = fecha.date() if isinstance(fecha, datetime) else fecha
+    if tabla == 'aspectos':
+        fuente = valores.get('fuente') or ''
+        return (tabla, fuente, polaridad_aspecto(fuente, valores.get('tipo'), valores.get('aspecto')), dia)
+    if tabla == 'estrategias':
+        return (tabla, '', 'con_eje' if valores.get('eje_id') else 'sin_eje', dia)
+    return (tabla, '', '', dia)
+
+def ajustar_contadores(conexion, deltas):
+    """Suma los deltas {clave: n} a los contadores con un upsert por lote.
+    
+    Se ejecuta en la conexión de la transacción que escribe las filas, así que
+    contadores y datos se confirman (o se deshacen) juntos. Las filas se ordenan
+    por clave para que transacciones concurrentes bloqueen en el mismo orden.
+    """
+    filas = [
+        {'tabla': tabla, 'fuente': fuente, 'polaridad': polaridad, 'dia': dia, 'total': n}
+        for (tabla, fuente, polaridad, dia), n in sorted(deltas.items()) if n
+    ]
+    if not filas:
+        return
+    
+    tabla = ContadorResumen.__table__
+    dialecto = conexion.dialect.name
+    if dialecto in ('postgresql', 'sqlite'):
+        insertar = postgresql_insert if dialecto == 'postgresql' else sqlite_insert
+        sentencia = insertar(tabla)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=[c.name for c in tabla.primary_key.columns],
+            set_={'total': tabla.c.total + sentencia.excluded.total}
+        )
+        conexion.execute(sentencia, filas)
+    else:
+        for fila in filas:
+            condicion = and_(*[tabla.c[c] == fila[c] for c in ('tabla', 'fuente', 'polaridad', 'dia')])
+            if not conexion.execute(tabla.update().where(condicion).values(total=tabla.c.total + fila['total'])).rowcount:
+                conexion.execute(tabla.insert(), fila)
+
+def contar_filas_lote(tabla, filas):
+    """Deltas de un INSERT masivo (sin objetos ORM que vea el flush)"""
+    return Counter(clave_contador(tabla, fila) for fila in filas)
+
+@event.listens_for(Session, 'after_flush')
+def _contadores_tras_flush(session, contexto):
+    """Actualiza los contadores con las altas, bajas y cambios de clave del flush"""
+    deltas = Counter()
+    
+    for registro in session.new:
+        tabla = MODELOS_CONTADOS.get(type(registro))
+        if tabla:
+            deltas[clave_contador(tabla, {c: getattr(registro, c) for c in CAMPOS_CONTADOR[tabla]})] += 1
+    
+    for registro in session.deleted:
+        tabla = MODELOS_CONTADOS.get(type(registro))
+        if tabla:
+            deltas[clave_contador(tabla, {c: getattr(registro, c) for c in CAMPOS_CONTADOR[tabla]})] -= 1
+    
+    # Ediciones que cambian fuente, tipo, fecha... mueven la fila de contador
+    for registro in session.dirty:
+        tabla = MODELOS_CONTADOS.get(type(registro))
+        if not tabla:
+            continue
+        estado = sqlalchemy_inspect(registro)
+        actuales = {c: getattr(registro, c) for c in CAMPOS_CONTADOR[tabla]}
+        anteriores = dict(actuales)
+        for campo in CAMPOS_CONTADOR[tabla]:
+            historial = estado.attrs[campo].history
+            if historial.deleted:
+                anteriores[campo] = historial.deleted[0]
+        anterior, nueva = clave_contador(tabla, anteriores), clave_contador(tabla, actuales)
+        if anterior != nueva:
+            deltas[anterior] -= 1
+            deltas[nueva] += 1
+    
+    if deltas:
+        ajustar_contadores(session.connection(), deltas)
+
+def reconstruir_contadores(conexion):
+    """Borra y recalcula todos los contadores desde las tablas (un GROUP BY por tabla)"""
+    tabla = ContadorResumen.__table__
+    conexion.execute(tabla.delete())
+    columnas = ['tabla', 'fuente', 'polaridad', 'dia', 'total']
+    
+    aspectos = AspectoAmbiental.__table__
+    polaridad = case(
+        (aspectos.c.fuente == 'canva', case(
+            (aspectos.c.aspecto.like('Positivo:%'), 'Positivo'),
+            (aspectos.c.aspecto.like('Negativo:%'), 'Negativo'),
+            else_=''
+        )),
+        (aspectos.c.tipo.in_(TIPOS_ASPECTO), aspectos.c.tipo),
+        else_=''
+    )
+    dia = func.coalesce(func.date(aspectos.c.created_at), func.current_date())
+    conexion.execute(tabla.insert().from_select(columnas, select(
+        literal('aspectos'), aspectos.c.fuente, polaridad, dia, func.count()
+    ).group_by(aspectos.c.fuente, polaridad, dia)))
+    
+    estrategias = EstrategiaFodaCruzado.__table__
+    con_eje = case((and_(estrategias.c.eje_id.isnot(None), estrategias.c.eje_id != ''), 'con_eje'), else_='sin_eje')
+    dia = func.coalesce(func.date(estrategias.c.fecha_creacion), func.current_date())
+    conexion.execute(tabla.insert().from_select(columnas, select(
+        literal('estrategias'), literal(''), con_eje, dia, func.count()
+    ).group_by(con_eje, dia)))
+    
+    for nombre in ('actividades', 'tareas'):
+        origen = TABLAS_CONTADAS[nombre].__table__
+        dia = func.coalesce(func.date(origen.c.fecha_creacion), func.current_date())
+        conexion.execute(tabla.insert().from_select(columnas, select(
+            literal(nombre), literal(''), literal(''), dia, func.count()
+        ).group_by(dia)))
+
+def leer_contadores(conexion):
+    tabla = ContadorResumen.__table__
+    return {
+        (fila.tabla, fila.fuente, fila.polaridad, str(fila.dia)): fila.total
+        for fila in conexion.execute(select(tabla).where(tabla.c.total != 0))
+    }
+
+def preparar_contadores():
+    """Rellena los contadores si la tabla está vacía pero ya hay datos (primer despliegue)"""
+    if db.session.query(ContadorResumen.tabla).first() is not None:
+        return
+    if db.session.query(AspectoAmbiental.id).first() is None and db.session.query(EstrategiaFodaCruzado.id).first() is None:
+        return
+    print("🔄 Calculando contadores resumen...")
+    with db.engine.begin() as connection:
+        reconstruir_contadores(connection)
+    print("✅ Contadores resumen calculados")
+
+def totales_contadores(tabla, fuente=None, desde=None):
+    """{(fuente, polaridad): total} de una tabla leyendo solo los contadores"""
+    consulta = db.session.query(
+        ContadorResumen.fuente, ContadorResumen.polaridad, func.sum(ContadorResumen.total)
+    ).filter(ContadorResumen.tabla == tabla)
+    if fuente is not None:
+        consulta = consulta.filter(ContadorResumen.fuente == fuente)
+    if desde is not None:
+        consulta = consulta.filter(ContadorResumen.dia >= desde)
+    filas = consulta.group_by(ContadorResumen.fuente, ContadorResumen.polaridad).all()
+    return {(f, p): int(total or 0) for f, p, total in filas}
+
+# ==================== MOTOR DE ESTADÍSTICAS ====================
+
+def calcular_estadisticas():
+    """Calcula los contadores del sistema leyendo los contadores resumen.
+    
+    Un GROUP BY sobre contadores_resumen (filas por categoría y día, no por
+    registro) más el conteo de usuarios. Lo usan el dashboard, la API de
+    estadísticas, /check y la inicialización de BD.
+    """
+    desde = (datetime.utcnow() - timedelta(days=7)).date()
+    
+    estadisticas = {
+        'total_actividades': 0,
+        'actividades_canva': 0,
+        'actividades_foda_ext': 0,
+        'actividades_foda_int': 0,
+        'estrategias_foda_cruzado': 0,
+        'estrategias_con_eje': 0,
+        'actividades_estrategia': 0,
+        'tareas_actividad': 0,
+        'positivas_canva': 0,
+        'negativas_canva': 0,
+        'positivas_foda_ext': 0,
+        'negativas_foda_ext': 0,
+        'actividades_recientes_7dias': 0,
+        'usuarios_total': 0,
+        'actividades_positivas': 0,
+        'actividades_negativas': 0
+    }
+    
+    filas = db.session.query(
+        ContadorResumen.tabla,
+        ContadorResumen.fuente,
+        ContadorResumen.polaridad,
+        func.sum(ContadorResumen.total),
+        func.sum(case((ContadorResumen.dia >= desde, ContadorResumen.total), else_=0))
+    ).group_by(
+        ContadorResumen.tabla,
+        ContadorResumen.fuente,
+        ContadorResumen.polaridad
+    ).all()
+    
+    for tabla, fuente, polaridad, total, recientes in filas:
+        total = int(total or 0)
+        
+        if tabla == 'estrategias':
+            estadisticas['estrategias_foda_cruzado'] += total
+            if polaridad == 'con_eje':
+                estadisticas['estrategias_con_eje'] += total
+        elif tabla == 'actividades':
+            estadisticas['actividades_estrategia'] += total
+        elif tabla == 'tareas':
+            estadisticas['tareas_actividad'] += total
+        elif tabla == 'aspectos':
+            estadisticas['total_actividades'] += total
+            estadisticas['actividades_recientes_7dias'] += int(recientes or 0)
+            
+            if fuente in ('canva', 'foda_ext', 'foda_int'):
+                estadisticas[f'actividades_{fuente}'] += total
+            
+            if polaridad == 'Positivo':
+                estadisticas['actividades_positivas'] += total
+                if fuente in ('canva', 'foda_ext'):
+                    estadisticas[f'positivas_{fuente}'] += total
+            elif polaridad == 'Negativo':
+                estadisticas['actividades_negativas'] += total
+                if fuente in ('canva', 'foda_ext'):
+                    estadisticas[f'negativas_{fuente}'] += total
+    
+    estadisticas['usuarios_total'] = db.session.query(func.count(User.id)).scalar() or 0
+    
+    return estadisticas
+
+# ==================== COLUMNAS NUEVAS ====================
+
+# Columnas añadidas a modelos con tablas ya existentes: tabla -> [(columna, definición)]
+COLUMNAS_NUEVAS = {
+    'usuarios': [('auth_epoch', 'INTEGER NOT NULL DEFAULT 0')],
+    'estrategias_foda_cruzado': [('elementos_normalizados', 'BOOLEAN NOT NULL DEFAULT FALSE')],
+    'estrategia_elementos': [('texto', 'VARCHAR(500)')]
+}
+
+def aplicar_columnas():
+    """Añade las columnas nuevas que falten (db.create_all() no altera tablas existentes)"""
+    agregadas = []
+    inspector = db.inspect(db.engine)
+    for tabla, columnas in COLUMNAS_NUEVAS.items():
+        existentes = {c['name'] for c in inspector.get_columns(tabla)}
+        for columna, definicion in columnas:
+            if columna not in existentes:
+                print(f"🔄 Agregando columna '{columna}' a {tabla}...")
+                with db.engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}"))
+                agregadas.append(f"{tabla}.{columna}")
+    
+    if agregadas:
+        print(f"✅ {len(agregadas)} columnas agregadas")
+    return agregadas
+
+# ==================== ÍNDICES ====================
+
+# Índices sustituidos por otros declarados en los modelos
+INDICES_OBSOLETOS = {
+    # Reemplazado por ix_aspectos_fuente_aspecto_created_desc (ORDER BY aspecto, created_at DESC)
+    'aspectos_ambientales': ('ix_aspectos_fuente_aspecto_created_at',),
+}
+
+def aplicar_indices():
+    """Crea los índices declarados en los modelos que aún no existan
+    
+    db.create_all() solo crea índices junto con tablas nuevas; en tablas ya
+    existentes hay que crearlos aparte. También borra los de INDICES_OBSOLETOS.
+    Es idempotente.
+    """
+    creados = []
+    for modelo in (AspectoAmbiental, EstrategiaFodaCruzado, ActividadEstrategia, TareaActividad):
+        existentes = {i['name'] for i in db.inspect(db.engine).get_indexes(modelo.__tablename__)}
+        for nombre in INDICES_OBSOLETOS.get(modelo.__tablename__, ()):
+            if nombre in existentes:
+                print(f"🗑️  Eliminando índice obsoleto '{nombre}'...")
+                with db.engine.begin() as conexion:
+                    conexion.execute(text(f'DROP INDEX {nombre}'))
+        for indice in modelo.__table__.indexes:
+            if indice.name not in existentes:
+                print(f"🔄 Creando índice '{indice.name}'...")
+                indice.create(bind=db.engine)
+                creados.append(indice.name)
+    
+    if creados:
+        print(f"✅ {len(creados)} índices creados")
+    return creados
+
+# ==================== ESTRATEGIAS NORMALIZADAS ====================
+
+def normalizar_estrategias(conexion):
+    """Funde las filas por pareja (formato anterior) en estrategias con elementos
+    
+    Antes se guardaba una fila por cada pareja interno x externo con el texto de
+    la estrategia y de ambos elementos copiados, y la página de estrategias las
+    reagrupaba por (eje, tipo de cruce, texto). Aquí se agrupan igual: se conserva
+    la fila de menor id, las parejas pasan a estrategia_elementos, las actividades
+    se reasignan y el resto de filas se borra. Cada enlace se crea con el texto
+    copiado en la fila, también si el aspecto ya no existe. Las filas "globales"
+    de cruzado (texto "Múltiples: a; b" con solo el id del primer elemento) no se
+    funden con otras ni se enlaza el rol múltiple: serializar_elementos usa para
+    ese rol las columnas elemento_*. Solo toca las filas marcadas como
+    no normalizadas (elementos_normalizados = false) y las marca al terminar, así
+    que es idempotente: una estrategia nueva que pierda todos sus elementos al
+    borrar aspectos no se vuelve a tratar como del formato anterior.
+    Devuelve (filas fundidas, enlaces creados, estrategias migradas).
+    """
+    estrategias = EstrategiaFodaCruzado.__table__
+    elementos = EstrategiaElemento.__table__
+    actividades = ActividadEstrategia.__table__
+    
+    pendientes = estrategias.c.elementos_normalizados.is_(False)
+    filas = conexion.execute(select(
+        estrategias.c.id, estrategias.c.eje_id, estrategias.c.tipo_cruce, estrategias.c.estrategia,
+        estrategias.c.elemento_interno_id, estrategias.c.elemento_interno_tipo, estrategias.c.elemento_interno_texto,
+        estrategias.c.elemento_externo_id, estrategias.c.elemento_externo_tipo, estrategias.c.elemento_externo_texto
+    ).where(pendientes).order_by(estrategias.c.id))
+    
+    representantes = {}
+    fundidas = {}
+    enlaces = {}
+    for fila in filas:
+        multiples = {
+            rol for rol in ('interno', 'externo')
+            if (getattr(fila, f'elemento_{rol}_texto') or '').startswith('Múltiples:')
+        }
+        if multiples:
+            # Sus elementos no se pueden enlazar todos: la fila queda como estrategia propia
+            clave = ('multiples', fila.id)
+        else:
+            # El texto completo de la estrategia no se guarda en memoria, solo su huella
+            clave = (fila.eje_id or '', fila.tipo_cruce, hashlib.sha1((fila.estrategia or '').encode()).digest())
+        representante = representantes.setdefault(clave, fila.id)
+        if representante != fila.id:
+            fundidas[fila.id] = representante
+        for rol in ('interno', 'externo'):
+            if rol not in multiples:
+                enlaces.setdefault(
+                    (representante, rol, getattr(fila, f'elemento_{rol}_id')),
+                    (getattr(fila, f'elemento_{rol}_tipo'), getattr(fila, f'elemento_{rol}_texto'))
+                )
+    
+    filas_enlace = [
+        {'estrategia_id': estrategia_id, 'rol': rol, 'aspecto_id': aspecto_id, 'tipo': tipo, 'texto': texto}
+        for (estrategia_id, rol, aspecto_id), (tipo, texto) in enlaces.items()
+    ]
+    if filas_enlace:
+        conexion.execute(elementos.insert(), filas_enlace)
+    
+    if fundidas:
+        conexion.execute(
+            actividades.update().where(actividades.c.estrategia_id == bindparam('viejo')).values(
+                estrategia_id=bindparam('nuevo')
+            ),
+            [{'viejo': viejo, 'nuevo': nuevo} for viejo, nuevo in fundidas.items()]
+        )
+        ids = list(fundidas)
+        for i in range(0, len(ids), 500):
+            conexion.execute(estrategias.delete().where(estrategias.c.id.in_(ids[i:i + 500])))
+    
+    # Solo quedan pendientes las filas conservadas
+    if representantes:
+        conexion.execute(estrategias.update().where(pendientes).values(elementos_normalizados=True))
+    
+    return len(fundidas), len(filas_enlace), len(representantes)
+
+def conservar_textos_elementos(condicion, conexion=None):
+    """Copia a los enlaces (estrategia_elementos) que cumplen la condición el texto
+    actual de su aspecto; se llama antes de borrar aspectos para que las
+    estrategias que los cruzan lo conserven"""
+    elementos = EstrategiaElemento.__table__
+    aspectos = AspectoAmbiental.__table__
+    texto = select(aspectos.c.actividad).where(aspectos.c.id == elementos.c.aspecto_id).scalar_subquery()
+    (conexion or db.session).execute(
+        elementos.update().where(condicion, texto.isnot(None)).values(texto=texto)
+    )
+
+@event.listens_for(AspectoAmbiental, 'before_delete')
+def _conservar_texto_al_borrar(mapper, conexion, aspecto):
+    conservar_textos_elementos(EstrategiaElemento.__table__.c.aspecto_id == aspecto.id, conexion)
+
+def soltar_clave_aspecto(conexion):
+    """Quita la clave foránea estrategia_elementos.aspecto_id (versiones anteriores
+    la creaban con ON DELETE CASCADE). SQLite no la aplica y no permite quitarla."""
+    if conexion.dialect.name == 'sqlite':
+        return
+    for clave in sqlalchemy_inspect(conexion).get_foreign_keys('estrategia_elementos'):
+        if clave['referred_table'] == 'aspectos_ambientales' and clave.get('name'):
+            print(f"🔄 Eliminando clave foránea '{clave['name']}'...")
+            conexion.execute(text(f"ALTER TABLE estrategia_elementos DROP CONSTRAINT {clave['name']}"))
+
+def preparar_estrategias():
+    """Migra las estrategias que sigan en el formato por pareja (primer despliegue)"""
+    elementos = EstrategiaElemento.__table__
+    with db.engine.begin() as connection:
+        soltar_clave_aspecto(connection)
+        fundidas, enlaces, migradas = normalizar_estrategias(connection)
+        if fundidas:
+            # Las filas borradas no pasan por el ORM
+            reconstruir_contadores(connection)
+        # Enlaces creados antes de existir la columna texto
+        conservar_textos_elementos(elementos.c.texto.is_(None), connection)
+    
+    if migradas:
+        invalidar_cache('estrategias', 'actividades', *etiquetas_red())
+        print(f"✅ Estrategias normalizadas: {migradas} estrategias, {fundidas} filas por pareja fundidas, "
+              f"{enlaces} elementos enlazados")
+    return fundidas, enlaces
+
+# ==================== BÚSQUEDA DE TEXTO ====================
+
+# Tablas con búsqueda de texto: nombre -> (modelo, columnas indexadas)
+BUSQUEDA_TABLAS = {
+    'aspectos': (AspectoAmbiental, ('actividad', 'aspecto')),
+    'estrategias': (EstrategiaFodaCruzado, ('estrategia',))
+}
+
+# Disponibilidad de la infraestructura de búsqueda en esta BD (se detecta una vez por proceso)
+_busqueda_disponible = {}
+
+def preparar_busqueda():
+    """Crea la infraestructura de búsqueda de texto según el motor de BD
+    
+    - PostgreSQL: extensión pg_trgm, índices GIN de trigramas por columna (para
+      que ILIKE '%término%' use índice) y un índice GIN sobre el tsvector en
+      español (para coincidencias por raíz y ranking).
+    - SQLite: tabla virtual FTS5 con tokenizador de trigramas sincronizada
+      mediante triggers.
+    Es idempotente.
+    """
+    dialecto = db.engine.dialect.name
+    
+    with db.engine.begin() as connection:
+        for nombre, (modelo, columnas) in BUSQUEDA_TABLAS.items():
+            tabla = modelo.__tablename__
+            
+            if dialecto == 'postgresql':
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for columna in columnas:
+                    connection.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{tabla}_{columna}_trgm "
+                        f"ON {tabla} USING gin ({columna} gin_trgm_ops)"
+                    ))
+                documento = " || ' ' || ".join(f"coalesce({c}, '')" for c in columnas)
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{tabla}_busqueda_tsv "
+                    f"ON {tabla} USING gin (to_tsvector('spanish', {documento}))"
+                ))
+            
+            elif dialecto == 'sqlite':
+                fts = f"{tabla}_fts"
+                lista = ', '.join(columnas)
+                nuevos = ', '.join(f"new.{c}" for c in columnas)
+                viejos = ', '.join(f"old.{c}" for c in columnas)
+                
+                existe = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"
+                ), {'nombre': fts}).first()
+                
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"{lista}, content='{tabla}', content_rowid='id', tokenize='trigram')"
+                ))
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {nuevos}); END"
+                ))
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {viejos}); END"
+                ))
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabla} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {viejos}); "
+                    f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {nuevos}); END"
+                ))
+                
+                # Indexar las filas que ya existían antes de crear la tabla FTS
+                if not existe:
+                    print(f"🔄 Indexando texto de '{tabla}'...")
+                    connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    
+    _busqueda_disponible.clear()
+    print("✅ Búsqueda de texto preparada")
+
+def busqueda_disponible(nombre):
+    """Indica si la infraestructura de búsqueda existe en la BD actual"""
+    if nombre not in _busqueda_disponible:
+        modelo = BUSQUEDA_TABLAS[nombre][0]
+        dialecto = db.engine.dialect.name
+        try:
+            if dialecto == 'postgresql':
+                consulta = text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                parametros = {}
+            elif dialecto == 'sqlite':
+                consulta = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre")
+                parametros = {'nombre': f"{modelo.__tablename__}_fts"}
+            else:
+                consulta = None
+            _busqueda_disponible[nombre] = bool(
+                consulta is not None and db.session.execute(consulta, parametros).first()
+            )
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  No se pudo verificar la búsqueda de texto: {e}")
+            return False
+    return _busqueda_disponible[nombre]
+
+def aplicar_busqueda(query, nombre, termino):
+    """Filtra una consulta por un término de búsqueda y calcula su relevancia
+    
+    Mantiene la semántica original de subcadena sin distinguir mayúsculas
+    (ILIKE '%término%'), pero apoyada en índices; en PostgreSQL también acepta
+    coincidencias por raíz en español. Devuelve (query, relevancia), donde la
+    relevancia es una expresión (mayor = más relevante) o None si no hay índice.
+    """
+    modelo, nombres_columnas = BUSQUEDA_TABLAS[nombre]
+    columnas = [getattr(modelo, c) for c in nombres_columnas]
+    subcadena = or_(*[c.ilike(f'%{termino}%') for c in columnas])
+    
+    if not busqueda_disponible(nombre):
+        return query.filter(subcadena), None
+    
+    dialecto = db.engine.dialect.name
+    
+    if dialecto == 'postgresql':
+        documento = func.coalesce(columnas[0], '')
+        for columna in columnas[1:]:
+            documento = documento.op('||')(literal_column("' '")).op('||')(func.coalesce(columna, ''))
+        vector = func.to_tsvector(literal_column("'spanish'"), documento)
+        consulta_ts = func.plainto_tsquery(literal_column("'spanish'"), termino)
+        
+        relevancia = func.ts_rank(vector, consulta_ts) + func.greatest(
+            *[func.similarity(c, termino) for c in columnas]
+        )
+        return query.filter(or_(subcadena, vector.op('@@')(consulta_ts))), relevancia
+    
+    # SQLite FTS5 con trigramas: solo sirve para términos de 3 o más caracteres
+    if len(termino) < 3:
+        return query.filter(subcadena), None
+    
+    fts = f"{modelo.__tablename__}_fts"
+    coincidencias = text(
+        f"SELECT rowid AS id, bm25({fts}) AS rango FROM {fts} WHERE {fts} MATCH :termino"
+    ).bindparams(
+        termino='"' + termino.replace('"', '""') + '"'
+    ).columns(id=Integer, rango=Float).subquery()
+    
+    # bm25 es menor cuanto más relevante, por eso se invierte el signo
+    return query.join(coincidencias, coincidencias.c.id == modelo.id), -coincidencias.c.rango
+
 # ==================== FUNCIÓN DE INICIALIZACIÓN DE BD MEJORADA ====================
 
 def initialize_database():
@@ -195,18 +1759,38 @@ def initialize_database():
             except Exception as migration_error:
                 print(f"⚠️  Nota: No se pudo verificar/agregar columnas: {migration_error}")
                 print("ℹ️  Continuando sin migración de columnas...")
-            # ==================== FIN DE MIGRACIÓN ====================
             
-            # Verificar que las nuevas tablas de actividades y tareas existen
+            # Columnas nuevas en tablas existentes
             try:
-                # Intentar contar actividades y tareas
-                actividades_count = ActividadEstrategia.query.count()
-                tareas_count = TareaActividad.query.count()
-                print(f"📊 Total de actividades de estrategias: {actividades_count}")
-                print(f"📊 Total de tareas: {tareas_count}")
-            except Exception as count_error:
-                print(f"⚠️  Nota: No se pudieron contar actividades/tareas: {count_error}")
-                print("ℹ️  Las tablas se crearán automáticamente cuando se agregue la primera actividad.")
+                aplicar_columnas()
+            except Exception as column_error:
+                print(f"⚠️  Nota: No se pudieron agregar columnas: {column_error}")
+            
+            # Índices de filtros frecuentes y claves foráneas
+            try:
+                aplicar_indices()
+            except Exception as index_error:
+                print(f"⚠️  Nota: No se pudieron crear los índices: {index_error}")
+            
+            # Índices de búsqueda de texto
+            try:
+                preparar_busqueda()
+            except Exception as search_error:
+                print(f"⚠️  Nota: No se pudo preparar la búsqueda de texto: {search_error}")
+            
+            # Estrategias guardadas con una fila por pareja interno x externo
+            try:
+                preparar_estrategias()
+            except Exception as strategies_error:
+                print(f"⚠️  Nota: No se pudieron normalizar las estrategias: {strategies_error}")
+            
+            # Contadores resumen de tablas con datos previos
+            try:
+                preparar_contadores()
+            except Exception as counters_error:
+                db.session.rollback()
+                print(f"⚠️  Nota: No se pudieron calcular los contadores resumen: {counters_error}")
+            # ==================== FIN DE MIGRACIÓN ====================
             
             # Lista de usuarios a crear
             usuarios = [
@@ -227,12 +1811,18 @@ def initialize_database():
             usuarios_creados = 0
             usuarios_existentes = 0
             
+            # Consultar de una vez cuáles ya existen (solo se hashean las contraseñas nuevas)
+            usernames_existentes = {
+                fila[0] for fila in db.session.query(User.username).filter(
+                    User.username.in_([u["username"] for u in usuarios])
+                )
+            }
+            
             # Crear cada usuario si no existe
             for usuario_info in usuarios:
                 username = usuario_info["username"]
-                user_exists = User.query.filter_by(username=username).first()
                 
-                if not user_exists:
+                if username not in usernames_existentes:
                     nuevo_usuario = User(
                         username=username,
                         rol=usuario_info["rol"]
@@ -250,16 +1840,12 @@ def initialize_database():
                 print(f"✅ {usuarios_creados} usuarios nuevos creados")
             
             # Verificar que todas las tablas existen
-            print(f"📊 Total de usuarios en sistema: {User.query.count()}")
-            print(f"📊 Total de aspectos en sistema: {AspectoAmbiental.query.count()}")
-            
-            try:
-                # Intentar contar estrategias FODA
-                estrategias_count = EstrategiaFodaCruzado.query.count()
-                print(f"📊 Total de estrategias FODA cruzado: {estrategias_count}")
-            except Exception as count_error:
-                print(f"⚠️  No se pudo contar estrategias: {count_error}")
-                print("ℹ️  La tabla existe pero puede faltar alguna columna")
+            estadisticas = calcular_estadisticas()
+            print(f"📊 Total de usuarios en sistema: {estadisticas['usuarios_total']}")
+            print(f"📊 Total de aspectos en sistema: {estadisticas['total_actividades']}")
+            print(f"📊 Total de estrategias FODA cruzado: {estadisticas['estrategias_foda_cruzado']}")
+            print(f"📊 Total de actividades de estrategias: {estadisticas['actividades_estrategia']}")
+            print(f"📊 Total de tareas: {estadisticas['tareas_actividad']}")
             
             return True
             
@@ -278,6 +1864,128 @@ def initialize_database():
     
     return False
 
+# ==================== VERIFICACIÓN DE CONTRASEÑAS Y LÍMITES DE LOGIN ====================
+
+# El hash de contraseñas consume decenas de ms de CPU: se hace en un pool acotado
+# para que una ráfaga de logins no acapare los hilos del worker. Las peticiones
+# que no caben en el pool ni en la cola se rechazan en el acto (503).
+# Con el worker gevent los hilos del executor serían greenlets (monkey-patching):
+# el hash bloquearía el hub, así que allí se usa un ThreadPool nativo de gevent.
+executor_login = ThreadPoolExecutor(max_workers=LOGIN_HASH_HILOS, thread_name_prefix='login-hash')
+_pool_login_gevent = []
+_cupos_login = threading.BoundedSemaphore(LOGIN_HASH_HILOS + LOGIN_COLA_MAX)
+
+# clave ('usuario:...' o 'ip:...') -> deque de instantes de intentos fallidos
+_fallos_login = OrderedDict()
+_fallos_login_lock = threading.Lock()
+FALLOS_LOGIN_CLAVES_MAX = 10000
+
+def generar_hash(password):
+    if PASSWORD_HASH_METODO:
+        return generate_password_hash(password, method=PASSWORD_HASH_METODO)
+    return generate_password_hash(password)
+
+_metodo_hash_actual = []
+
+def metodo_hash_actual():
+    """Prefijo 'método:parámetros' que generan los hashes nuevos (p. ej. pbkdf2:sha256:600000)"""
+    if not _metodo_hash_actual:
+        _metodo_hash_actual.append(generar_hash('').split('$', 1)[0])
+    return _metodo_hash_actual[0]
+
+def verificar_contrasena(hash_guardado, password):
+    """Corre en el executor. Devuelve (válida, nuevo_hash); nuevo_hash solo si el
+    hash guardado usa un método o coste distinto del configurado"""
+    if not check_password_hash(hash_guardado, password):
+        return False, None
+    if hash_guardado.split('$', 1)[0] != metodo_hash_actual():
+        return True, generar_hash(password)
+    return True, None
+
+def gevent_activo():
+    """True si el proceso corre con gevent y threading está parcheado (worker gevent)"""
+    monkey = sys.modules.get('gevent.monkey')
+    return bool(monkey and monkey.is_module_patched('threading'))
+
+def pool_login_gevent():
+    """ThreadPool de gevent (hilos del sistema) para el hash; se crea en cada worker tras el fork"""
+    if not _pool_login_gevent:
+        from gevent.threadpool import ThreadPool
+        _pool_login_gevent.append(ThreadPool(LOGIN_HASH_HILOS))
+    return _pool_login_gevent[0]
+
+def verificar_contrasena_acotada(hash_guardado, password):
+    """verificar_contrasena en el pool de login; None si el pool está saturado o no responde a tiempo"""
+    if not _cupos_login.acquire(blocking=False):
+        return None
+    if gevent_activo():
+        return verificar_contrasena_gevent(hash_guardado, password)
+    try:
+        futuro = executor_login.submit(verificar_contrasena, hash_guardado, password)
+    except Exception:
+        _cupos_login.release()
+        raise
+    futuro.add_done_callback(lambda _: _cupos_login.release())
+    try:
+        return futuro.result(timeout=LOGIN_TIMEOUT)
+    except FuturesTimeoutError:
+        return None
+
+def verificar_contrasena_gevent(hash_guardado, password):
+    """Como verificar_contrasena_acotada pero en un hilo real: el hub sigue atendiendo
+    otras peticiones mientras hashlib calcula (libera el GIL). El cupo ya está tomado."""
+    import gevent
+    try:
+        resultado = pool_login_gevent().spawn(verificar_contrasena, hash_guardado, password)
+    except Exception:
+        _cupos_login.release()
+        raise
+    resultado.rawlink(lambda _: _cupos_login.release())
+    try:
+        return resultado.get(timeout=LOGIN_TIMEOUT)
+    except gevent.Timeout:
+        return None
+
+def ip_cliente():
+    """IP del cliente; detrás de un proxy de confianza, la última de X-Forwarded-For"""
+    if LOGIN_IP_DESDE_PROXY:
+        reenviadas = request.headers.get('X-Forwarded-For', '')
+        if reenviadas:
+            return reenviadas.split(',')[-1].strip()
+    return request.remote_addr or 'desconocida'
+
+def _fallos_recientes(clave, ahora):
+    intentos = _fallos_login.get(clave)
+    if not intentos:
+        return 0
+    while intentos and intentos[0] <= ahora - LOGIN_VENTANA:
+        intentos.popleft()
+    return len(intentos)
+
+def login_bloqueado(username, ip):
+    """Segundos que faltan para poder reintentar (0 si no hay bloqueo)"""
+    ahora = time.time()
+    espera = 0
+    with _fallos_login_lock:
+        for clave, limite in ((f'usuario:{username.lower()}', LOGIN_FALLOS_USUARIO), (f'ip:{ip}', LOGIN_FALLOS_IP)):
+            if _fallos_recientes(clave, ahora) >= limite:
+                espera = max(espera, _fallos_login[clave][0] + LOGIN_VENTANA - ahora)
+    return int(espera) + 1 if espera else 0
+
+def registrar_fallo_login(username, ip):
+    ahora = time.time()
+    with _fallos_login_lock:
+        for clave in (f'usuario:{username.lower()}', f'ip:{ip}'):
+            intentos = _fallos_login.setdefault(clave, deque(maxlen=max(LOGIN_FALLOS_USUARIO, LOGIN_FALLOS_IP)))
+            intentos.append(ahora)
+            _fallos_login.move_to_end(clave)
+        while len(_fallos_login) > FALLOS_LOGIN_CLAVES_MAX:
+            _fallos_login.popitem(last=False)
+
+def limpiar_fallos_login(username):
+    with _fallos_login_lock:
+        _fallos_login.pop(f'usuario:{username.lower()}', None)
+
 # ==================== RUTAS PRINCIPALES ====================
 
 @app.route('/')
@@ -290,21 +1998,52 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
+        if not username or not password:
+            return render_template('inicio.html', error='Usuario o contraseña incorrectos')
+        
+        ip = ip_cliente()
+        espera = login_bloqueado(username, ip)
+        if espera:
+            respuesta = make_response(render_template(
+                'inicio.html', error=f'Demasiados intentos fallidos. Intente de nuevo en {espera // 60 + 1} minutos'
+            ), 429)
+            respuesta.headers['Retry-After'] = str(espera)
+            return respuesta
+        
         try:
             user = User.query.filter_by(username=username).first()
             
-            if user and user.check_password(password):
+            valida = False
+            if user:
+                resultado = verificar_contrasena_acotada(user.password, password)
+                if resultado is None:
+                    respuesta = make_response(render_template(
+                        'inicio.html', error='El servidor está atendiendo muchos inicios de sesión. Intente de nuevo en unos segundos'
+                    ), 503)
+                    respuesta.headers['Retry-After'] = '5'
+                    return respuesta
+                valida, nuevo_hash = resultado
+                if valida and nuevo_hash:
+                    user.password = nuevo_hash
+                    db.session.commit()
+                    print(f"🔐 Contraseña de '{user.username}' re-hasheada con {metodo_hash_actual()}")
+            
+            if valida:
+                limpiar_fallos_login(username)
                 session['user_id'] = user.id
                 session['username'] = user.username
                 session['rol'] = user.rol
+                session['auth_epoch'] = user.auth_epoch or 0
                 
                 if user.rol == 'admin':
                     return redirect(url_for('admin_dashboard'))
                 else:
                     return redirect(url_for('inicio'))
             else:
+                registrar_fallo_login(username, ip)
                 return render_template('inicio.html', error='Usuario o contraseña incorrectos')
         except Exception as e:
+            db.session.rollback()
             print(f"Error en login: {e}")
             return render_template('inicio.html', error='Error de conexión a la base de datos')
     
@@ -313,6 +2052,9 @@ def login():
 @app.route('/inicio')
 @login_required
 def inicio():
+    return render_template('inicio.html', **vista_cacheada('inicio', ('aspectos',), calcular_vista_inicio))
+
+def calcular_vista_inicio():
     # Obtener estadísticas para el dashboard
     total_aspectos = AspectoAmbiental.query.count()
     aspectos_recientes = AspectoAmbiental.query.order_by(
@@ -329,11 +2071,12 @@ def inicio():
         AspectoAmbiental.created_at.desc()
     ).limit(5).all()
     
-    return render_template('inicio.html', 
-                         total_aspectos=total_aspectos,
-                         aspectos_recientes=aspectos_recientes,
-                         aspectos_canva=aspectos_canva,
-                         aspectos_foda=aspectos_foda)
+    return {
+        'total_aspectos': total_aspectos,
+        'aspectos_recientes': [registro_a_dict(a) for a in aspectos_recientes],
+        'aspectos_canva': [registro_a_dict(a) for a in aspectos_canva],
+        'aspectos_foda': [registro_a_dict(a) for a in aspectos_foda]
+    }
 
 # ==================== NUEVAS RUTAS PARA LAS PESTAÑAS ADICIONALES ====================
 
@@ -342,34 +2085,7 @@ def inicio():
 def estrategias():
     """Página de Estrategias"""
     try:
-        # Obtener todas las estrategias con ejes
-        estrategias = EstrategiaFodaCruzado.query.order_by(
-            EstrategiaFodaCruzado.fecha_creacion.desc()
-        ).all()
-        
-        # Obtener estadísticas por eje
-        ejes = {
-            'educacion': {'nombre': 'EDUCACIÓN', 'icono': 'fas fa-graduation-cap', 'count': 0},
-            'salud': {'nombre': 'SALUD', 'icono': 'fas fa-heartbeat', 'count': 0},
-            'empleabilidad': {'nombre': 'EMPLEABILIDAD', 'icono': 'fas fa-briefcase', 'count': 0},
-            'desarrollo_economico': {'nombre': 'DESARROLLO ECONÓMICO', 'icono': 'fas fa-chart-line', 'count': 0},
-            'sostenibilidad_ambiental': {'nombre': 'SOSTENIBILIDAD AMBIENTAL (AGUA)', 'icono': 'fas fa-tint', 'count': 0},
-            'comunicacion': {'nombre': 'COMUNICACIÓN', 'icono': 'fas fa-bullhorn', 'count': 0},
-            'institucional': {'nombre': 'INSTITUCIONAL', 'icono': 'fas fa-landmark', 'count': 0}
-        }
-        
-        # Contar estrategias por eje
-        for estrategia in estrategias:
-            if estrategia.eje_id and estrategia.eje_id in ejes:
-                ejes[estrategia.eje_id]['count'] += 1
-        
-        # Convertir a lista para template
-        ejes_lista = [ejes[key] for key in ejes]
-        
-        return render_template('estrategias.html', 
-                             estrategias=estrategias,
-                             ejes=ejes_lista,
-                             total_estrategias=len(estrategias))
+        return render_template('estrategias.html', **vista_cacheada('estrategias', ('estrategias',), calcular_vista_estrategias))
     except Exception as e:
         print(f"Error en estrategias: {e}")
         # Si hay error, devolver página vacía
@@ -378,72 +2094,196 @@ def estrategias():
                              ejes=[],
                              total_estrategias=0)
 
+def calcular_vista_estrategias():
+    # Obtener todas las estrategias con ejes
+    estrategias = EstrategiaFodaCruzado.query.order_by(
+        EstrategiaFodaCruzado.fecha_creacion.desc()
+    ).all()
+    
+    # Obtener estadísticas por eje
+    ejes = {
+        'educacion': {'nombre': 'EDUCACIÓN', 'icono': 'fas fa-graduation-cap', 'count': 0},
+        'salud': {'nombre': 'SALUD', 'icono': 'fas fa-heartbeat', 'count': 0},
+        'empleabilidad': {'nombre': 'EMPLEABILIDAD', 'icono': 'fas fa-briefcase', 'count': 0},
+        'desarrollo_economico': {'nombre': 'DESARROLLO ECONÓMICO', 'icono': 'fas fa-chart-line', 'count': 0},
+        'sostenibilidad_ambiental': {'nombre': 'SOSTENIBILIDAD AMBIENTAL (AGUA)', 'icono': 'fas fa-tint', 'count': 0},
+        'comunicacion': {'nombre': 'COMUNICACIÓN', 'icono': 'fas fa-bullhorn', 'count': 0},
+        'institucional': {'nombre': 'INSTITUCIONAL', 'icono': 'fas fa-landmark', 'count': 0}
+    }
+    
+    # Contar estrategias por eje
+    for estrategia in estrategias:
+        if estrategia.eje_id and estrategia.eje_id in ejes:
+            ejes[estrategia.eje_id]['count'] += 1
+    
+    # Convertir a lista para template
+    ejes_lista = [ejes[key] for key in ejes]
+    
+    return {
+        'estrategias': [registro_a_dict(e) for e in estrategias],
+        'ejes': ejes_lista,
+        'total_estrategias': len(estrategias)
+    }
+
 @app.route('/red')
 @login_required
 def red():
-    """Página de Mapa de Red"""
+    """Página de Mapa de Red (los datos se cargan después desde las APIs)"""
+    return render_template('red.html')
+
+# ==================== GRAFO DE ESTRATEGIAS POR EJE ====================
+
+# Nodos por página al expandir un eje
+GRAFO_LIMITE = 200
+GRAFO_LIMITE_MAX = 500
+SIN_EJE = 'sin_eje'
+
+def eje_grafo(eje_id):
+    """Clúster del grafo al que pertenece una estrategia (ejes desconocidos o vacíos van a sin_eje)"""
+    return eje_id if eje_id in EJES_VALIDOS else SIN_EJE
+
+def etiqueta_eje(eje):
+    """Etiqueta de caché de un clúster: solo se invalida el eje que cambió"""
+    return f'red:{eje}'
+
+def etiquetas_red():
+    return [etiqueta_eje(eje) for eje in EJES_VALIDOS + [SIN_EJE]]
+
+def filtro_eje(eje):
+    if eje == SIN_EJE:
+        return or_(EstrategiaFodaCruzado.eje_id.is_(None), EstrategiaFodaCruzado.eje_id.notin_(EJES_VALIDOS))
+    return EstrategiaFodaCruzado.eje_id == eje
+
+def marcar_ejes_modificados(sesion, ejes):
+    """Anota los clústeres tocados por la transacción; se invalidan al hacer commit"""
+    sesion.info.setdefault('ejes_modificados', set()).update(eje_grafo(eje) for eje in ejes)
+
+@event.listens_for(Session, 'after_flush')
+def _ejes_tras_flush(session, contexto):
+    ejes = []
+    for registro in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(registro, EstrategiaFodaCruzado):
+            ejes.append(registro.eje_id)
+            ejes += sqlalchemy_inspect(registro).attrs.eje_id.history.deleted
+    if ejes:
+        marcar_ejes_modificados(session, ejes)
+
+@event.listens_for(Session, 'after_commit')
+def _ejes_tras_commit(session):
+    ejes = session.info.pop('ejes_modificados', None)
+    if ejes:
+        invalidar_cache(*[etiqueta_eje(eje) for eje in sorted(ejes)])
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _ejes_tras_rollback(session, transaccion_previa):
+    session.info.pop('ejes_modificados', None)
+
+def nodo_eje(eje, por_tipo_cruce):
+    total = sum(por_tipo_cruce.values())
+    return {
+        'id': f'eje:{eje}',
+        'eje_id': eje,
+        'name': TEXTOS_EJES.get(eje, 'SIN EJE'),
+        'group': 'eje',
+        'size': 20,
+        'color': get_eje_color(eje),
+        'total': total,
+        'por_tipo_cruce': por_tipo_cruce,
+        'expandible': total > 0
+    }
+
+def calcular_resumen_eje(eje):
+    """Conteo por tipo de cruce de un clúster (usa el índice eje_id, tipo_cruce)"""
+    filas = db.session.query(
+        EstrategiaFodaCruzado.tipo_cruce, func.count(EstrategiaFodaCruzado.id)
+    ).filter(filtro_eje(eje)).group_by(EstrategiaFodaCruzado.tipo_cruce).all()
+    return nodo_eje(eje, {tipo: total for tipo, total in filas})
+
+def calcular_nodos_eje(eje, despues, limite):
+    """Una página de estrategias del clúster en orden (tipo_cruce, id), más su enlace al eje"""
+    query = db.session.query(
+        EstrategiaFodaCruzado.id,
+        EstrategiaFodaCruzado.tipo_cruce,
+        EstrategiaFodaCruzado.estrategia
+    ).filter(filtro_eje(eje))
+    if despues:
+        query = query.filter(
+            tuple_(EstrategiaFodaCruzado.tipo_cruce, EstrategiaFodaCruzado.id) > (despues['tipo_cruce'], int(despues['id']))
+        )
+    filas = query.order_by(EstrategiaFodaCruzado.tipo_cruce, EstrategiaFodaCruzado.id).limit(limite + 1).all()
+    
+    nodos = []
+    enlaces = []
+    for id_, tipo_cruce, estrategia in filas[:limite]:
+        nodos.append({
+            'id': f'estrategia:{id_}',
+            'estrategia_id': id_,
+            'name': f"{tipo_cruce} - {estrategia[:30]}...",
+            'group': 'estrategia',
+            'tipo_cruce': tipo_cruce,
+            'size': 10,
+            'color': get_tipo_cruce_color(tipo_cruce)
+        })
+        enlaces.append({'source': f'eje:{eje}', 'target': f'estrategia:{id_}', 'value': 2})
+    
+    siguiente = None
+    if len(filas) > limite:
+        id_, tipo_cruce, _ = filas[limite - 1]
+        siguiente = codificar_cursor({'tipo_cruce': tipo_cruce, 'id': id_})
+    
+    return {'nodos': nodos, 'enlaces': enlaces, 'siguiente': siguiente}
+
+@app.route('/api/red/grafo')
+@login_required
+@respuesta_condicional('estrategias')
+def api_red_grafo():
+    """Grafo de estrategias por eje con nivel de detalle
+    
+    Sin parámetros devuelve un nodo por eje con su total y conteo por tipo de
+    cruce. Con ?eje=<id> expande ese eje: devuelve sus estrategias y enlaces de
+    a 'limite' nodos; 'siguiente' es el cursor de la página que sigue.
+    Cada eje se cachea por separado y solo se recalcula el que cambió.
+    """
     try:
-        # Obtener datos para el mapa de red
-        estrategias = EstrategiaFodaCruzado.query.all()
-        
-        # Preparar datos para visualización de red
-        nodos = []
-        enlaces = []
-        
-        # Agregar nodos por eje
-        ejes_unicos = set()
-        for estrategia in estrategias:
-            if estrategia.eje_id:
-                ejes_unicos.add((estrategia.eje_id, estrategia.eje_texto))
-        
-        # Crear nodos de ejes
-        eje_ids = {}
-        for i, (eje_id, eje_texto) in enumerate(ejes_unicos):
-            eje_ids[eje_id] = i
-            nodos.append({
-                'id': i,
-                'name': eje_texto,
-                'group': 'eje',
-                'size': 20,
-                'color': get_eje_color(eje_id)
-            })
+        eje = request.args.get('eje')
         
-        # Agregar nodos de estrategias y enlaces
-        for i, estrategia in enumerate(estrategias):
-            nodo_id = i + len(ejes_unicos)
-            nodos.append({
-                'id': nodo_id,
-                'name': f"{estrategia.tipo_cruce} - {estrategia.estrategia[:30]}...",
-                'group': 'estrategia',
-                'size': 10,
-                'color': get_tipo_cruce_color(estrategia.tipo_cruce)
+        if not eje:
+            nodos = [
+                vista_cacheada(f'red_eje:{e}', (etiqueta_eje(e),), lambda e=e: calcular_resumen_eje(e))
+                for e in EJES_VALIDOS + [SIN_EJE]
+            ]
+            return jsonify({
+                'success': True,
+                'nivel': 'ejes',
+                'nodos': nodos,
+                'enlaces': [],
+                'total_estrategias': sum(n['total'] for n in nodos)
             })
-            
-            # Crear enlace con eje si existe
-            if estrategia.eje_id and estrategia.eje_id in eje_ids:
-                enlaces.append({
-                    'source': eje_ids[estrategia.eje_id],
-                    'target': nodo_id,
-                    'value': 2
-                })
         
-        return render_template('red.html',
-                             total_nodos=len(nodos),
-                             total_enlaces=len(enlaces),
-                             total_estrategias=len(estrategias),
-                             nodos_json=jsonify(nodos).get_data(as_text=True),
-                             enlaces_json=jsonify(enlaces).get_data(as_text=True))
+        if eje not in EJES_VALIDOS and eje != SIN_EJE:
+            return jsonify({'success': False, 'message': 'Eje inválido'}), 400
+        
+        limite = max(1, min(request.args.get('limite', GRAFO_LIMITE, type=int), GRAFO_LIMITE_MAX))
+        cursor = request.args.get('cursor')
+        despues = decodificar_cursor(cursor) if cursor else None
+        if cursor and (not despues or 'tipo_cruce' not in despues or 'id' not in despues):
+            return jsonify({'success': False, 'message': 'Cursor inválido'}), 400
+        
+        resumen = vista_cacheada(f'red_eje:{eje}', (etiqueta_eje(eje),), lambda: calcular_resumen_eje(eje))
+        if despues:
+            pagina = calcular_nodos_eje(eje, despues, limite)
+        else:
+            # La primera página es la que se pide al expandir: se cachea con el eje
+            pagina = vista_cacheada(
+                f'red_eje_nodos:{eje}:{limite}', (etiqueta_eje(eje),), lambda: calcular_nodos_eje(eje, None, limite)
+            )
+        
+        return jsonify(dict(pagina, success=True, nivel='eje', eje=resumen))
+        
     except Exception as e:
-        print(f"Error en red: {e}")
-        # Si hay error, devolver página vacía
-        return render_template('red.html',
-                             total_nodos=0,
-                             total_enlaces=0,
-                             total_estrategias=0,
-                             nodos_json='[]',
-                             enlaces_json='[]')
-
-# Funciones auxiliares para colores
+        print(f"Error en api_red_grafo: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 def get_eje_color(eje_id):
     colores = {
         'educacion': '#4CAF50',
@@ -489,6 +2329,7 @@ def crear_aspecto():
             )
             db.session.add(nuevo_aspecto)
             db.session.commit()
+            invalidar_cache('aspectos')
             return redirect(url_for('listar_aspectos'))
         except Exception as e:
             db.session.rollback()
@@ -509,6 +2350,7 @@ def editar_aspecto(id):
             aspecto.aspecto = request.form.get('aspecto')
             aspecto.fuente = request.form.get('fuente')
             db.session.commit()
+            invalidar_cache('aspectos')
             return redirect(url_for('listar_aspectos'))
         except Exception as e:
             db.session.rollback()
@@ -526,33 +2368,26 @@ def eliminar_aspecto(id):
     aspecto = AspectoAmbiental.query.get_or_404(id)
     db.session.delete(aspecto)
     db.session.commit()
+    invalidar_cache('aspectos')
     return redirect(url_for('listar_aspectos'))
 
 # API para aspectos ambientales (JSON)
 @app.route('/api/aspectos')
 @login_required
+@respuesta_condicional('aspectos')
 def api_aspectos():
     """API para obtener aspectos en formato JSON"""
     # Filtrar por fuente si se especifica
     fuente = request.args.get('fuente')
     
-    query = AspectoAmbiental.query
+    query = con_creador(AspectoAmbiental.query, AspectoAmbiental)
     
     if fuente:
         query = query.filter_by(fuente=fuente)
     
     aspectos = query.order_by(AspectoAmbiental.created_at.desc()).all()
     
-    return jsonify([{
-        'id': a.id,
-        'actividad': a.actividad,
-        'tipo': a.tipo,
-        'aspecto': a.aspecto,
-        'fuente': a.fuente,
-        'created_at': a.created_at.isoformat() if a.created_at else None,
-        'updated_at': a.updated_at.isoformat() if a.updated_at else None,
-        'creador': a.creador.username if a.creador else None
-    } for a in aspectos])
+    return jsonify([serializar_aspecto(a) for a in aspectos])
 
 # ==================== RUTAS ESPECÍFICAS PARA FODA EXTERNO ====================
 
@@ -561,36 +2396,7 @@ def api_aspectos():
 def fodaext():
     """Página para análisis FODA Externo"""
     try:
-        # Obtener aspectos para FODA Externo (fuente = 'foda_ext') para la matriz
-        aspectos_lista = AspectoAmbiental.query.filter_by(
-            fuente='foda_ext'
-        ).order_by(
-            AspectoAmbiental.aspecto,  # Primero orden por aspecto
-            AspectoAmbiental.created_at.desc()  # Luego por fecha
-        ).all()
-        
-        # Obtener historial mixto (foda_ext y canva) - últimos 20
-        historial_actividades = AspectoAmbiental.query.filter(
-            or_(
-                AspectoAmbiental.fuente == 'foda_ext',
-                AspectoAmbiental.fuente == 'canva'
-            )
-        ).order_by(
-            AspectoAmbiental.created_at.desc()
-        ).limit(20).all()
-        
-        # Crear diccionario para estadísticas
-        estadisticas = {
-            'total': len(aspectos_lista),
-            'positivos': len([a for a in aspectos_lista if a.tipo == 'Positivo']),
-            'negativos': len([a for a in aspectos_lista if a.tipo == 'Negativo']),
-            'historial_total': len(historial_actividades)
-        }
-        
-        return render_template('fodaext.html', 
-                             aspectos_lista=aspectos_lista,
-                             historial_actividades=historial_actividades,
-                             estadisticas=estadisticas)
+        return render_template('fodaext.html', **vista_cacheada('fodaext', ('aspectos',), calcular_vista_fodaext))
         
     except Exception as e:
         print(f"Error en fodaext: {e}")
@@ -599,6 +2405,39 @@ def fodaext():
                              historial_actividades=[],
                              estadisticas={'total': 0, 'positivos': 0, 'negativos': 0, 'historial_total': 0})
 
+def calcular_vista_fodaext():
+    # Obtener aspectos para FODA Externo (fuente = 'foda_ext') para la matriz
+    aspectos_lista = AspectoAmbiental.query.filter_by(
+        fuente='foda_ext'
+    ).order_by(
+        AspectoAmbiental.aspecto,  # Primero orden por aspecto
+        AspectoAmbiental.created_at.desc()  # Luego por fecha
+    ).all()
+    
+    # Obtener historial mixto (foda_ext y canva) - últimos 20
+    historial_actividades = AspectoAmbiental.query.filter(
+        or_(
+            AspectoAmbiental.fuente == 'foda_ext',
+            AspectoAmbiental.fuente == 'canva'
+        )
+    ).order_by(
+        AspectoAmbiental.created_at.desc()
+    ).limit(20).all()
+    
+    # Crear diccionario para estadísticas
+    estadisticas = {
+        'total': len(aspectos_lista),
+        'positivos': len([a for a in aspectos_lista if a.tipo == 'Positivo']),
+        'negativos': len([a for a in aspectos_lista if a.tipo == 'Negativo']),
+        'historial_total': len(historial_actividades)
+    }
+    
+    return {
+        'aspectos_lista': [registro_a_dict(a) for a in aspectos_lista],
+        'historial_actividades': [registro_a_dict(a) for a in historial_actividades],
+        'estadisticas': estadisticas
+    }
+
 @app.route('/guardar_foda_ext', methods=['POST'])
 @login_required
 def guardar_foda_ext():
@@ -616,9 +2455,7 @@ def guardar_foda_ext():
         if not data.get('tipo') or data.get('tipo') not in ['Positivo', 'Negativo']:
             return jsonify({'success': False, 'message': 'Tipo inválido'}), 400
         
-        if not data.get('aspecto') or data.get('aspecto') not in [
-            'POLITICO', 'ECONOMICO', 'SOCIAL', 'TECNOLOGICO', 'ECOLOGICO', 'LEGAL'
-        ]:
+        if not data.get('aspecto') or data.get('aspecto') not in ASPECTOS_FODA_EXT:
             return jsonify({'success': False, 'message': 'Aspecto inválido'}), 400
         
         # Crear nuevo aspecto
@@ -632,6 +2469,7 @@ def guardar_foda_ext():
         
         db.session.add(nuevo_aspecto)
         db.session.commit()
+        invalidar_cache('aspectos')
         
         return jsonify({
             'success': True,
@@ -662,46 +2500,10 @@ def guardar_matriz_foda():
         data = request.get_json()
         actividades = data.get('actividades', [])
         
-        if not actividades:
+        if not actividades or not isinstance(actividades, list):
             return jsonify({'success': False, 'message': 'No hay actividades para guardar'}), 400
         
-        actividades_guardadas = 0
-        
-        for actividad_data in actividades:
-            # Validar campos requeridos
-            if not actividad_data.get('actividad'):
-                continue
-            
-            if not actividad_data.get('tipo') or actividad_data.get('tipo') not in ['Positivo', 'Negativo']:
-                continue
-            
-            if not actividad_data.get('aspecto_nuevo') or actividad_data.get('aspecto_nuevo') not in [
-                'POLITICO', 'ECONOMICO', 'SOCIAL', 'TECNOLOGICO', 'ECOLOGICO', 'LEGAL'
-            ]:
-                continue
-            
-            # Crear nuevo registro en la tabla de AspectoAmbiental
-            nueva_actividad = AspectoAmbiental(
-                actividad=actividad_data['actividad'],
-                tipo=actividad_data['tipo'],
-                aspecto=actividad_data['aspecto_nuevo'],
-                fuente='foda_ext',
-                created_by=session['user_id']
-            )
-            db.session.add(nueva_actividad)
-            actividades_guardadas += 1
-        
-        if actividades_guardadas > 0:
-            db.session.commit()
-            return jsonify({
-                'success': True, 
-                'message': f'✅ {actividades_guardadas} actividades guardadas en la matriz FODA'
-            })
-        else:
-            return jsonify({
-                'success': False, 
-                'message': 'No se pudo guardar ninguna actividad (datos inválidos)'
-            }), 400
+        return respuesta_lote_aspectos(actividades, 'foda_ext', ASPECTOS_FODA_EXT, 'la matriz FODA')
         
     except Exception as e:
         db.session.rollback()
@@ -715,33 +2517,7 @@ def guardar_matriz_foda():
 def fodaint():
     """Página para análisis FODA Interno"""
     try:
-        # Obtener aspectos para FODA Interno (fuente = 'foda_int')
-        aspectos_lista = AspectoAmbiental.query.filter_by(
-            fuente='foda_int'
-        ).order_by(
-            AspectoAmbiental.aspecto,
-            AspectoAmbiental.created_at.desc()
-        ).all()
-        
-        # Obtener historial de CANVA para arrastrar
-        historial_actividades = AspectoAmbiental.query.filter_by(
-            fuente='canva'
-        ).order_by(
-            AspectoAmbiental.created_at.desc()
-        ).limit(20).all()
-        
-        # Estadísticas
-        estadisticas = {
-            'total': len(aspectos_lista),
-            'positivos': len([a for a in aspectos_lista if a.tipo == 'Positivo']),
-            'negativos': len([a for a in aspectos_lista if a.tipo == 'Negativo']),
-            'historial_total': len(historial_actividades)
-        }
-        
-        return render_template('fodaint.html', 
-                             aspectos_lista=aspectos_lista,
-                             historial_actividades=historial_actividades,
-                             estadisticas=estadisticas)
+        return render_template('fodaint.html', **vista_cacheada('fodaint', ('aspectos',), calcular_vista_fodaint))
         
     except Exception as e:
         print(f"Error en fodaint: {e}")
@@ -750,6 +2526,36 @@ def fodaint():
                              historial_actividades=[],
                              estadisticas={'total': 0, 'positivos': 0, 'negativos': 0, 'historial_total': 0})
 
+def calcular_vista_fodaint():
+    # Obtener aspectos para FODA Interno (fuente = 'foda_int')
+    aspectos_lista = AspectoAmbiental.query.filter_by(
+        fuente='foda_int'
+    ).order_by(
+        AspectoAmbiental.aspecto,
+        AspectoAmbiental.created_at.desc()
+    ).all()
+    
+    # Obtener historial de CANVA para arrastrar
+    historial_actividades = AspectoAmbiental.query.filter_by(
+        fuente='canva'
+    ).order_by(
+        AspectoAmbiental.created_at.desc()
+    ).limit(20).all()
+    
+    # Estadísticas
+    estadisticas = {
+        'total': len(aspectos_lista),
+        'positivos': len([a for a in aspectos_lista if a.tipo == 'Positivo']),
+        'negativos': len([a for a in aspectos_lista if a.tipo == 'Negativo']),
+        'historial_total': len(historial_actividades)
+    }
+    
+    return {
+        'aspectos_lista': [registro_a_dict(a) for a in aspectos_lista],
+        'historial_actividades': [registro_a_dict(a) for a in historial_actividades],
+        'estadisticas': estadisticas
+    }
+
 @app.route('/guardar_foda_int', methods=['POST'])
 @login_required
 def guardar_foda_int():
@@ -768,17 +2574,7 @@ def guardar_foda_int():
             return jsonify({'success': False, 'message': 'Tipo inválido'}), 400
         
         # Validar aspectos internos
-        aspectos_validos = [
-            'ADMINISTRACIÓN Y GERENCIA',
-            'MARKETING Y VENTAS', 
-            'OPERACIONES Y LOGÍSTICA',
-            'FINANZAS Y CONTABILIDAD',
-            'RECURSOS HUMANOS',
-            'SISTEMAS DE INFORMACIÓN',
-            'TECNOLOGÍA'
-        ]
-        
-        if not data.get('aspecto') or data.get('aspecto') not in aspectos_validos:
+        if not data.get('aspecto') or data.get('aspecto') not in ASPECTOS_FODA_INT:
             return jsonify({'success': False, 'message': 'Aspecto inválido'}), 400
         
         # Crear nuevo aspecto
@@ -792,6 +2588,7 @@ def guardar_foda_int():
         
         db.session.add(nuevo_aspecto)
         db.session.commit()
+        invalidar_cache('aspectos')
         
         return jsonify({
             'success': True,
@@ -816,28 +2613,16 @@ def guardar_foda_int():
 def guardar_matriz_foda_int():
     """Guardar actividades arrastradas desde CANVA a la matriz FODA Interno"""
     try:
+        if not request.is_json:
+            return jsonify({'success': False, 'message': 'Formato no soportado'}), 400
+        
         data = request.get_json()
         actividades = data.get('actividades', [])
         
-        if not actividades:
-            return jsonify({'success': False, 'message': 'No hay actividades para guardar'})
-        
-        for actividad_data in actividades:
-            # Crear nuevo registro en la tabla de AspectoAmbiental
-            nueva_actividad = AspectoAmbiental(
-                actividad=actividad_data['actividad'],
-                tipo=actividad_data['tipo'],
-                aspecto=actividad_data['aspecto_nuevo'],  # El nuevo aspecto asignado
-                fuente='foda_int',  # Fuente específica para FODA Interno
-                created_by=session['user_id']
-            )
-            db.session.add(nueva_actividad)
+        if not actividades or not isinstance(actividades, list):
+            return jsonify({'success': False, 'message': 'No hay actividades para guardar'}), 400
         
-        db.session.commit()
-        return jsonify({
-            'success': True, 
-            'message': f'{len(actividades)} actividades guardadas en la matriz FODA Interno'
-        })
+        return respuesta_lote_aspectos(actividades, 'foda_int', ASPECTOS_FODA_INT, 'la matriz FODA Interno')
         
     except Exception as e:
         db.session.rollback()
@@ -862,6 +2647,7 @@ def eliminar_foda_ext(id):
         
         db.session.delete(aspecto)
         db.session.commit()
+        invalidar_cache('aspectos')
         
         return jsonify({'success': True, 'message': 'Actividad eliminada correctamente'})
         
@@ -897,23 +2683,15 @@ def guardar_estrategia_foda():
         if data.get('tipo_cruce') not in ['FO', 'DO', 'FA', 'DA']:
             return jsonify({'success': False, 'message': 'Tipo de cruce inválido'}), 400
         
-        # Crear nueva estrategia (los ejes pueden ser None)
-        nueva_estrategia = EstrategiaFodaCruzado(
-            tipo_cruce=data['tipo_cruce'],
-            elemento_interno_id=data['elemento_interno_id'],
-            elemento_interno_tipo=data['elemento_interno_tipo'],
-            elemento_interno_texto=data['elemento_interno_texto'],
-            elemento_externo_id=data['elemento_externo_id'],
-            elemento_externo_tipo=data['elemento_externo_tipo'],
-            elemento_externo_texto=data['elemento_externo_texto'],
-            estrategia=data['estrategia'],
-            eje_id=data.get('eje_id'),  # Opcional
-            eje_texto=data.get('eje_texto'),  # Opcional
-            creador_id=session['user_id']
-        )
+        interno, externo = elementos_de_pareja(data)
+        error = validar_aspectos_cruce([interno, externo])
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
         
-        db.session.add(nueva_estrategia)
+        # Crear nueva estrategia (los ejes pueden ser None)
+        nueva_estrategia = crear_estrategia(data, [interno], [externo])
         db.session.commit()
+        invalidar_cache('estrategias')
         
         return jsonify({
             'success': True,
@@ -931,6 +2709,10 @@ def guardar_estrategia_foda():
         print(f"Error al guardar estrategia FODA cruzado: {e}")
         return jsonify({'success': False, 'message': f'Error del servidor: {str(e)}'}), 500
 
+TIPOS_CRUCE = ['FO', 'DO', 'FA', 'DA']
+EJES_VALIDOS = ['educacion', 'salud', 'empleabilidad', 'desarrollo_economico',
+                'sostenibilidad_ambiental', 'comunicacion', 'institucional']
+
 @app.route('/guardar_estrategia_foda_con_eje', methods=['POST'])
 @login_required
 def guardar_estrategia_foda_con_eje():
@@ -953,32 +2735,22 @@ def guardar_estrategia_foda_con_eje():
                 return jsonify({'success': False, 'message': f'Campo {campo} es obligatorio'}), 400
         
         # Validar tipo de cruce
-        if data.get('tipo_cruce') not in ['FO', 'DO', 'FA', 'DA']:
+        if data.get('tipo_cruce') not in TIPOS_CRUCE:
             return jsonify({'success': False, 'message': 'Tipo de cruce inválido'}), 400
         
         # Validar eje
-        ejes_validos = ['educacion', 'salud', 'empleabilidad', 'desarrollo_economico', 
-                       'sostenibilidad_ambiental', 'comunicacion', 'institucional']
-        if data.get('eje_id') not in ejes_validos:
+        if data.get('eje_id') not in EJES_VALIDOS:
             return jsonify({'success': False, 'message': 'Eje estratégico inválido'}), 400
         
-        # Crear nueva estrategia
-        nueva_estrategia = EstrategiaFodaCruzado(
-            tipo_cruce=data['tipo_cruce'],
-            elemento_interno_id=data['elemento_interno_id'],
-            elemento_interno_tipo=data['elemento_interno_tipo'],
-            elemento_interno_texto=data['elemento_interno_texto'],
-            elemento_externo_id=data['elemento_externo_id'],
-            elemento_externo_tipo=data['elemento_externo_tipo'],
-            elemento_externo_texto=data['elemento_externo_texto'],
-            estrategia=data['estrategia'],
-            eje_id=data['eje_id'],
-            eje_texto=data['eje_texto'],
-            creador_id=session['user_id']
-        )
+        interno, externo = elementos_de_pareja(data)
+        error = validar_aspectos_cruce([interno, externo])
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
         
-        db.session.add(nueva_estrategia)
+        # Crear nueva estrategia
+        nueva_estrategia = crear_estrategia(data, [interno], [externo])
         db.session.commit()
+        invalidar_cache('estrategias')
         
         return jsonify({
             'success': True,
@@ -998,31 +2770,198 @@ def guardar_estrategia_foda_con_eje():
         print(f"Error al guardar estrategia FODA cruzado: {e}")
         return jsonify({'success': False, 'message': f'Error del servidor: {str(e)}'}), 500
 
+def id_aspecto(valor):
+    """Id entero de un elemento (el cliente lo envía como texto) o None si no es válido"""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+def aspectos_existentes(ids):
+    """Los ids de la lista que corresponden a aspectos existentes"""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return set()
+    return {i for (i,) in db.session.query(AspectoAmbiental.id).filter(AspectoAmbiental.id.in_(ids))}
+
+def elementos_de_pareja(data):
+    """Elemento interno y externo de una petición con el formato de una sola pareja"""
+    return tuple(
+        {'id': data[f'elemento_{rol}_id'], 'tipo': data[f'elemento_{rol}_tipo'], 'texto': data[f'elemento_{rol}_texto']}
+        for rol in ('interno', 'externo')
+    )
+
+def validar_aspectos_cruce(elementos):
+    """Motivo de rechazo si algún elemento no es un aspecto existente, o None"""
+    ids = [id_aspecto(e['id']) for e in elementos]
+    if None in ids:
+        return 'Id de elemento inválido'
+    if aspectos_existentes(ids) != set(ids):
+        return 'Elemento FODA no encontrado'
+    return None
+
+def crear_estrategia(datos, internos, externos):
+    """Añade a la sesión una estrategia enlazada a sus elementos internos y externos
+    
+    Los elementos ({id, tipo, texto}) deben venir validados. Las columnas
+    heredadas elemento_* guardan el primer interno y el primer externo.
+    """
+    estrategia = EstrategiaFodaCruzado(
+        tipo_cruce=datos['tipo_cruce'],
+        elemento_interno_id=id_aspecto(internos[0]['id']),
+        elemento_interno_tipo=internos[0]['tipo'],
+        elemento_interno_texto=internos[0]['texto'],
+        elemento_externo_id=id_aspecto(externos[0]['id']),
+        elemento_externo_tipo=externos[0]['tipo'],
+        elemento_externo_texto=externos[0]['texto'],
+        estrategia=datos['estrategia'],
+        eje_id=datos.get('eje_id'),
+        eje_texto=datos.get('eje_texto'),
+        creador_id=session['user_id']
+    )
+    
+    enlazados = set()
+    for rol, elementos in (('interno', internos), ('externo', externos)):
+        for elemento in elementos:
+            clave = (rol, id_aspecto(elemento['id']))
+            if clave not in enlazados:
+                enlazados.add(clave)
+                estrategia.elementos.append(EstrategiaElemento(
+                    rol=rol, aspecto_id=clave[1], tipo=elemento['tipo'], texto=elemento['texto']
+                ))
+    
+    db.session.add(estrategia)
+    return estrategia
+
+def validar_elemento_cruce(elemento):
+    """Devuelve el motivo de rechazo de un elemento interno/externo o None si es válido"""
+    if not isinstance(elemento, dict):
+        return 'Elemento con formato inválido'
+    for campo in ('id', 'tipo', 'texto'):
+        if not elemento.get(campo):
+            return f'Campo {campo} es obligatorio'
+    if id_aspecto(elemento['id']) is None:
+        return 'Id de elemento inválido'
+    if len(str(elemento['texto'])) > 500:
+        return 'El texto del elemento supera los 500 caracteres'
+    return None
+
+@app.route('/guardar_estrategias_foda_con_eje_lote', methods=['POST'])
+@login_required
+def guardar_estrategias_foda_con_eje_lote():
+    """Guardar una estrategia que cruza varios elementos internos y externos
+    
+    Valida una vez los campos comunes y cada elemento, y guarda una sola
+    estrategia enlazada a los elementos válidos (todas sus combinaciones
+    interno x externo). Devuelve el resultado de cada pareja en el orden del
+    producto cruzado.
+    """
+    try:
+        if not request.is_json:
+            return jsonify({'success': False, 'message': 'Formato no soportado'}), 400
+        
+        data = request.get_json()
+        
+        for campo in ('tipo_cruce', 'estrategia', 'eje_id', 'eje_texto'):
+            if not data.get(campo):
+                return jsonify({'success': False, 'message': f'Campo {campo} es obligatorio'}), 400
+        
+        if data.get('tipo_cruce') not in TIPOS_CRUCE:
+            return jsonify({'success': False, 'message': 'Tipo de cruce inválido'}), 400
+        
+        if data.get('eje_id') not in EJES_VALIDOS:
+            return jsonify({'success': False, 'message': 'Eje estratégico inválido'}), 400
+        
+        internos = data.get('internos') or []
+        externos = data.get('externos') or []
+        if not isinstance(internos, list) or not isinstance(externos, list) or not internos or not externos:
+            return jsonify({'success': False, 'message': 'Debe enviar al menos un elemento interno y uno externo'}), 400
+        
+        if len(internos) * len(externos) > ESTRATEGIAS_LOTE_MAX:
+            return jsonify({
+                'success': False,
+                'message': f'Demasiadas combinaciones ({len(internos) * len(externos)}); máximo {ESTRATEGIAS_LOTE_MAX}'
+            }), 400
+        
+        errores_internos = [validar_elemento_cruce(e) for e in internos]
+        errores_externos = [validar_elemento_cruce(e) for e in externos]
+        
+        # Los elementos se enlazan con clave foránea: deben ser aspectos existentes
+        existentes = aspectos_existentes(
+            id_aspecto(e['id']) for e, error in zip(internos + externos, errores_internos + errores_externos) if not error
+        )
+        for elementos, errores in ((internos, errores_internos), (externos, errores_externos)):
+            for i, elemento in enumerate(elementos):
+                if not errores[i] and id_aspecto(elemento['id']) not in existentes:
+                    errores[i] = 'Elemento FODA no encontrado'
+        
+        resultados = []
+        for i, interno in enumerate(internos):
+            for j, externo in enumerate(externos):
+                resultado = {
+                    'elemento_interno_id': interno.get('id') if isinstance(interno, dict) else None,
+                    'elemento_externo_id': externo.get('id') if isinstance(externo, dict) else None
+                }
+                error = errores_internos[i] or errores_externos[j]
+                if error:
+                    resultado.update({'success': False, 'message': error})
+                else:
+                    resultado['success'] = True
+                resultados.append(resultado)
+        
+        internos_validos = [e for e, error in zip(internos, errores_internos) if not error]
+        externos_validos = [e for e, error in zip(externos, errores_externos) if not error]
+        
+        estrategia_id = None
+        if internos_validos and externos_validos:
+            estrategia = crear_estrategia(data, internos_validos, externos_validos)
+            db.session.commit()
+            invalidar_cache('estrategias')
+            
+            estrategia_id = estrategia.id
+            for resultado in resultados:
+                if resultado['success']:
+                    resultado['id'] = estrategia_id
+        
+        guardadas = sum(1 for r in resultados if r['success'])
+        if guardadas:
+            mensaje = f'✅ Estrategia guardada con {guardadas} combinaciones'
+            if guardadas < len(resultados):
+                mensaje += f', {len(resultados) - guardadas} rechazadas'
+        else:
+            mensaje = f'Ninguna combinación válida: {resultados[0]["message"]}'
+        
+        return jsonify({
+            'success': guardadas > 0,
+            'message': mensaje,
+            'id': estrategia_id,
+            'guardadas': guardadas,
+            'rechazadas': len(resultados) - guardadas,
+            'resultados': resultados
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al guardar estrategias FODA cruzado en lote: {e}")
+        return jsonify({'success': False, 'message': f'Error del servidor: {str(e)}'}), 500
+
 @app.route('/api/estrategias_foda')
 @login_required
+@respuesta_condicional('estrategias', 'aspectos')
 def api_estrategias_foda():
     """API para obtener estrategias FODA cruzado (incluye ejes si existen)"""
     try:
-        estrategias = EstrategiaFodaCruzado.query.order_by(
+        estrategias = con_elementos(con_creador(EstrategiaFodaCruzado.query, EstrategiaFodaCruzado)).order_by(
             EstrategiaFodaCruzado.fecha_creacion.desc()
         ).all()
         
         estrategias_data = []
         for e in estrategias:
-            estrategias_data.append({
-                'tipo_cruce': e.tipo_cruce,
-                'elemento_interno_id': e.elemento_interno_id,
-                'elemento_interno_tipo': e.elemento_interno_tipo,
-                'elemento_interno_texto': e.elemento_interno_texto,
-                'elemento_externo_id': e.elemento_externo_id,
-                'elemento_externo_tipo': e.elemento_externo_tipo,
-                'elemento_externo_texto': e.elemento_externo_texto,
-                'estrategia': e.estrategia,
-                'eje_id': e.eje_id,
-                'eje_texto': e.eje_texto,
-                'fecha': e.fecha_creacion.isoformat() if e.fecha_creacion else None,
-                'creador': e.creador.username if e.creador else None
-            })
+            # Formato histórico de esta API: sin id y con la fecha en 'fecha'
+            estrategia_data = serializar_estrategia(e)
+            del estrategia_data['id']
+            estrategia_data['fecha'] = estrategia_data.pop('fecha_creacion')
+            estrategias_data.append(estrategia_data)
         
         return jsonify({'success': True, 'estrategias': estrategias_data})
         
@@ -1032,32 +2971,17 @@ def api_estrategias_foda():
 
 @app.route('/api/estrategias_foda_con_eje')
 @login_required
+@respuesta_condicional('estrategias', 'aspectos')
 def api_estrategias_foda_con_eje():
-    """API para obtener estrategias FODA cruzado con eje"""
+    """API para obtener estrategias FODA cruzado con eje, ya agrupadas con sus elementos"""
     try:
-        estrategias = EstrategiaFodaCruzado.query.filter(
+        estrategias = con_elementos(con_creador(EstrategiaFodaCruzado.query, EstrategiaFodaCruzado)).filter(
             EstrategiaFodaCruzado.eje_id.isnot(None)
         ).order_by(
             EstrategiaFodaCruzado.fecha_creacion.desc()
         ).all()
         
-        estrategias_data = []
-        for e in estrategias:
-            estrategias_data.append({
-                'id': e.id,
-                'tipo_cruce': e.tipo_cruce,
-                'elemento_interno_id': e.elemento_interno_id,
-                'elemento_interno_tipo': e.elemento_interno_tipo,
-                'elemento_interno_texto': e.elemento_interno_texto,
-                'elemento_externo_id': e.elemento_externo_id,
-                'elemento_externo_tipo': e.elemento_externo_tipo,
-                'elemento_externo_texto': e.elemento_externo_texto,
-                'estrategia': e.estrategia,
-                'eje_id': e.eje_id,
-                'eje_texto': e.eje_texto,
-                'fecha_creacion': e.fecha_creacion.isoformat() if e.fecha_creacion else None,
-                'creador': e.creador.username if e.creador else None
-            })
+        estrategias_data = [serializar_estrategia(e) for e in estrategias]
         
         return jsonify({'success': True, 'estrategias': estrategias_data})
         
@@ -1065,6 +2989,34 @@ def api_estrategias_foda_con_eje():
         print(f"Error en api_estrategias_foda_con_eje: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/estrategias/buscar')
+@login_required
+@respuesta_condicional('estrategias', 'aspectos')
+def api_buscar_estrategias():
+    """API para buscar estrategias FODA cruzado por texto, ordenadas por relevancia"""
+    try:
+        termino = request.args.get('q', '').strip()
+        limite = min(request.args.get('limite', 50, type=int), 200)
+        
+        if not termino:
+            return jsonify({'success': True, 'estrategias': []})
+        
+        query, relevancia = aplicar_busqueda(
+            con_elementos(con_creador(EstrategiaFodaCruzado.query, EstrategiaFodaCruzado)), 'estrategias', termino
+        )
+        if relevancia is not None:
+            query = query.order_by(relevancia.desc(), EstrategiaFodaCruzado.fecha_creacion.desc())
+        else:
+            query = query.order_by(EstrategiaFodaCruzado.fecha_creacion.desc())
+        
+        estrategias_data = [serializar_estrategia(e) for e in query.limit(limite).all()]
+        
+        return jsonify({'success': True, 'estrategias': estrategias_data})
+        
+    except Exception as e:
+        print(f"Error en api_buscar_estrategias: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/eliminar_estrategia_foda/<int:id>', methods=['POST'])
 @login_required
 def eliminar_estrategia_foda(id):
@@ -1078,6 +3030,7 @@ def eliminar_estrategia_foda(id):
         
         db.session.delete(estrategia)
         db.session.commit()
+        invalidar_cache('estrategias', 'actividades', 'tareas')
         
         return jsonify({'success': True, 'message': 'Estrategia eliminada correctamente'})
         
@@ -1093,19 +3046,7 @@ def eliminar_estrategia_foda(id):
 def cruzado():
     """Página para análisis FODA Cruzado"""
     try:
-        # Obtener aspectos para FODA Externo e Interno
-        aspectos_foda_ext = AspectoAmbiental.query.filter_by(fuente='foda_ext').all()
-        aspectos_foda_int = AspectoAmbiental.query.filter_by(fuente='foda_int').all()
-        
-        # Obtener estrategias existentes
-        estrategias = EstrategiaFodaCruzado.query.order_by(
-            EstrategiaFodaCruzado.fecha_creacion.desc()
-        ).all()
-        
-        return render_template('cruzado.html', 
-                             aspectos_foda_ext=aspectos_foda_ext,
-                             aspectos_foda_int=aspectos_foda_int,
-                             estrategias=estrategias)
+        return render_template('cruzado.html', **vista_cacheada('cruzado', ('aspectos', 'estrategias'), calcular_vista_cruzado))
         
     except Exception as e:
         print(f"Error en cruzado: {e}")
@@ -1114,49 +3055,46 @@ def cruzado():
                              aspectos_foda_int=[],
                              estrategias=[])
 
+def calcular_vista_cruzado():
+    # Obtener aspectos para FODA Externo e Interno
+    aspectos_foda_ext = AspectoAmbiental.query.filter_by(fuente='foda_ext').all()
+    aspectos_foda_int = AspectoAmbiental.query.filter_by(fuente='foda_int').all()
+    
+    # Obtener estrategias existentes
+    estrategias = EstrategiaFodaCruzado.query.order_by(
+        EstrategiaFodaCruzado.fecha_creacion.desc()
+    ).all()
+    
+    return {
+        'aspectos_foda_ext': [registro_a_dict(a) for a in aspectos_foda_ext],
+        'aspectos_foda_int': [registro_a_dict(a) for a in aspectos_foda_int],
+        'estrategias': [registro_a_dict(e) for e in estrategias]
+    }
+
 # ==================== RUTAS ESPECÍFICAS PARA CANVA ====================
 
 @app.route('/canvas')
 @login_required
 def canvas():
-    # Definir los bloques del CANVA
-    bloques_canva = [
-        {'nombre': 'Mapeo de Actores y Comunidades Afectadas', 'icono': 'fas fa-users'},
-        {'nombre': 'Propuesta de Valor', 'icono': 'fas fa-gem'},
-        {'nombre': 'Canales', 'icono': 'fas fa-broadcast-tower'},
-        {'nombre': 'Relación con Actores', 'icono': 'fas fa-handshake'},
-        {'nombre': 'Fuentes de Ingreso', 'icono': 'fas fa-money-bill-wave'},
-        {'nombre': 'Recursos Clave', 'icono': 'fas fa-tools'},
-        {'nombre': 'Actividades Clave', 'icono': 'fas fa-tasks'},
-        {'nombre': 'Socios Clave', 'icono': 'fas fa-handshake'},
-        {'nombre': 'Estructura de Costes', 'icono': 'fas fa-calculator'}
-    ]
-    
+    return render_template('canvas.html',
+                         bloques_canva=BLOQUES_CANVA,
+                         **vista_cacheada('canvas', ('aspectos',), calcular_vista_canvas))
+
+def calcular_vista_canvas():
     # Obtener actividades con fuente='canva'
     aspectos_canva = AspectoAmbiental.query.filter_by(fuente='canva').order_by(
         AspectoAmbiental.created_at.desc()
     ).all()
     
-    # Obtener estadísticas
-    total_actividades = AspectoAmbiental.query.filter_by(fuente='canva').count()
-    
-    # Contar positivas y negativas basado en el campo "aspecto"
-    positivas = AspectoAmbiental.query.filter(
-        AspectoAmbiental.fuente == 'canva',
-        AspectoAmbiental.aspecto.like('Positivo:%')
-    ).count()
+    # Estadísticas desde los contadores (positivas/negativas según el prefijo del aspecto)
+    totales = totales_contadores('aspectos', fuente='canva')
     
-    negativas = AspectoAmbiental.query.filter(
-        AspectoAmbiental.fuente == 'canva',
-        AspectoAmbiental.aspecto.like('Negativo:%')
-    ).count()
-    
-    return render_template('canvas.html',
-                         bloques_canva=bloques_canva,
-                         aspectos_canva=aspectos_canva,
-                         total_actividades=total_actividades,
-                         positivas=positivas,
-                         negativas=negativas)
+    return {
+        'aspectos_canva': [registro_a_dict(a) for a in aspectos_canva],
+        'total_actividades': sum(totales.values()),
+        'positivas': totales.get(('canva', 'Positivo'), 0),
+        'negativas': totales.get(('canva', 'Negativo'), 0)
+    }
 
 @app.route('/guardar_actividad_canva', methods=['POST'])
 @login_required
@@ -1189,6 +3127,7 @@ def guardar_actividad_canva():
         
         db.session.add(nuevo_aspecto)
         db.session.commit()
+        invalidar_cache('aspectos')
         
         return jsonify({
             'success': True,
@@ -1217,10 +3156,16 @@ def limpiar_canva():
         return jsonify({'success': False, 'message': 'No autorizado. Solo administradores pueden limpiar el CANVA.'}), 403
     
     try:
+        # Las estrategias que cruzan esos aspectos conservan su texto
+        conservar_textos_elementos(EstrategiaElemento.aspecto_id.in_(
+            db.session.query(AspectoAmbiental.id).filter_by(fuente='canva')
+        ))
         # Eliminar todas las actividades con fuente='canva'
-        num_eliminadas = AspectoAmbiental.query.filter_by(fuente='canva').count()
-        AspectoAmbiental.query.filter_by(fuente='canva').delete()
+        num_eliminadas = AspectoAmbiental.query.filter_by(fuente='canva').delete()
+        # El DELETE masivo no pasa por el flush: sus contadores se borran aquí
+        ContadorResumen.query.filter_by(tabla='aspectos', fuente='canva').delete()
         db.session.commit()
+        invalidar_cache('aspectos')
         return jsonify({
             'success': True, 
             'message': f'✅ CANVA limpiado correctamente ({num_eliminadas} actividades eliminadas)'
@@ -1234,23 +3179,12 @@ def limpiar_canva():
 
 @app.route('/api/actividades')
 @login_required
+@respuesta_condicional('actividades')
 def api_actividades():
     """API para obtener todas las actividades"""
     try:
-        actividades = ActividadEstrategia.query.all()
-        actividades_data = []
-        for a in actividades:
-            actividades_data.append({
-                'id': a.id,
-                'estrategia_id': a.estrategia_id,
-                'nombre': a.nombre,
-                'descripcion': a.descripcion,
-                'responsable': a.responsable,
-                'fecha_inicio': a.fecha_inicio.isoformat() if a.fecha_inicio else None,
-                'fecha_fin': a.fecha_fin.isoformat() if a.fecha_fin else None,
-                'fecha_creacion': a.fecha_creacion.isoformat() if a.fecha_creacion else None,
-                'creador': a.creador.username if a.creador else None
-            })
+        actividades = con_creador(ActividadEstrategia.query, ActividadEstrategia).all()
+        actividades_data = [serializar_actividad(a) for a in actividades]
         return jsonify({'success': True, 'actividades': actividades_data})
     except Exception as e:
         print(f"Error en api_actividades: {e}")
@@ -1258,24 +3192,12 @@ def api_actividades():
 
 @app.route('/api/tareas')
 @login_required
+@respuesta_condicional('tareas')
 def api_tareas():
     """API para obtener todas las tareas"""
     try:
-        tareas = TareaActividad.query.all()
-        tareas_data = []
-        for t in tareas:
-            tareas_data.append({
-                'id': t.id,
-                'actividad_id': t.actividad_id,
-                'nombre': t.nombre,
-                'descripcion': t.descripcion,
-                'responsable': t.responsable,
-                'fecha_inicio': t.fecha_inicio.isoformat() if t.fecha_inicio else None,
-                'fecha_fin': t.fecha_fin.isoformat() if t.fecha_fin else None,
-                'estado': t.estado,
-                'fecha_creacion': t.fecha_creacion.isoformat() if t.fecha_creacion else None,
-                'creador': t.creador.username if t.creador else None
-            })
+        tareas = con_creador(TareaActividad.query, TareaActividad).all()
+        tareas_data = [serializar_tarea(t) for t in tareas]
         return jsonify({'success': True, 'tareas': tareas_data})
     except Exception as e:
         print(f"Error en api_tareas: {e}")
@@ -1283,6 +3205,7 @@ def api_tareas():
 
 @app.route('/api/actividades_estrategia/<int:estrategia_id>')
 @login_required
+@respuesta_condicional('estrategias', 'actividades')
 def api_actividades_estrategia(estrategia_id):
     """API para obtener actividades de una estrategia"""
     try:
@@ -1291,25 +3214,13 @@ def api_actividades_estrategia(estrategia_id):
         if not estrategia:
             return jsonify({'success': False, 'message': 'La estrategia no existe'}), 404
         
-        actividades = ActividadEstrategia.query.filter_by(
+        actividades = con_creador(ActividadEstrategia.query, ActividadEstrategia).filter_by(
             estrategia_id=estrategia_id
         ).order_by(
             ActividadEstrategia.fecha_creacion.desc()
         ).all()
         
-        actividades_data = []
-        for a in actividades:
-            actividades_data.append({
-                'id': a.id,
-                'estrategia_id': a.estrategia_id,
-                'nombre': a.nombre,
-                'descripcion': a.descripcion,
-                'responsable': a.responsable,
-                'fecha_inicio': a.fecha_inicio.isoformat() if a.fecha_inicio else None,
-                'fecha_fin': a.fecha_fin.isoformat() if a.fecha_fin else None,
-                'fecha_creacion': a.fecha_creacion.isoformat() if a.fecha_creacion else None,
-                'creador': a.creador.username if a.creador else None
-            })
+        actividades_data = [serializar_actividad(a) for a in actividades]
         
         return jsonify({'success': True, 'actividades': actividades_data})
         
@@ -1352,6 +3263,7 @@ def api_agregar_actividad():
         
         db.session.add(nueva_actividad)
         db.session.commit()
+        invalidar_cache('actividades')
         
         return jsonify({
             'success': True,
@@ -1381,6 +3293,7 @@ def api_eliminar_actividad(actividad_id):
         # Eliminar la actividad (las tareas se eliminarán en cascada por la relación)
         db.session.delete(actividad)
         db.session.commit()
+        invalidar_cache('actividades', 'tareas')
         
         return jsonify({'success': True, 'message': 'Actividad eliminada correctamente'})
         
@@ -1391,6 +3304,7 @@ def api_eliminar_actividad(actividad_id):
 
 @app.route('/api/tareas_actividad/<int:actividad_id>')
 @login_required
+@respuesta_condicional('actividades', 'tareas')
 def api_tareas_actividad(actividad_id):
     """API para obtener tareas de una actividad"""
     try:
@@ -1399,26 +3313,13 @@ def api_tareas_actividad(actividad_id):
         if not actividad:
             return jsonify({'success': False, 'message': 'La actividad no existe'}), 404
         
-        tareas = TareaActividad.query.filter_by(
+        tareas = con_creador(TareaActividad.query, TareaActividad).filter_by(
             actividad_id=actividad_id
         ).order_by(
             TareaActividad.fecha_creacion.desc()
         ).all()
         
-        tareas_data = []
-        for t in tareas:
-            tareas_data.append({
-                'id': t.id,
-                'actividad_id': t.actividad_id,
-                'nombre': t.nombre,
-                'descripcion': t.descripcion,
-                'responsable': t.responsable,
-                'fecha_inicio': t.fecha_inicio.isoformat() if t.fecha_inicio else None,
-                'fecha_fin': t.fecha_fin.isoformat() if t.fecha_fin else None,
-                'estado': t.estado,
-                'fecha_creacion': t.fecha_creacion.isoformat() if t.fecha_creacion else None,
-                'creador': t.creador.username if t.creador else None
-            })
+        tareas_data = [serializar_tarea(t) for t in tareas]
         
         return jsonify({'success': True, 'tareas': tareas_data})
         
@@ -1426,6 +3327,407 @@ def api_tareas_actividad(actividad_id):
         print(f"Error en api_tareas_actividad: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/estrategias/jerarquia')
+@login_required
+@respuesta_condicional('estrategias', 'actividades', 'tareas')
+def api_estrategias_jerarquia():
+    """API para obtener el árbol estrategia → actividad → tarea (o solo sus agregados)
+    
+    Reemplaza la cascada de llamadas por estrategia y por actividad de la página
+    de estrategias. Con ?detalle=1 devuelve el árbol completo.
+    """
+    try:
+        detalle = request.args.get('detalle', '0').lower() in ('1', 'true', 'si')
+        
+        # Conteo de tácticas y tareas por estrategia en una sola consulta agrupada
+        conteos = db.session.query(
+            ActividadEstrategia.estrategia_id,
+            func.count(func.distinct(ActividadEstrategia.id)),
+            func.count(TareaActividad.id)
+        ).join(
+            EstrategiaFodaCruzado, EstrategiaFodaCruzado.id == ActividadEstrategia.estrategia_id
+        ).outerjoin(
+            TareaActividad, TareaActividad.actividad_id == ActividadEstrategia.id
+        ).filter(
+            EstrategiaFodaCruzado.eje_id.isnot(None)
+        ).group_by(
+            ActividadEstrategia.estrategia_id
+        ).all()
+        
+        por_estrategia = {}
+        total_tacticas = 0
+        total_tareas = 0
+        for estrategia_id, tacticas_count, tareas_count in conteos:
+            por_estrategia[estrategia_id] = {'tacticas': tacticas_count, 'tareas': tareas_count}
+            total_tacticas += tacticas_count
+            total_tareas += tareas_count
+        
+        # Responsables distintos (de actividades y tareas) normalizados como en el cliente
+        responsable_actividad = func.lower(func.trim(ActividadEstrategia.responsable))
+        responsable_tarea = func.lower(func.trim(TareaActividad.responsable))
+        
+        responsables_actividades = db.session.query(responsable_actividad.label('responsable')).join(
+            EstrategiaFodaCruzado, EstrategiaFodaCruzado.id == ActividadEstrategia.estrategia_id
+        ).filter(
+            EstrategiaFodaCruzado.eje_id.isnot(None),
+            ActividadEstrategia.responsable.isnot(None),
+            responsable_actividad != ''
+        )
+        responsables_tareas = db.session.query(responsable_tarea.label('responsable')).join(
+            ActividadEstrategia, ActividadEstrategia.id == TareaActividad.actividad_id
+        ).join(
+            EstrategiaFodaCruzado, EstrategiaFodaCruzado.id == ActividadEstrategia.estrategia_id
+        ).filter(
+            EstrategiaFodaCruzado.eje_id.isnot(None),
+            TareaActividad.responsable.isnot(None),
+            responsable_tarea != ''
+        )
+        total_responsables = responsables_actividades.union(responsables_tareas).count()
+        
+        respuesta = {
+            'success': True,
+            'estadisticas': {
+                'total_tacticas': total_tacticas,
+                'total_tareas': total_tareas,
+                'total_responsables': total_responsables
+            },
+            'por_estrategia': {str(k): v for k, v in por_estrategia.items()}
+        }
+        
+        if detalle:
+            actividades = ActividadEstrategia.query.join(
+                EstrategiaFodaCruzado, EstrategiaFodaCruzado.id == ActividadEstrategia.estrategia_id
+            ).filter(
+                EstrategiaFodaCruzado.eje_id.isnot(None)
+            ).order_by(
+                ActividadEstrategia.fecha_creacion.desc()
+            ).all()
+            
+            tareas = TareaActividad.query.join(
+                ActividadEstrategia, ActividadEstrategia.id == TareaActividad.actividad_id
+            ).join(
+                EstrategiaFodaCruzado, EstrategiaFodaCruzado.id == ActividadEstrategia.estrategia_id
+            ).filter(
+                EstrategiaFodaCruzado.eje_id.isnot(None)
+            ).order_by(
+                TareaActividad.fecha_creacion.desc()
+            ).all()
+            
+            # Armar el árbol en memoria a partir de las dos consultas planas
+            tareas_por_actividad = {}
+            for t in tareas:
+                tareas_por_actividad.setdefault(t.actividad_id, []).append({
+                    'id': t.id,
+                    'nombre': t.nombre,
+                    'responsable': t.responsable,
+                    'fecha_inicio': t.fecha_inicio.isoformat() if t.fecha_inicio else None,
+                    'fecha_fin': t.fecha_fin.isoformat() if t.fecha_fin else None,
+                    'estado': t.estado
+                })
+            
+            arbol = {}
+            for a in actividades:
+                arbol.setdefault(str(a.estrategia_id), []).append({
+                    'id': a.id,
+                    'nombre': a.nombre,
+                    'responsable': a.responsable,
+                    'fecha_inicio': a.fecha_inicio.isoformat() if a.fecha_inicio else None,
+                    'fecha_fin': a.fecha_fin.isoformat() if a.fecha_fin else None,
+                    'tareas': tareas_por_actividad.get(a.id, [])
+                })
+            
+            respuesta['arbol'] = arbol
+        
+        return jsonify(respuesta)
+        
+    except Exception as e:
+        print(f"Error en api_estrategias_jerarquia: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+ESTADOS_TAREA = ['pendiente', 'en_progreso', 'completada']
+
+# Filas máximas por petición del scroll virtual de la página red
+GANTT_LIMITE_MAX = 500
+
+def estado_actividad(progreso, fecha_fin, hoy):
+    """Estado derivado de una actividad para el Gantt de la página red"""
+    if progreso == 100:
+        return 'completado'
+    if progreso > 0:
+        return 'progreso'
+    if fecha_fin and fecha_fin < hoy:
+        return 'atrasado'
+    return 'pendiente'
+
+@app.route('/api/red/gantt')
+@login_required
+@respuesta_condicional('actividades', 'tareas', extra=lambda: datetime.now().date())
+def api_red_gantt():
+    """Modelo de vista del Gantt/flujo de la página red con los filtros aplicados en la BD
+    
+    Parámetros: responsable, estado (alguna tarea en ese estado; sin tareas
+    cuenta como pendiente), desde y hasta (YYYY-MM-DD). Devuelve las
+    actividades con sus conteos de tareas, progreso y estado ya calculados, el
+    rango de fechas y el resumen. Con ?responsables=0 omite la lista de
+    responsables (no depende de los filtros) y con ?incluir_tareas=1 añade las
+    tareas de las actividades devueltas (exportación del reporte).
+    
+    Para el scroll virtual: inicio y limite piden solo una ventana de filas.
+    total_filas es el número de actividades filtradas; el resumen y el rango
+    siempre las cubren todas.
+    """
+    try:
+        responsable = request.args.get('responsable', 'todos')
+        estado = request.args.get('estado', 'todos')
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        incluir_responsables = request.args.get('responsables', '1').lower() not in ('0', 'false', 'no')
+        incluir_tareas = request.args.get('incluir_tareas', '0').lower() in ('1', 'true', 'si')
+        inicio = max(0, request.args.get('inicio', 0, type=int))
+        limite = request.args.get('limite', type=int)
+        if limite is not None:
+            limite = max(1, min(limite, GANTT_LIMITE_MAX))
+        
+        if estado != 'todos' and estado not in ESTADOS_TAREA:
+            return jsonify({'success': False, 'message': 'Estado inválido'}), 400
+        
+        try:
+            desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else None
+            hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Formato de fecha inválido. Use YYYY-MM-DD'}), 400
+        
+        # Conteos de tareas por actividad en una subconsulta agrupada
+        columnas_tareas = [
+            TareaActividad.actividad_id.label('actividad_id'),
+            func.count(TareaActividad.id).label('total'),
+            func.sum(case((TareaActividad.estado == 'completada', 1), else_=0)).label('completadas')
+        ]
+        if estado != 'todos':
+            columnas_tareas.append(
+                func.sum(case((TareaActividad.estado == estado, 1), else_=0)).label('con_estado')
+            )
+        conteos = db.session.query(*columnas_tareas).group_by(TareaActividad.actividad_id).subquery()
+        
+        query = db.session.query(
+            ActividadEstrategia.id,
+            ActividadEstrategia.estrategia_id,
+            ActividadEstrategia.nombre,
+            ActividadEstrategia.descripcion,
+            ActividadEstrategia.responsable,
+            ActividadEstrategia.fecha_inicio,
+            ActividadEstrategia.fecha_fin,
+            func.coalesce(conteos.c.total, 0).label('total'),
+            func.coalesce(conteos.c.completadas, 0).label('completadas')
+        ).outerjoin(conteos, conteos.c.actividad_id == ActividadEstrategia.id)
+        
+        if responsable != 'todos':
+            query = query.filter(ActividadEstrategia.responsable == responsable)
+        if estado == 'pendiente':
+            query = query.filter(or_(conteos.c.total.is_(None), conteos.c.con_estado > 0))
+        elif estado != 'todos':
+            query = query.filter(conteos.c.con_estado > 0)
+        if desde:
+            query = query.filter(or_(ActividadEstrategia.fecha_inicio.is_(None), ActividadEstrategia.fecha_inicio >= desde))
+        if hasta:
+            query = query.filter(or_(ActividadEstrategia.fecha_fin.is_(None), ActividadEstrategia.fecha_fin <= hasta))
+        
+        # Resumen y rango de todas las actividades filtradas, agregados en la BD
+        filtradas = query.subquery()
+        c = filtradas.c
+        if db.engine.dialect.name == 'postgresql':
+            dias = c.fecha_fin - c.fecha_inicio
+        else:
+            dias = func.julianday(c.fecha_fin) - func.julianday(c.fecha_inicio)
+        agregados = db.session.query(
+            func.count(),
+            func.coalesce(func.sum(c.total), 0),
+            func.coalesce(func.sum(c.completadas), 0),
+            func.coalesce(func.sum(case((c.fecha_fin > c.fecha_inicio, dias), else_=0)), 0),
+            func.min(c.fecha_inicio), func.min(c.fecha_fin),
+            func.max(c.fecha_inicio), func.max(c.fecha_fin)
+        ).one()
+        total_actividades, total_tareas, tareas_completadas, dias_totales = (int(v or 0) for v in agregados[:4])
+        minimos = [f for f in agregados[4:6] if f]
+        maximos = [f for f in agregados[6:8] if f]
+        
+        resumen = {
+            'total_actividades': total_actividades,
+            'total_tareas': total_tareas,
+            'tareas_completadas': tareas_completadas,
+            'dias_totales': dias_totales,
+            'porcentaje': round(tareas_completadas * 100 / total_tareas) if total_tareas else 0
+        }
+        
+        # Ventana de filas: el Gantt virtual solo pide las que están en pantalla
+        query = query.order_by(ActividadEstrategia.id).offset(inicio)
+        if limite is not None:
+            query = query.limit(limite)
+        
+        hoy = datetime.now().date()
+        actividades = []
+        for id_, estrategia_id, nombre, descripcion, resp, fecha_inicio, fecha_fin, total, completadas in query:
+            completadas = int(completadas or 0)
+            progreso = round(completadas * 100 / total) if total else 0
+            actividades.append({
+                'id': id_,
+                'estrategia_id': estrategia_id,
+                'nombre': nombre,
+                'descripcion': descripcion,
+                'responsable': resp,
+                'fecha_inicio': fecha_inicio.isoformat() if fecha_inicio else None,
+                'fecha_fin': fecha_fin.isoformat() if fecha_fin else None,
+                'total_tareas': total,
+                'tareas_completadas': completadas,
+                'progreso': progreso,
+                'estado': estado_actividad(progreso, fecha_fin, hoy)
+            })
+        
+        respuesta = {
+            'success': True,
+            'actividades': actividades,
+            'inicio': inicio,
+            'total_filas': total_actividades,
+            'rango': {
+                'fecha_min': min(minimos).isoformat() if minimos else None,
+                'fecha_max': max(maximos).isoformat() if maximos else None
+            },
+            'resumen': resumen
+        }
+        
+        if incluir_tareas:
+            # Tareas de la misma ventana de actividades, filtradas en la BD
+            ids_actividades = query.with_entities(ActividadEstrategia.id).subquery()
+            tareas = con_creador(TareaActividad.query, TareaActividad).filter(
+                TareaActividad.actividad_id.in_(select(ids_actividades.c.id))
+            ).order_by(TareaActividad.actividad_id, TareaActividad.id).all()
+            respuesta['tareas'] = [serializar_tarea(t) for t in tareas]
+        
+        if incluir_responsables:
+            # Actividades y tareas (y completadas) por responsable en una consulta
+            asignaciones = db.session.query(
+                ActividadEstrategia.responsable.label('responsable'),
+                literal_column('1').label('actividad'),
+                literal_column('0').label('tarea'),
+                literal_column('0').label('completada')
+            ).filter(ActividadEstrategia.responsable.isnot(None), ActividadEstrategia.responsable != '').union_all(
+                db.session.query(
+                    TareaActividad.responsable,
+                    literal_column('0'),
+                    literal_column('1'),
+                    case((TareaActividad.estado == 'completada', 1), else_=0)
+                ).filter(TareaActividad.responsable.isnot(None), TareaActividad.responsable != '')
+            ).subquery()
+            
+            filas = db.session.query(
+                asignaciones.c.responsable,
+                func.sum(asignaciones.c.actividad),
+                func.sum(asignaciones.c.tarea),
+                func.sum(asignaciones.c.completada)
+            ).group_by(asignaciones.c.responsable).order_by(asignaciones.c.responsable).all()
+            
+            respuesta['responsables'] = [
+                {
+                    'responsable': nombre,
+                    'actividades': int(n_actividades or 0),
+                    'tareas': int(n_tareas or 0),
+                    'tareas_completadas': int(n_completadas or 0)
+                }
+                for nombre, n_actividades, n_tareas, n_completadas in filas
+            ]
+        
+        return jsonify(respuesta)
+        
+    except Exception as e:
+        print(f"Error en api_red_gantt: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/red/eventos')
+@login_required
+@respuesta_condicional('actividades', 'tareas')
+def api_red_eventos():
+    """Eventos de la línea de tiempo (inicio/fin de actividades e inicio de tareas) en orden cronológico
+    
+    Parámetros: responsable, desde y hasta (ventana de fechas de los eventos,
+    YYYY-MM-DD), inicio y limite (ventana de filas). Con ?meses=1 incluye el
+    número de eventos de cada mes para que la vista arme las cabeceras y el
+    alto del scroll sin descargar todos los eventos.
+    """
+    try:
+        responsable = request.args.get('responsable', 'todos')
+        inicio = max(0, request.args.get('inicio', 0, type=int))
+        limite = max(1, min(request.args.get('limite', 100, type=int), GANTT_LIMITE_MAX))
+        incluir_meses = request.args.get('meses', '0').lower() in ('1', 'true', 'si')
+        
+        try:
+            desde = datetime.strptime(request.args['desde'], '%Y-%m-%d').date() if request.args.get('desde') else None
+            hasta = datetime.strptime(request.args['hasta'], '%Y-%m-%d').date() if request.args.get('hasta') else None
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Formato de fecha inválido. Use YYYY-MM-DD'}), 400
+        
+        def eventos_de(modelo, columna, tipo, momento, estado):
+            consulta = db.session.query(
+                columna.label('fecha'),
+                literal(tipo).label('tipo'),
+                modelo.id.label('id'),
+                literal(momento).label('momento'),
+                modelo.nombre.label('nombre'),
+                modelo.responsable.label('responsable'),
+                estado.label('estado')
+            ).filter(columna.isnot(None))
+            if responsable != 'todos':
+                consulta = consulta.filter(modelo.responsable == responsable)
+            if desde:
+                consulta = consulta.filter(columna >= desde)
+            if hasta:
+                consulta = consulta.filter(columna <= hasta)
+            return consulta
+        
+        eventos = eventos_de(
+            ActividadEstrategia, ActividadEstrategia.fecha_inicio, 'actividad', 'inicio', literal(None, db.String)
+        ).union_all(
+            eventos_de(ActividadEstrategia, ActividadEstrategia.fecha_fin, 'actividad', 'fin', literal(None, db.String)),
+            eventos_de(TareaActividad, TareaActividad.fecha_inicio, 'tarea', 'inicio', TareaActividad.estado)
+        ).subquery()
+        
+        filas = db.session.query(eventos).order_by(
+            eventos.c.fecha, eventos.c.tipo, eventos.c.id, eventos.c.momento.desc()
+        ).offset(inicio).limit(limite).all()
+        
+        respuesta = {
+            'success': True,
+            'inicio': inicio,
+            'eventos': [
+                {
+                    'fecha': fila.fecha.isoformat(),
+                    'tipo': fila.tipo,
+                    'id': fila.id,
+                    'momento': fila.momento,
+                    'nombre': fila.nombre,
+                    'responsable': fila.responsable,
+                    'estado': fila.estado
+                }
+                for fila in filas
+            ]
+        }
+        
+        if incluir_meses:
+            # Conteo por día en la BD (portable) y agregado por mes aquí
+            meses = {}
+            for fecha, total in db.session.query(eventos.c.fecha, func.count()).group_by(eventos.c.fecha):
+                if isinstance(fecha, str):
+                    fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
+                clave = fecha.strftime('%Y-%m')
+                meses[clave] = meses.get(clave, 0) + total
+            respuesta['meses'] = [{'mes': mes, 'total': total} for mes, total in sorted(meses.items())]
+            respuesta['total'] = sum(meses.values())
+        
+        return jsonify(respuesta)
+        
+    except Exception as e:
+        print(f"Error en api_red_eventos: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/api/agregar_tarea', methods=['POST'])
 @login_required
 def api_agregar_tarea():
@@ -1467,6 +3769,7 @@ def api_agregar_tarea():
         
         db.session.add(nueva_tarea)
         db.session.commit()
+        invalidar_cache('tareas')
         
         return jsonify({
             'success': True,
@@ -1525,7 +3828,27 @@ def migrate_db():
                 connection.execute("ALTER TABLE estrategias_foda_cruzado ADD COLUMN eje_texto VARCHAR(200)")
                 print("✅ Columna 'eje_texto' agregada")
             
-            # 3. Verificar tablas de actividades y tareas
+            # 3. Crear índices faltantes
+            print("\n🔍 Verificando índices...")
+            try:
+                indices_creados = aplicar_indices()
+                print(f"   📋 Índices creados: {len(indices_creados)}")
+            except Exception as e:
+                print(f"   ⚠️  Error al crear índices: {e}")
+            
+            try:
+                preparar_busqueda()
+            except Exception as e:
+                print(f"   ⚠️  Error al preparar la búsqueda de texto: {e}")
+            
+            try:
+                # La normalización necesita la columna elementos_normalizados
+                aplicar_columnas()
+                preparar_estrategias()
+            except Exception as e:
+                print(f"   ⚠️  Error al normalizar las estrategias: {e}")
+            
+            # 4. Verificar tablas de actividades y tareas
             try:
                 print("\n🔍 Verificando tabla actividades_estrategia...")
                 actividades_count = ActividadEstrategia.query.count()
@@ -1542,7 +3865,7 @@ def migrate_db():
                 print(f"   ⚠️  Error al verificar tareas: {e}")
                 print("   ℹ️  La tabla se creará automáticamente al primer uso.")
             
-            # 4. Verificar otras tablas importantes
+            # 5. Verificar otras tablas importantes
             print("\n🔍 Verificando tabla usuarios...")
             users_count = User.query.count()
             print(f"   👥 Total de usuarios: {users_count}")
@@ -1551,7 +3874,7 @@ def migrate_db():
             aspectos_count = AspectoAmbiental.query.count()
             print(f"   📊 Total de aspectos: {aspectos_count}")
             
-            # 5. Intentar contar estrategias para verificar que funciona
+            # 6. Intentar contar estrategias para verificar que funciona
             try:
                 estrategias_count = EstrategiaFodaCruzado.query.count()
                 print(f"   ♟️  Total de estrategias FODA: {estrategias_count}")
@@ -1885,29 +4208,19 @@ def check():
     """Verificar estado del sistema"""
     try:
         # Verificar conexión a base de datos
-        db.session.execute("SELECT 1")
+        db.session.execute(text("SELECT 1"))
         db_status = 'conectada'
         
         # Contar registros
-        user_count = User.query.count()
-        aspecto_count = AspectoAmbiental.query.count()
-        aspecto_foda_ext = AspectoAmbiental.query.filter_by(fuente='foda_ext').count()
-        aspecto_canva = AspectoAmbiental.query.filter_by(fuente='canva').count()
-        aspecto_foda_int = AspectoAmbiental.query.filter_by(fuente='foda_int').count()
-        
-        # Intentar contar estrategias (puede fallar si hay problemas de estructura)
-        try:
-            estrategias_count = EstrategiaFodaCruzado.query.count()
-        except:
-            estrategias_count = 0
-        
-        # Intentar contar actividades y tareas
-        try:
-            actividades_count = ActividadEstrategia.query.count()
-            tareas_count = TareaActividad.query.count()
-        except:
-            actividades_count = 0
-            tareas_count = 0
+        estadisticas = calcular_estadisticas()
+        user_count = estadisticas['usuarios_total']
+        aspecto_count = estadisticas['total_actividades']
+        aspecto_foda_ext = estadisticas['actividades_foda_ext']
+        aspecto_canva = estadisticas['actividades_canva']
+        aspecto_foda_int = estadisticas['actividades_foda_int']
+        estrategias_count = estadisticas['estrategias_foda_cruzado']
+        actividades_count = estadisticas['actividades_estrategia']
+        tareas_count = estadisticas['tareas_actividad']
     
     except Exception as e:
         db_status = f'error: {str(e)[:100]}'
@@ -1940,76 +4253,316 @@ def check():
 
 @app.route('/api/admin/estadisticas')
 @admin_required
+@respuesta_condicional('aspectos', 'estrategias', 'actividades', 'tareas', 'usuarios', extra=contar_aspectos_recientes)
 def api_admin_estadisticas():
     """API para obtener estadísticas del dashboard administrativo"""
     try:
-        # Obtener estadísticas generales
-        total_actividades = AspectoAmbiental.query.count()
-        usuarios_count = User.query.count()
-        
-        # Estadísticas por fuente
-        total_actividades_canva = AspectoAmbiental.query.filter_by(fuente='canva').count()
-        total_actividades_foda_ext = AspectoAmbiental.query.filter_by(fuente='foda_ext').count()
-        total_actividades_foda_int = AspectoAmbiental.query.filter_by(fuente='foda_int').count()
-        
-        # Contar actividades positivas y negativas
-        actividades_positivas = AspectoAmbiental.query.filter_by(tipo='Positivo').count()
-        actividades_negativas = AspectoAmbiental.query.filter_by(tipo='Negativo').count()
-        
-        # Actividades de los últimos 7 días
-        fecha_limite = datetime.utcnow() - timedelta(days=7)
-        actividades_recientes_7dias = AspectoAmbiental.query.filter(
-            AspectoAmbiental.created_at >= fecha_limite
-        ).count()
-        
-        # Contar estrategias FODA cruzado
-        try:
-            estrategias_count = EstrategiaFodaCruzado.query.count()
-        except:
-            estrategias_count = 0
-        
-        # Contar estrategias por eje
-        try:
-            estrategias_con_eje = EstrategiaFodaCruzado.query.filter(
-                EstrategiaFodaCruzado.eje_id.isnot(None)
-            ).count()
-        except:
-            estrategias_con_eje = 0
+        return jsonify({
+            'success': True,
+            'estadisticas': calcular_estadisticas()
+        })
         
-        # Contar actividades y tareas de estrategias
-        try:
-            actividades_estrategia_count = ActividadEstrategia.query.count()
-            tareas_actividad_count = TareaActividad.query.count()
-        except:
-            actividades_estrategia_count = 0
-            tareas_actividad_count = 0
+    except Exception as e:
+        print(f"Error en api_admin_estadisticas: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/admin/pool')
+@admin_required
+def api_admin_pool():
+    """Estado del pool de conexiones de este worker y esperas acumuladas de checkout"""
+    try:
+        pool = db.engine.pool
+        estado = {
+            'clase': type(pool).__name__,
+            'status': pool.status()
+        }
+        # QueuePool expone los contadores; otros pools (SQLite en memoria) no
+        for nombre in ('size', 'checkedin', 'checkedout', 'overflow'):
+            metodo = getattr(pool, nombre, None)
+            if callable(metodo):
+                estado[nombre] = metodo()
+        if hasattr(pool, '_max_overflow'):
+            estado['max_overflow'] = pool._max_overflow
+        
+        with _metricas_pool_lock:
+            metricas = dict(metricas_pool)
+        metricas['espera_media_ms'] = round(metricas['espera_total'] * 1000 / metricas['checkouts'], 3) if metricas['checkouts'] else 0
+        metricas['espera_max_ms'] = round(metricas.pop('espera_max') * 1000, 3)
+        metricas['espera_total_ms'] = round(metricas.pop('espera_total') * 1000, 3)
         
         return jsonify({
             'success': True,
-            'estadisticas': {
-                'total_actividades': total_actividades,
-                'actividades_canva': total_actividades_canva,
-                'actividades_foda_ext': total_actividades_foda_ext,
-                'actividades_foda_int': total_actividades_foda_int,
-                'estrategias_foda_cruzado': estrategias_count,
-                'estrategias_con_eje': estrategias_con_eje,
-                'actividades_estrategia': actividades_estrategia_count,
-                'tareas_actividad': tareas_actividad_count,
-                'positivas_canva': AspectoAmbiental.query.filter_by(fuente='canva', tipo='Positivo').count(),
-                'negativas_canva': AspectoAmbiental.query.filter_by(fuente='canva', tipo='Negativo').count(),
-                'positivas_foda_ext': AspectoAmbiental.query.filter_by(fuente='foda_ext', tipo='Positivo').count(),
-                'negativas_foda_ext': AspectoAmbiental.query.filter_by(fuente='foda_ext', tipo='Negativo').count(),
-                'actividades_recientes_7dias': actividades_recientes_7dias,
-                'usuarios_total': usuarios_count,
-                'actividades_positivas': actividades_positivas,
-                'actividades_negativas': actividades_negativas
+            'pid': os.getpid(),
+            'pool': estado,
+            'metricas': metricas,
+            'configuracion': {
+                'pool_timeout': DB_POOL_TIMEOUT,
+                'pool_recycle': DB_POOL_RECYCLE,
+                'pool_pre_ping': DB_POOL_PRE_PING,
+                'pgbouncer': DB_PGBOUNCER,
+                'max_connections': int(DB_MAX_CONNECTIONS) if DB_MAX_CONNECTIONS else None,
+                'workers': int(os.environ.get('WEB_CONCURRENCY', 1))
             }
         })
         
     except Exception as e:
-        print(f"Error en api_admin_estadisticas: {e}")
+        print(f"Error en api_admin_pool: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/admin/cache')
+@admin_required
+def api_admin_cache():
+    """Métricas de la caché de vistas (aciertos, fallos e invalidaciones) de este worker"""
+    try:
+        aciertos = sum(cache_metricas['aciertos'].values())
+        fallos = sum(cache_metricas['fallos'].values())
+        return jsonify({
+            'success': True,
+            'backend': cache_vistas.nombre,
+            'ttl': CACHE_VISTAS_TTL,
+            'entradas': cache_vistas.entradas(),
+            'tasa_aciertos': round(aciertos / (aciertos + fallos), 3) if aciertos + fallos else None,
+            'aciertos': dict(cache_metricas['aciertos']),
+            'fallos': dict(cache_metricas['fallos']),
+            'invalidaciones': dict(cache_metricas['invalidaciones'])
+        })
+    
+    except Exception as e:
+        print(f"Error en api_admin_cache: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/admin/consultas_lentas', methods=['GET', 'DELETE'])
+@admin_required
+def api_admin_consultas_lentas():
+    """Consultas lentas capturadas en este worker (más recientes primero) y resumen por huella; DELETE las vacía"""
+    try:
+        with _consultas_lentas_lock:
+            if request.method == 'DELETE':
+                consultas_lentas.clear()
+                _ultimo_plan.clear()
+            capturas = list(consultas_lentas)
+        
+        resumen = {}
+        for captura in capturas:
+            grupo = resumen.setdefault(captura['huella'], {
+                'huella': captura['huella'],
+                'sql': captura['sql'][:300],
+                'veces': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'endpoints': set()
+            })
+            grupo['veces'] += 1
+            grupo['total_ms'] += captura['duracion_ms']
+            grupo['max_ms'] = max(grupo['max_ms'], captura['duracion_ms'])
+            if captura['endpoint']:
+                grupo['endpoints'].add(captura['endpoint'])
+        for grupo in resumen.values():
+            grupo['media_ms'] = round(grupo.pop('total_ms') / grupo['veces'], 1)
+            grupo['endpoints'] = sorted(grupo['endpoints'])
+        
+        return jsonify({
+            'success': True,
+            'pid': os.getpid(),
+            'umbral_ms': CONSULTAS_LENTAS_MS,
+            'capacidad': CONSULTAS_LENTAS_MAX,
+            'analyze': CONSULTAS_LENTAS_ANALYZE,
+            'resumen': sorted(resumen.values(), key=lambda g: g['veces'] * g['media_ms'], reverse=True),
+            'consultas': capturas[::-1]
+        })
+    
+    except Exception as e:
+        print(f"Error en api_admin_consultas_lentas: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def acceso_metricas_permitido():
+    """IP interna, token Bearer de METRICAS_TOKEN o sesión de administrador"""
+    if request.remote_addr in METRICAS_IPS:
+        return True
+    autorizacion = request.headers.get('Authorization', '')
+    if METRICAS_TOKEN and autorizacion.startswith('Bearer ') and hmac.compare_digest(autorizacion[7:], METRICAS_TOKEN):
+        return True
+    usuario = usuario_autorizado()
+    return usuario is not None and usuario['rol'] == 'admin'
+
+@app.route('/metrics')
+def metrics():
+    """Métricas por endpoint de este worker en formato de texto de Prometheus"""
+    if not acceso_metricas_permitido():
+        return jsonify({'success': False, 'message': 'No autorizado'}), 403
+    
+    return Response(exportar_metricas_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# Criterios de orden del dashboard: orden_por -> (columna, descendente)
+ORDENES_ACTIVIDADES = {
+    'fecha_desc': (AspectoAmbiental.created_at, True),
+    'fecha_asc': (AspectoAmbiental.created_at, False),
+    'actividad_asc': (AspectoAmbiental.actividad, False),
+    'actividad_desc': (AspectoAmbiental.actividad, True),
+    'tipo_asc': (AspectoAmbiental.tipo, False)
+}
+
+# Parámetros que definen el conjunto filtrado (sin orden ni paginación)
+FILTROS_ACTIVIDADES = ('tipo_filtro', 'bloque_filtro', 'fuente_filtro', 'fecha_desde', 'fecha_hasta', 'busqueda')
+
+def aplicar_filtros_actividades(query, data, ordenar=True):
+    """Aplica los filtros y el orden del dashboard administrativo a una consulta de aspectos
+    
+    Compartido por el filtrado paginado y la exportación a CSV.
+    """
+    # Obtener parámetros de filtro
+    tipo_filtro = data.get('tipo_filtro', 'all')
+    bloque_filtro = data.get('bloque_filtro', 'all')
+    fuente_filtro = data.get('fuente_filtro', 'all')
+    fecha_desde = data.get('fecha_desde')
+    fecha_hasta = data.get('fecha_hasta')
+    busqueda = data.get('busqueda', '').strip()
+    orden_por = data.get('orden_por', 'fecha_desc')
+    
+    # Aplicar filtros
+    if tipo_filtro != 'all':
+        query = query.filter(AspectoAmbiental.tipo == tipo_filtro)
+    
+    if bloque_filtro != 'all':
+        query = query.filter(AspectoAmbiental.aspecto == bloque_filtro)
+    
+    if fuente_filtro != 'all':
+        query = query.filter(AspectoAmbiental.fuente == fuente_filtro)
+    
+    if fecha_desde:
+        try:
+            fecha_desde_dt = datetime.strptime(fecha_desde, '%Y-%m-%d')
+            query = query.filter(AspectoAmbiental.created_at >= fecha_desde_dt)
+        except ValueError:
+            pass
+    
+    if fecha_hasta:
+        try:
+            fecha_hasta_dt = datetime.strptime(fecha_hasta, '%Y-%m-%d')
+            # Ajustar para incluir todo el día
+            fecha_hasta_dt = fecha_hasta_dt.replace(hour=23, minute=59, second=59)
+            query = query.filter(AspectoAmbiental.created_at <= fecha_hasta_dt)
+        except ValueError:
+            pass
+    
+    relevancia = None
+    if busqueda:
+        query, relevancia = aplicar_busqueda(query, 'aspectos', busqueda)
+    
+    # Aplicar ordenamiento
+    if ordenar and orden_por in ORDENES_ACTIVIDADES:
+        columna, descendente = ORDENES_ACTIVIDADES[orden_por]
+        query = query.order_by(columna.desc() if descendente else columna.asc())
+    elif ordenar and orden_por == 'relevancia':
+        if relevancia is not None:
+            query = query.order_by(relevancia.desc(), AspectoAmbiental.created_at.desc(), AspectoAmbiental.id.desc())
+        else:
+            query = query.order_by(AspectoAmbiental.created_at.desc(), AspectoAmbiental.id.desc())
+    
+    return query
+
+def codificar_cursor(posicion):
+    """Codifica como cursor opaco la posición donde continúa la página siguiente"""
+    return base64.urlsafe_b64encode(json.dumps(posicion, default=str).encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor):
+    try:
+        posicion = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return posicion if isinstance(posicion, dict) else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def paginar_por_cursor(query, orden_por, cursor, por_pagina):
+    """Paginación por cursor (keyset) sobre (columna de orden, id)
+    
+    En vez de OFFSET continúa desde la última fila vista, así el costo de una
+    página no depende de su profundidad. Devuelve (filas, siguiente_cursor).
+    
+    Las filas con la columna de orden a NULL (p. ej. created_at) van donde las
+    pone el motor sin NULLS FIRST/LAST, para que el índice siga sirviendo el
+    orden: PostgreSQL trata NULL como el mayor valor y SQLite como el menor.
+    Entre ellas el orden lo da el id.
+    """
+    columna, descendente = ORDENES_ACTIVIDADES.get(orden_por, ORDENES_ACTIVIDADES['fecha_desc'])
+    nulos_primero = descendente == (db.engine.dialect.name == 'postgresql')
+    
+    posicion = decodificar_cursor(cursor) if cursor else None
+    if posicion:
+        ultimo_id = int(posicion['id'])
+        siguiente_id = AspectoAmbiental.id < ultimo_id if descendente else AspectoAmbiental.id > ultimo_id
+        if posicion.get('valor') is None:
+            # La página anterior terminó entre los NULL: seguir por id y, si van primero, con el resto
+            restantes = and_(columna.is_(None), siguiente_id)
+            query = query.filter(or_(restantes, columna.isnot(None)) if nulos_primero else restantes)
+        else:
+            valor = posicion['valor']
+            if columna is AspectoAmbiental.created_at:
+                valor = datetime.fromisoformat(valor)
+            clave = tuple_(columna, AspectoAmbiental.id)
+            ultima = (valor, ultimo_id)
+            restantes = clave < ultima if descendente else clave > ultima
+            query = query.filter(restantes if nulos_primero else or_(restantes, columna.is_(None)))
+    
+    if descendente:
+        query = query.order_by(columna.desc(), AspectoAmbiental.id.desc())
+    else:
+        query = query.order_by(columna.asc(), AspectoAmbiental.id.asc())
+    
+    # Se pide una fila extra para saber si hay página siguiente
+    filas = query.limit(por_pagina + 1).all()
+    siguiente_cursor = None
+    if len(filas) > por_pagina:
+        filas = filas[:por_pagina]
+        ultima = filas[-1]
+        siguiente_cursor = codificar_cursor({'valor': getattr(ultima, columna.key), 'id': ultima.id})
+    
+    return filas, siguiente_cursor
+
+_conteos_cache = {}
+_conteos_lock = threading.Lock()
+
+def contar_actividades(query, data, modo):
+    """Total de filas del filtro según el modo: 'exacto', 'estimado' o 'no'
+    
+    'estimado' usa la estimación del planificador en PostgreSQL y, en otros
+    motores, un conteo exacto reutilizado durante CONTEO_CACHE_TTL segundos.
+    """
+    if modo == 'no':
+        return None
+    
+    query = query.order_by(None)
+    
+    if modo != 'estimado':
+        return query.count()
+    
+    if db.engine.dialect.name == 'postgresql':
+        try:
+            compilada = query.statement.compile(dialect=db.engine.dialect)
+            plan = db.session.connection().exec_driver_sql(
+                'EXPLAIN (FORMAT JSON) ' + str(compilada), compilada.params
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  No se pudo estimar el conteo: {e}")
+    
+    clave = json.dumps({k: v for k, v in data.items() if k in FILTROS_ACTIVIDADES}, sort_keys=True, default=str)
+    ahora = time.time()
+    with _conteos_lock:
+        guardado = _conteos_cache.get(clave)
+    if guardado and guardado[0] > ahora:
+        return guardado[1]
+    
+    # El conteo va fuera del lock: dos hilos pueden contar a la vez, pero ninguno espera a otro
+    total = query.count()
+    with _conteos_lock:
+        if len(_conteos_cache) > 256:
+            _conteos_cache.clear()
+        _conteos_cache[clave] = (ahora + CONTEO_CACHE_TTL, total)
+    return total
+
 @app.route('/api/admin/filtrar_actividades', methods=['POST'])
 @admin_required
 def api_admin_filtrar_actividades():
@@ -2017,71 +4570,45 @@ def api_admin_filtrar_actividades():
     try:
         data = request.get_json()
         
-        # Obtener parámetros de filtro
-        tipo_filtro = data.get('tipo_filtro', 'all')
-        bloque_filtro = data.get('bloque_filtro', 'all')
-        fuente_filtro = data.get('fuente_filtro', 'all')
-        fecha_desde = data.get('fecha_desde')
-        fecha_hasta = data.get('fecha_hasta')
-        busqueda = data.get('busqueda', '').strip()
-        orden_por = data.get('orden_por', 'fecha_desc')
         pagina = data.get('pagina', 1)
         por_pagina = data.get('por_pagina', 25)
         
-        # Construir consulta base
-        query = AspectoAmbiental.query
-        
-        # Aplicar filtros
-        if tipo_filtro != 'all':
-            query = query.filter(AspectoAmbiental.tipo == tipo_filtro)
+        # Modo de paginación: 'offset' (por número de página) o 'cursor' (keyset)
+        paginacion = data.get('paginacion', 'offset')
+        # Total: 'exacto', 'estimado' o 'no'
+        modo_total = data.get('total', 'exacto')
         
-        if bloque_filtro != 'all':
-            query = query.filter(AspectoAmbiental.aspecto == bloque_filtro)
+        # Construir consulta base (con el creador precargado) y aplicar filtros
+        base = con_creador(AspectoAmbiental.query, AspectoAmbiental)
+        siguiente_cursor = None
         
-        if fuente_filtro != 'all':
-            query = query.filter(AspectoAmbiental.fuente == fuente_filtro)
-        
-        if fecha_desde:
-            try:
-                fecha_desde_dt = datetime.strptime(fecha_desde, '%Y-%m-%d')
-                query = query.filter(AspectoAmbiental.created_at >= fecha_desde_dt)
-            except ValueError:
-                pass
+        orden_por = data.get('orden_por', 'fecha_desc')
         
-        if fecha_hasta:
-            try:
-                fecha_hasta_dt = datetime.strptime(fecha_hasta, '%Y-%m-%d')
-                # Ajustar para incluir todo el día
-                fecha_hasta_dt = fecha_hasta_dt.replace(hour=23, minute=59, second=59)
-                query = query.filter(AspectoAmbiental.created_at <= fecha_hasta_dt)
-            except ValueError:
-                pass
-        
-        if busqueda:
-            query = query.filter(
-                or_(
-                    AspectoAmbiental.actividad.ilike(f'%{busqueda}%'),
-                    AspectoAmbiental.aspecto.ilike(f'%{busqueda}%')
-                )
+        if paginacion == 'cursor' and orden_por != 'relevancia':
+            query = aplicar_filtros_actividades(base, data, ordenar=False)
+            total = contar_actividades(query, data, modo_total)
+            actividades, siguiente_cursor = paginar_por_cursor(
+                query, orden_por, data.get('cursor'), por_pagina
             )
+        elif paginacion == 'cursor':
+            # El orden por relevancia no tiene una clave estable: el cursor guarda el desplazamiento
+            query = aplicar_filtros_actividades(base, data)
+            total = contar_actividades(query, data, modo_total)
+            posicion = decodificar_cursor(data['cursor']) if data.get('cursor') else None
+            offset = int(posicion.get('offset', 0)) if posicion else 0
+            actividades = query.offset(offset).limit(por_pagina + 1).all()
+            if len(actividades) > por_pagina:
+                actividades = actividades[:por_pagina]
+                siguiente_cursor = codificar_cursor({'offset': offset + por_pagina})
+        else:
+            query = aplicar_filtros_actividades(base, data)
+            
+            # Paginación
+            total = contar_actividades(query, data, modo_total)
+            offset = (pagina - 1) * por_pagina
+            actividades = query.offset(offset).limit(por_pagina).all()
         
-        # Aplicar ordenamiento
-        if orden_por == 'fecha_desc':
-            query = query.order_by(AspectoAmbiental.created_at.desc())
-        elif orden_por == 'fecha_asc':
-            query = query.order_by(AspectoAmbiental.created_at.asc())
-        elif orden_por == 'actividad_asc':
-            query = query.order_by(AspectoAmbiental.actividad.asc())
-        elif orden_por == 'actividad_desc':
-            query = query.order_by(AspectoAmbiental.actividad.desc())
-        elif orden_por == 'tipo_asc':
-            query = query.order_by(AspectoAmbiental.tipo.asc())
-        
-        # Paginación
-        total = query.count()
-        total_paginas = (total + por_pagina - 1) // por_pagina
-        offset = (pagina - 1) * por_pagina
-        actividades = query.offset(offset).limit(por_pagina).all()
+        total_paginas = (total + por_pagina - 1) // por_pagina if total is not None else None
         
         # Formatear datos para la respuesta
         actividades_formateadas = []
@@ -2104,7 +4631,7 @@ def api_admin_filtrar_actividades():
                 'aspecto': descripcion,
                 'fuente': a.fuente,
                 'fecha': a.created_at.strftime('%Y-%m-%d %H:%M:%S') if a.created_at else '',
-                'creador': a.creador.username if a.creador else 'Desconocido'
+                'creador': nombre_creador(a, 'Desconocido')
             })
         
         return jsonify({
@@ -2112,7 +4639,8 @@ def api_admin_filtrar_actividades():
             'actividades': actividades_formateadas,
             'total': total,
             'total_paginas': total_paginas,
-            'pagina_actual': pagina
+            'pagina_actual': pagina,
+            'siguiente_cursor': siguiente_cursor
         })
         
     except Exception as e:
@@ -2122,91 +4650,67 @@ def api_admin_filtrar_actividades():
 @app.route('/api/admin/exportar_datos', methods=['POST'])
 @admin_required
 def api_admin_exportar_datos():
-    """API para exportar datos a CSV"""
+    """API para exportar datos a CSV
+    
+    La respuesta se genera en streaming: las filas se leen con un cursor del lado
+    del servidor (yield_per) y se envían por bloques, así la memoria no crece con
+    el tamaño de la tabla. Con "comprimir": true se envía con gzip si el cliente
+    lo acepta.
+    """
     try:
         data = request.get_json()
         
-        # Obtener parámetros de filtro (mismos que en filtrar_actividades)
-        tipo_filtro = data.get('tipo_filtro', 'all')
-        bloque_filtro = data.get('bloque_filtro', 'all')
-        fuente_filtro = data.get('fuente_filtro', 'all')
-        fecha_desde = data.get('fecha_desde')
-        fecha_hasta = data.get('fecha_hasta')
-        busqueda = data.get('busqueda', '').strip()
-        orden_por = data.get('orden_por', 'fecha_desc')
-        
         # Construir consulta (misma lógica que en filtrar_actividades)
-        query = AspectoAmbiental.query
-        
-        if tipo_filtro != 'all':
-            query = query.filter(AspectoAmbiental.tipo == tipo_filtro)
-        
-        if bloque_filtro != 'all':
-            query = query.filter(AspectoAmbiental.aspecto == bloque_filtro)
-        
-        if fuente_filtro != 'all':
-            query = query.filter(AspectoAmbiental.fuente == fuente_filtro)
-        
-        if fecha_desde:
-            try:
-                fecha_desde_dt = datetime.strptime(fecha_desde, '%Y-%m-%d')
-                query = query.filter(AspectoAmbiental.created_at >= fecha_desde_dt)
-            except ValueError:
-                pass
-        
-        if fecha_hasta:
-            try:
-                fecha_hasta_dt = datetime.strptime(fecha_hasta, '%Y-%m-%d')
-                fecha_hasta_dt = fecha_hasta_dt.replace(hour=23, minute=59, second=59)
-                query = query.filter(AspectoAmbiental.created_at <= fecha_hasta_dt)
-            except ValueError:
-                pass
-        
-        if busqueda:
-            query = query.filter(
-                or_(
-                    AspectoAmbiental.actividad.ilike(f'%{busqueda}%'),
-                    AspectoAmbiental.aspecto.ilike(f'%{busqueda}%')
-                )
-            )
-        
-        # Aplicar ordenamiento
-        if orden_por == 'fecha_desc':
-            query = query.order_by(AspectoAmbiental.created_at.desc())
-        elif orden_por == 'fecha_asc':
-            query = query.order_by(AspectoAmbiental.created_at.asc())
-        elif orden_por == 'actividad_asc':
-            query = query.order_by(AspectoAmbiental.actividad.asc())
-        elif orden_por == 'actividad_desc':
-            query = query.order_by(AspectoAmbiental.actividad.desc())
-        elif orden_por == 'tipo_asc':
-            query = query.order_by(AspectoAmbiental.tipo.asc())
+        query = aplicar_filtros_actividades(
+            con_creador(AspectoAmbiental.query, AspectoAmbiental), data
+        )
         
-        actividades = query.all()
+        comprimir = bool(data.get('comprimir')) and 'gzip' in request.headers.get('Accept-Encoding', '')
         
-        # Crear CSV en memoria
-        output = io.StringIO()
-        writer = csv.writer(output)
+        def generar_csv():
+            output = io.StringIO()
+            writer = csv.writer(output)
+            
+            # Escribir encabezados
+            writer.writerow(['ID', 'Actividad', 'Tipo', 'Aspecto/Bloque', 'Fuente', 'Fecha Creación', 'Creador'])
+            
+            # Escribir datos por bloques
+            for i, a in enumerate(query.yield_per(EXPORT_BLOQUE_FILAS), 1):
+                writer.writerow([
+                    a.id,
+                    a.actividad,
+                    a.tipo,
+                    a.aspecto,
+                    a.fuente,
+                    a.created_at.strftime('%Y-%m-%d %H:%M:%S') if a.created_at else '',
+                    nombre_creador(a, 'Desconocido')
+                ])
+                
+                if i % EXPORT_BLOQUE_FILAS == 0:
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate(0)
+            
+            yield output.getvalue()
         
-        # Escribir encabezados
-        writer.writerow(['ID', 'Actividad', 'Tipo', 'Aspecto/Bloque', 'Fuente', 'Fecha Creación', 'Creador'])
+        def comprimir_gzip(bloques):
+            compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+            for bloque in bloques:
+                datos = compresor.compress(bloque.encode('utf-8'))
+                if datos:
+                    yield datos
+            yield compresor.flush()
         
-        # Escribir datos
-        for a in actividades:
-            writer.writerow([
-                a.id,
-                a.actividad,
-                a.tipo,
-                a.aspecto,
-                a.fuente,
-                a.created_at.strftime('%Y-%m-%d %H:%M:%S') if a.created_at else '',
-                a.creador.username if a.creador else 'Desconocido'
-            ])
+        cuerpo = stream_with_context(generar_csv())
+        if comprimir:
+            cuerpo = comprimir_gzip(cuerpo)
         
         # Preparar respuesta
-        response = make_response(output.getvalue())
+        response = Response(cuerpo, mimetype='text/csv')
         response.headers['Content-Disposition'] = f'attachment; filename=actividades_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        response.headers['Content-type'] = 'text/csv'
+        if comprimir:
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
         
         return response
         
@@ -2221,57 +4725,20 @@ def api_admin_exportar_datos():
 def admin_dashboard():
     """Dashboard administrativo mejorado con filtros y estadísticas"""
     # Obtener estadísticas iniciales
-    total_actividades = AspectoAmbiental.query.count()
-    usuarios_count = User.query.count()
-    
-    # Estadísticas por fuente
-    total_actividades_canva = AspectoAmbiental.query.filter_by(fuente='canva').count()
-    total_actividades_foda_ext = AspectoAmbiental.query.filter_by(fuente='foda_ext').count()
-    total_actividades_foda_int = AspectoAmbiental.query.filter_by(fuente='foda_int').count()
-    
-    # Contar actividades positivas y negativas
-    actividades_positivas = AspectoAmbiental.query.filter_by(tipo='Positivo').count()
-    actividades_negativas = AspectoAmbiental.query.filter_by(tipo='Negativo').count()
-    
-    # Contar estrategias FODA cruzado
-    try:
-        estrategias_count = EstrategiaFodaCruzado.query.count()
-    except:
-        estrategias_count = 0
-    
-    # Contar actividades y tareas de estrategias
-    try:
-        actividades_estrategia_count = ActividadEstrategia.query.count()
-        tareas_actividad_count = TareaActividad.query.count()
-    except:
-        actividades_estrategia_count = 0
-        tareas_actividad_count = 0
-    
-    # Definir bloques CANVA para los filtros
-    bloques_canva = [
-        {'nombre': 'Mapeo de Actores y Comunidades Afectadas', 'icono': 'fas fa-users'},
-        {'nombre': 'Propuesta de Valor', 'icono': 'fas fa-gem'},
-        {'nombre': 'Canales', 'icono': 'fas fa-broadcast-tower'},
-        {'nombre': 'Relación con Actores', 'icono': 'fas fa-handshake'},
-        {'nombre': 'Fuentes de Ingreso', 'icono': 'fas fa-money-bill-wave'},
-        {'nombre': 'Recursos Clave', 'icono': 'fas fa-tools'},
-        {'nombre': 'Actividades Clave', 'icono': 'fas fa-tasks'},
-        {'nombre': 'Socios Clave', 'icono': 'fas fa-handshake'},
-        {'nombre': 'Estructura de Costes', 'icono': 'fas fa-calculator'}
-    ]
+    estadisticas = calcular_estadisticas()
     
     return render_template('admin_dashboard.html',
-                         total_actividades=total_actividades,
-                         usuarios_count=usuarios_count,
-                         total_actividades_canva=total_actividades_canva,
-                         total_actividades_foda_ext=total_actividades_foda_ext,
-                         total_actividades_foda_int=total_actividades_foda_int,
-                         estrategias_count=estrategias_count,
-                         actividades_estrategia_count=actividades_estrategia_count,
-                         tareas_actividad_count=tareas_actividad_count,
-                         actividades_positivas=actividades_positivas,
-                         actividades_negativas=actividades_negativas,
-                         bloques_canva=bloques_canva)
+                         total_actividades=estadisticas['total_actividades'],
+                         usuarios_count=estadisticas['usuarios_total'],
+                         total_actividades_canva=estadisticas['actividades_canva'],
+                         total_actividades_foda_ext=estadisticas['actividades_foda_ext'],
+                         total_actividades_foda_int=estadisticas['actividades_foda_int'],
+                         estrategias_count=estadisticas['estrategias_foda_cruzado'],
+                         actividades_estrategia_count=estadisticas['actividades_estrategia'],
+                         tareas_actividad_count=estadisticas['tareas_actividad'],
+                         actividades_positivas=estadisticas['actividades_positivas'],
+                         actividades_negativas=estadisticas['actividades_negativas'],
+                         bloques_canva=BLOQUES_CANVA)
 
 # ==================== ACTUALIZAR RUTA ADMIN PRINCIPAL ====================
 
@@ -2417,6 +4884,353 @@ def favicon():
     """Ruta para favicon.ico - Devuelve un 204 No Content para evitar errores"""
     return '', 204
 
+# ==================== DATOS SINTÉTICOS PARA PRUEBAS DE ESCALA ====================
+
+# Textos de los ejes tal como los muestra la página cruzado
+TEXTOS_EJES = {
+    'educacion': 'EDUCACIÓN',
+    'salud': 'SALUD',
+    'empleabilidad': 'EMPLEABILIDAD',
+    'desarrollo_economico': 'DESARROLLO ECONÓMICO',
+    'sostenibilidad_ambiental': 'SOSTENIBILIDAD AMBIENTAL (AGUA)',
+    'comunicacion': 'COMUNICACIÓN',
+    'institucional': 'INSTITUCIONAL'
+}
+
+# Vocabulario para componer textos verosímiles por categoría
+TEMAS_ASPECTO = {
+    'POLITICO': ['la relación con el gobierno regional', 'los procesos de consulta previa', 'la estabilidad normativa'],
+    'ECONOMICO': ['el precio internacional del cobre', 'la inversión en proveedores locales', 'el costo de la energía'],
+    'SOCIAL': ['la relación con las comunidades campesinas', 'el empleo local', 'la percepción pública del proyecto'],
+    'TECNOLOGICO': ['la automatización de la planta', 'el monitoreo remoto de relaves', 'la conectividad en la zona'],
+    'ECOLOGICO': ['la calidad del agua del río', 'la emisión de material particulado', 'la revegetación de zonas intervenidas'],
+    'LEGAL': ['la actualización del EIA', 'las fiscalizaciones de la OEFA', 'los permisos de uso de agua'],
+    'ADMINISTRACIÓN Y GERENCIA': ['la planificación anual', 'la toma de decisiones en campo', 'el control de presupuestos'],
+    'MARKETING Y VENTAS': ['los contratos de concentrado', 'la imagen corporativa', 'la diversificación de compradores'],
+    'OPERACIONES Y LOGÍSTICA': ['el transporte de concentrado', 'el mantenimiento de equipos', 'el abastecimiento de insumos'],
+    'FINANZAS Y CONTABILIDAD': ['el flujo de caja', 'el acceso a financiamiento', 'el control de costos operativos'],
+    'RECURSOS HUMANOS': ['la capacitación del personal', 'la rotación de operarios', 'la seguridad y salud ocupacional'],
+    'SISTEMAS DE INFORMACIÓN': ['el registro de incidentes', 'la integración de reportes', 'la trazabilidad de muestras'],
+    'TECNOLOGÍA': ['la flota de equipos', 'la planta de tratamiento de agua', 'los sensores de monitoreo'],
+}
+FRASES_ASPECTO = {
+    'Positivo': ['Mejora en {}', 'Fortalecimiento de {}', 'Avances en {}', 'Buen desempeño en {}'],
+    'Negativo': ['Riesgo asociado a {}', 'Deficiencias en {}', 'Conflictos por {}', 'Retrasos en {}'],
+}
+PLANTILLAS_ESTRATEGIA = {
+    'FO': 'Aprovechar {} para capitalizar {}',
+    'DO': 'Superar {} aprovechando {}',
+    'FA': 'Usar {} para enfrentar {}',
+    'DA': 'Reducir {} ante {}',
+}
+NOMBRES_ACTIVIDAD = ['Taller de', 'Programa de', 'Campaña de', 'Plan de', 'Monitoreo de', 'Mesa de diálogo sobre']
+NOMBRES_TAREA = ['Coordinar', 'Elaborar informe de', 'Convocar reunión de', 'Validar', 'Ejecutar', 'Supervisar']
+RESPONSABLES = ['Área Ambiental', 'Relaciones Comunitarias', 'Gerencia de Operaciones', 'Seguridad y Salud',
+                'Recursos Humanos', 'Logística', 'Legal', 'Comunicaciones']
+
+def insertar_filas_masivo(conexion, tabla, filas, tamano_bloque):
+    """Inserta un iterable de filas (dicts) por bloques sin pasar por el ORM.
+    
+    En PostgreSQL con psycopg2 usa COPY ... FROM STDIN; en SQLite, executemany
+    directo del driver (el procesado de parámetros de SQLAlchemy costaba más
+    que la propia inserción); en el resto, un executemany de Core por bloque.
+    Devuelve el número de filas insertadas.
+    """
+    dialecto = conexion.dialect
+    total = 0
+    bloque = []
+    
+    def volcar():
+        columnas = list(bloque[0])
+        if dialecto.name == 'postgresql' and dialecto.driver == 'psycopg2':
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            for fila in bloque:
+                escritor.writerow(['' if fila[c] is None else fila[c] for c in columnas])
+            buffer.seek(0)
+            cursor = conexion.connection.dbapi_connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            finally:
+                cursor.close()
+        elif dialecto.name == 'sqlite':
+            # Fechas en el mismo formato ISO que guarda SQLAlchemy en SQLite
+            fechas = [i for i, c in enumerate(columnas) if isinstance(bloque[0][c], (datetime, date))]
+            valores = []
+            for fila in bloque:
+                valores_fila = [fila[c] for c in columnas]
+                for i in fechas:
+                    if valores_fila[i] is not None:
+                        valores_fila[i] = valores_fila[i].isoformat(' ') if isinstance(valores_fila[i], datetime) else valores_fila[i].isoformat()
+                valores.append(tuple(valores_fila))
+            conexion.exec_driver_sql(
+                f"INSERT INTO {tabla.name} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                valores
+            )
+        else:
+            conexion.execute(tabla.insert(), bloque)
+    
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= tamano_bloque:
+            volcar()
+            total += len(bloque)
+            bloque = []
+    if bloque:
+        volcar()
+        total += len(bloque)
+    return total
+
+@contextmanager
+def carga_masiva(conexion, tablas):
+    """Retira índices secundarios y triggers de búsqueda durante una carga masiva
+    
+    Mantener los índices (y en SQLite el índice FTS de trigramas, que se
+    actualiza por trigger en cada fila) multiplica el coste de insertar. Se
+    guardan sus definiciones, se eliminan, y al terminar se recrean de una vez
+    (en SQLite se reconstruye el FTS). Todo ocurre en la transacción de la
+    conexión: si la carga falla, el rollback también devuelve los índices.
+    """
+    dialecto = conexion.dialect.name
+    recrear = []
+    
+    for tabla in tablas:
+        if dialecto == 'sqlite':
+            objetos = conexion.execute(text(
+                "SELECT type, name, sql FROM sqlite_master "
+                "WHERE tbl_name = :tabla AND sql IS NOT NULL AND "
+                "(type = 'index' OR (type = 'trigger' AND name GLOB '*_fts_a[iud]'))"
+            ), {'tabla': tabla.name}).all()
+            for tipo, nombre, sql in objetos:
+                conexion.execute(text(f"DROP {tipo.upper()} {nombre}"))
+                recrear.append(sql)
+        elif dialecto == 'postgresql':
+            indices = conexion.execute(text(
+                "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x "
+                "JOIN pg_class i ON i.oid = x.indexrelid "
+                "WHERE x.indrelid = CAST(:tabla AS regclass) AND NOT x.indisprimary AND NOT x.indisunique"
+            ), {'tabla': tabla.name}).all()
+            for nombre, definicion in indices:
+                conexion.execute(text(f'DROP INDEX "{nombre}"'))
+                recrear.append(definicion)
+    
+    yield
+    
+    inicio = time.perf_counter()
+    for sql in recrear:
+        conexion.execute(text(sql))
+    if dialecto == 'sqlite':
+        for tabla in tablas:
+            fts = f"{tabla.name}_fts"
+            if conexion.execute(text("SELECT 1 FROM sqlite_master WHERE name = :nombre"), {'nombre': fts}).first():
+                conexion.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    print(f"✅ {len(recrear)} índices/triggers recreados en {time.perf_counter() - inicio:.1f}s")
+
+def ids_nuevos(conexion, tabla, desde_id, *columnas):
+    """Filas insertadas después de desde_id (id y columnas pedidas), en orden de id"""
+    return conexion.execute(
+        select(tabla.c.id, *[tabla.c[c] for c in columnas]).where(tabla.c.id > desde_id).order_by(tabla.c.id)
+    ).all()
+
+def generar_aspectos(rng, fuente, cantidad, usuarios, ahora, dias):
+    """Filas de aspectos_ambientales con el vocabulario real de cada fuente"""
+    segundos = dias * 86400
+    for _ in range(cantidad):
+        tipo = 'Positivo' if rng.random() < 0.55 else 'Negativo'
+        creado = ahora - timedelta(seconds=rng.randrange(segundos))
+        if fuente == 'canva':
+            bloque = rng.choice(BLOQUES_CANVA)['nombre']
+            tema = rng.choice(TEMAS_ASPECTO[rng.choice(ASPECTOS_FODA_EXT)])
+            fila_tipo = bloque
+            fila_aspecto = f"{tipo}: {rng.choice(FRASES_ASPECTO[tipo]).format(tema)}"
+            actividad = f"{bloque}: {tema}"
+        else:
+            categoria = rng.choice(ASPECTOS_FODA_EXT if fuente == 'foda_ext' else ASPECTOS_FODA_INT)
+            fila_tipo = tipo
+            fila_aspecto = categoria
+            actividad = rng.choice(FRASES_ASPECTO[tipo]).format(rng.choice(TEMAS_ASPECTO[categoria]))
+        yield {
+            'actividad': actividad,
+            'tipo': fila_tipo,
+            'aspecto': fila_aspecto,
+            'fuente': fuente,
+            'created_at': creado,
+            'updated_at': creado,
+            'created_by': rng.choice(usuarios)
+        }
+
+def generar_estrategias(rng, cantidad, internos, externos, usuarios, ahora, dias):
+    """Estrategias FODA cruzado entre aspectos internos y externos existentes"""
+    segundos = dias * 86400
+    for _ in range(cantidad):
+        interno_id, interno_tipo, interno_texto = rng.choice(internos)
+        externo_id, externo_tipo, externo_texto = rng.choice(externos)
+        interno = 'fortaleza' if interno_tipo == 'Positivo' else 'debilidad'
+        externo = 'oportunidad' if externo_tipo == 'Positivo' else 'amenaza'
+        tipo_cruce = interno[0].upper() + externo[0].upper()
+        eje_id = rng.choice(EJES_VALIDOS)
+        yield {
+            'tipo_cruce': tipo_cruce,
+            'elemento_interno_id': interno_id,
+            'elemento_interno_tipo': interno,
+            'elemento_interno_texto': interno_texto,
+            'elemento_externo_id': externo_id,
+            'elemento_externo_tipo': externo,
+            'elemento_externo_texto': externo_texto,
+            'estrategia': PLANTILLAS_ESTRATEGIA[tipo_cruce].format(interno_texto.lower(), externo_texto.lower()),
+            'eje_id': eje_id,
+            'eje_texto': TEXTOS_EJES[eje_id],
+            'fecha_creacion': ahora - timedelta(seconds=rng.randrange(segundos)),
+            'creador_id': rng.choice(usuarios),
+            'elementos_normalizados': True
+        }
+
+def generar_actividades(rng, estrategias, por_estrategia, usuarios, hoy, dias):
+    """Actividades (tácticas) de cada estrategia con fechas alrededor de hoy"""
+    for estrategia_id, eje_texto in estrategias:
+        for _ in range(por_estrategia):
+            inicio = hoy - timedelta(days=rng.randrange(dias)) + timedelta(days=rng.randrange(90))
+            yield {
+                'estrategia_id': estrategia_id,
+                'nombre': f"{rng.choice(NOMBRES_ACTIVIDAD)} {eje_texto.lower()}",
+                'descripcion': None,
+                'responsable': rng.choice(RESPONSABLES),
+                'fecha_inicio': inicio,
+                'fecha_fin': inicio + timedelta(days=rng.randint(14, 180)),
+                'fecha_creacion': datetime.combine(inicio, datetime.min.time()),
+                'creador_id': rng.choice(usuarios)
+            }
+
+def generar_tareas(rng, actividades, por_actividad, usuarios, hoy):
+    """Tareas dentro de la ventana de su actividad; el estado depende de las fechas"""
+    for actividad_id, nombre, fecha_inicio, fecha_fin in actividades:
+        duracion = max(1, (fecha_fin - fecha_inicio).days)
+        for _ in range(por_actividad):
+            inicio = fecha_inicio + timedelta(days=rng.randrange(duracion))
+            fin = min(fecha_fin, inicio + timedelta(days=rng.randint(3, 30)))
+            if fin < hoy:
+                estado = 'completada' if rng.random() < 0.8 else 'en_progreso'
+            elif inicio <= hoy:
+                estado = rng.choice(ESTADOS_TAREA)
+            else:
+                estado = 'pendiente'
+            yield {
+                'actividad_id': actividad_id,
+                'nombre': f"{rng.choice(NOMBRES_TAREA)} {nombre.lower()}"[:200],
+                'descripcion': None,
+                'responsable': rng.choice(RESPONSABLES),
+                'fecha_inicio': inicio,
+                'fecha_fin': fin,
+                'estado': estado,
+                'fecha_creacion': datetime.combine(fecha_inicio, datetime.min.time()),
+                'creador_id': rng.choice(usuarios)
+            }
+
+@app.cli.command('generar-datos')
+@click.option('--canva', default=30000, show_default=True, help='Aspectos del CANVA')
+@click.option('--foda-ext', default=40000, show_default=True, help='Aspectos de FODA externo')
+@click.option('--foda-int', default=30000, show_default=True, help='Aspectos de FODA interno')
+@click.option('--estrategias', default=2000, show_default=True, help='Estrategias FODA cruzado')
+@click.option('--actividades', default=3, show_default=True, help='Actividades por estrategia')
+@click.option('--tareas', default=4, show_default=True, help='Tareas por actividad')
+@click.option('--dias', default=365, show_default=True, help='Antigüedad máxima de los registros')
+@click.option('--semilla', default=42, show_default=True, help='Semilla para datos reproducibles')
+@click.option('--bloque', default=20000, show_default=True, help='Filas por sentencia/COPY')
+@click.option('--vaciar', is_flag=True, help='Borrar aspectos, estrategias, actividades y tareas antes de generar')
+def generar_datos_command(canva, foda_ext, foda_int, estrategias, actividades, tareas, dias, semilla, bloque, vaciar):
+    """Generar un volumen realista de datos sintéticos para pruebas de escala"""
+    if vaciar and not click.confirm('⚠️  Se borrarán TODOS los aspectos, estrategias, actividades y tareas. ¿Continuar?'):
+        return
+    
+    rng = random.Random(semilla)
+    ahora = datetime.utcnow()
+    hoy = ahora.date()
+    tablas = {
+        'aspectos': AspectoAmbiental.__table__,
+        'estrategias': EstrategiaFodaCruzado.__table__,
+        'actividades': ActividadEstrategia.__table__,
+        'tareas': TareaActividad.__table__,
+        'elementos': EstrategiaElemento.__table__,
+    }
+    
+    usuarios = [u for (u,) in db.session.execute(select(User.id)).all()]
+    if not usuarios:
+        print("❌ No hay usuarios: ejecutar antes 'flask --app app init-db'")
+        sys.exit(1)
+    
+    inicio_total = time.perf_counter()
+    # Una sola transacción: si algo falla no queda un conjunto de datos a medias
+    with db.engine.begin() as conexion, carga_masiva(conexion, list(tablas.values())):
+        if vaciar:
+            for nombre in ('tareas', 'actividades', 'elementos', 'estrategias', 'aspectos'):
+                conexion.execute(tablas[nombre].delete())
+            print("🗑️  Tablas vaciadas")
+        
+        for fuente, cantidad in (('canva', canva), ('foda_ext', foda_ext), ('foda_int', foda_int)):
+            inicio = time.perf_counter()
+            total = insertar_filas_masivo(
+                conexion, tablas['aspectos'],
+                generar_aspectos(rng, fuente, cantidad, usuarios, ahora, dias), bloque
+            )
+            print(f"✅ {total} aspectos {fuente} en {time.perf_counter() - inicio:.1f}s")
+        
+        # Las estrategias cruzan aspectos reales (muestra acotada de cada lado)
+        aspectos = tablas['aspectos']
+        
+        def muestra(fuente):
+            return conexion.execute(
+                select(aspectos.c.id, aspectos.c.tipo, aspectos.c.actividad)
+                .where(aspectos.c.fuente == fuente).order_by(aspectos.c.id.desc()).limit(500)
+            ).all()
+        
+        internos, externos = muestra('foda_int'), muestra('foda_ext')
+        if estrategias and (not internos or not externos):
+            print("⚠️  Sin aspectos FODA interno/externo no se pueden generar estrategias")
+            estrategias = 0
+        
+        if estrategias:
+            inicio = time.perf_counter()
+            ultimo_id = conexion.execute(select(func.coalesce(func.max(tablas['estrategias'].c.id), 0))).scalar()
+            insertar_filas_masivo(
+                conexion, tablas['estrategias'],
+                generar_estrategias(rng, estrategias, internos, externos, usuarios, ahora, dias), bloque
+            )
+            # Cada estrategia generada cruza un interno y un externo: sus enlaces salen de las columnas heredadas
+            generadas = tablas['estrategias']
+            for rol in ('interno', 'externo'):
+                conexion.execute(tablas['elementos'].insert().from_select(
+                    ['estrategia_id', 'rol', 'aspecto_id', 'tipo', 'texto'],
+                    select(generadas.c.id, literal(rol), generadas.c[f'elemento_{rol}_id'], generadas.c[f'elemento_{rol}_tipo'],
+                           generadas.c[f'elemento_{rol}_texto'])
+                    .where(generadas.c.id > ultimo_id)
+                ))
+            nuevas = ids_nuevos(conexion, tablas['estrategias'], ultimo_id, 'eje_texto')
+            print(f"✅ {len(nuevas)} estrategias en {time.perf_counter() - inicio:.1f}s")
+            
+            inicio = time.perf_counter()
+            ultimo_id = conexion.execute(select(func.coalesce(func.max(tablas['actividades'].c.id), 0))).scalar()
+            insertar_filas_masivo(
+                conexion, tablas['actividades'],
+                generar_actividades(rng, nuevas, actividades, usuarios, hoy, dias), bloque
+            )
+            nuevas = ids_nuevos(conexion, tablas['actividades'], ultimo_id, 'nombre', 'fecha_inicio', 'fecha_fin')
+            print(f"✅ {len(nuevas)} actividades en {time.perf_counter() - inicio:.1f}s")
+            
+            inicio = time.perf_counter()
+            total = insertar_filas_masivo(
+                conexion, tablas['tareas'], generar_tareas(rng, nuevas, tareas, usuarios, hoy), bloque
+            )
+            print(f"✅ {total} tareas en {time.perf_counter() - inicio:.1f}s")
+        
+        # Los INSERT masivos no pasan por el ORM: contadores recalculados en la misma transacción
+        reconstruir_contadores(conexion)
+    
+    # Con Redis la caché es compartida: las vistas de los workers deben recalcularse
+    invalidar_cache('aspectos', 'estrategias', 'actividades', 'tareas', *etiquetas_red())
+    print(f"🎉 Datos sintéticos generados en {time.perf_counter() - inicio_total:.1f}s")
+
 # ==================== INICIALIZACIÓN ====================
 
 print("=" * 60)
@@ -2436,27 +5250,83 @@ print("  ✅ Responsive total (mobile, tablet, desktop)")
 print("  ✅ 9 usuarios pre-creados")
 print("=" * 60)
 
-# Inicializar base de datos
-with app.app_context():
-    try:
-        print("🔄 Inicializando base de datos...")
-        if initialize_database():
-            print("✅ Base de datos inicializada correctamente")
-            print("✅ Tablas creadas: usuarios, aspectos_ambientales, estrategias_foda_cruzado")
-            print("✅ Tablas adicionales: actividades_estrategia, tareas_actividad")
-            print("✅ Campos de eje añadidos a estrategias_foda_cruzado")
-        else:
+def ejecutar_inicializacion():
+    """Inicializa la base de datos (tablas, migraciones, índices y usuarios)"""
+    with app.app_context():
+        try:
+            print("🔄 Inicializando base de datos...")
+            if initialize_database():
+                print("✅ Base de datos inicializada correctamente")
+                print("✅ Tablas creadas: usuarios, aspectos_ambientales, estrategias_foda_cruzado")
+                print("✅ Tablas adicionales: estrategia_elementos, actividades_estrategia, tareas_actividad")
+                print("✅ Campos de eje añadidos a estrategias_foda_cruzado")
+                return True
             print("⚠️  Advertencia: Problemas con la inicialización de BD")
-        print("✅ Sistema listo para recibir conexiones")
-    except Exception as e:
-        print(f"❌ Error crítico: {e}")
+        except Exception as e:
+            print(f"❌ Error crítico: {e}")
+    return False
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Inicializar/migrar la base de datos una sola vez (fase release del despliegue)"""
+    if not ejecutar_inicializacion():
+        sys.exit(1)
+
+@app.cli.command('revocar-sesiones')
+@click.argument('username')
+@click.option('--rol', type=click.Choice(['admin', 'user']), help='Cambiar también el rol del usuario')
+def revocar_sesiones_command(username, rol):
+    """Cerrar las sesiones abiertas de un usuario (y opcionalmente cambiar su rol)"""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        print(f"❌ No existe el usuario '{username}'")
+        sys.exit(1)
+    if rol:
+        user.rol = rol
+    user.revocar_sesiones()
+    db.session.commit()
+    olvidar_epoca(user.id)
+    print(f"✅ Sesiones de '{username}' revocadas (rol: {user.rol}); los workers lo aplican en menos de {AUTORIZACION_TTL}s")
+
+@app.cli.command('reconciliar-contadores')
+def reconciliar_contadores_command():
+    """Recalcular los contadores resumen desde las tablas e informar de las diferencias"""
+    with db.engine.begin() as conexion:
+        antes = leer_contadores(conexion)
+        reconstruir_contadores(conexion)
+        despues = leer_contadores(conexion)
+    
+    diferencias = sorted(
+        (clave, antes.get(clave, 0), despues.get(clave, 0))
+        for clave in set(antes) | set(despues)
+        if antes.get(clave, 0) != despues.get(clave, 0)
+    )
+    for (tabla, fuente, polaridad, dia), anterior, actual in diferencias[:50]:
+        print(f"⚠️  {tabla}/{fuente or '-'}/{polaridad or '-'}/{dia}: {anterior} → {actual}")
+    if len(diferencias) > 50:
+        print(f"   ... y {len(diferencias) - 50} más")
+    
+    invalidar_cache('aspectos', 'estrategias', 'actividades', 'tareas')
+    print(f"✅ Contadores reconciliados: {len(despues)} filas, {len(diferencias)} diferencias corregidas")
+
+# La inicialización ya no corre en cada worker de gunicorn: se ejecuta una vez con
+# "flask --app app init-db" (proceso release del Procfile). INIT_DB_ON_STARTUP=true
+# recupera el comportamiento anterior.
+if os.environ.get('INIT_DB_ON_STARTUP', 'False').lower() == 'true':
+    ejecutar_inicializacion()
 
+print("✅ Sistema listo para recibir conexiones")
 print("=" * 60)
 
 # ==================== EJECUCIÓN ====================
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 3000))
+    
+    # En desarrollo se inicializa la BD al arrancar (si no se hizo ya al importar)
+    if os.environ.get('INIT_DB_ON_STARTUP', 'False').lower() != 'true':
+        ejecutar_inicializacion()
+    
     print(f"🌐 Servidor ejecutándose en: http://0.0.0.0:{port}")
     print(f"📱 Modo: FODA Cruzado con Ejes y Nuevas Pestañas")
     print("=" * 60)
@@ -0,0 +1,92 @@
+"""Coste de la autorización en el polling del dashboard de administración
+
+Simula el polling de /api/admin/estadisticas de una pestaña del dashboard
+(revalidando con If-None-Match, como hace el navegador) y mide sentencias SQL y
+latencia por petición en dos modos:
+
+    sin caché   AUTORIZACION_TTL=0: se consulta el usuario en cada petición
+                (equivale a la consulta que hacía admin_required)
+    con caché   AUTORIZACION_TTL por defecto: la época y el rol se leen de la
+                caché del worker y la BD solo se consulta al expirar
+
+Se ejecuta en proceso con el cliente de pruebas de Flask contra una SQLite
+temporal, así que mide el trabajo de la app y no la red.
+
+Uso (desde la raíz del repositorio):
+    python bench/autorizacion.py --peticiones 2000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from comun import RAIZ, percentil
+
+
+def medir(app_modulo, cliente, ruta, peticiones, ttl):
+    app_modulo.AUTORIZACION_TTL = ttl
+    with app_modulo._epocas_lock:
+        app_modulo._epocas_usuarios.clear()
+
+    sentencias = [0]
+
+    def contar(*args):
+        sentencias[0] += 1
+
+    app_modulo.event.listen(app_modulo.Engine, 'after_cursor_execute', contar)
+    try:
+        etag = None
+        latencias = []
+        for _ in range(peticiones):
+            inicio = time.perf_counter()
+            respuesta = cliente.get(ruta, headers={'If-None-Match': etag} if etag else {})
+            latencias.append(time.perf_counter() - inicio)
+            etag = respuesta.headers.get('ETag', etag)
+            assert respuesta.status_code in (200, 304), respuesta.status_code
+    finally:
+        app_modulo.event.remove(app_modulo.Engine, 'after_cursor_execute', contar)
+
+    return {
+        'sql_por_peticion': round(sentencias[0] / peticiones, 3),
+        'media_ms': round(sum(latencias) / peticiones * 1000, 3),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--peticiones', type=int, default=1000)
+    parser.add_argument('--ruta', default='/api/admin/estadisticas')
+    parser.add_argument('--usuario', default='ANDRES')
+    parser.add_argument('--clave', default='ANDRES')
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directorio, 'autorizacion.db')}"
+    os.environ['INIT_DB_ON_STARTUP'] = 'False'
+    sys.path.insert(0, RAIZ)
+    import app as app_modulo
+
+    app_modulo.ejecutar_inicializacion()
+    cliente = app_modulo.app.test_client()
+    cliente.post('/login', data={'username': args.usuario, 'password': args.clave})
+
+    # Calentamiento: plantillas, caché de vistas y conexiones
+    medir(app_modulo, cliente, args.ruta, 50, 30)
+
+    ttl = int(os.environ.get('AUTORIZACION_TTL', 30))
+    resultados = {
+        'sin caché (TTL=0)': medir(app_modulo, cliente, args.ruta, args.peticiones, 0),
+        f'con caché (TTL={ttl}s)': medir(app_modulo, cliente, args.ruta, args.peticiones, ttl),
+    }
+
+    print(f"\n== {args.ruta} x {args.peticiones} (revalidando con ETag)")
+    print(f"{'modo':<22}{'SQL/petición':>14}{'media ms':>11}{'p95 ms':>10}")
+    for modo, r in resultados.items():
+        print(f"{modo:<22}{r['sql_por_peticion']:>14}{r['media_ms']:>11}{r['p95_ms']:>10}")
+
+
+if __name__ == '__main__':
+    main()
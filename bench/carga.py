@@ -0,0 +1,99 @@
+"""Prueba de carga: compara los modelos de worker de gunicorn (sync, gthread, gevent)
+
+Para cada modelo arranca gunicorn con gunicorn.conf.py contra una base de datos
+local, inicia sesión con un usuario sembrado y lanza N clientes concurrentes
+que recorren las páginas y APIs principales durante un tiempo fijo. Al final
+muestra req/s y latencias p50/p95/p99 por ruta y por modelo.
+
+Uso (desde la raíz del repositorio):
+    python bench/carga.py                                   # gthread y sync
+    python bench/carga.py --workers sync gthread gevent --duracion 30 --clientes 32
+    python bench/carga.py --url http://localhost:3000       # servidor ya arrancado
+    python bench/carga.py --json resultados.json
+
+Por defecto usa una SQLite en bench/carga.db (se inicializa con init-db). Para
+PostgreSQL pasar --database-url; conviene una base desechable.
+Solo usa la biblioteca estándar.
+"""
+
+import argparse
+import json
+
+from comun import (DB_POR_DEFECTO, arrancar_gunicorn, detener, ejecutar_concurrente,
+                   entorno_bd, imprimir, inicializar_bd, resumir)
+
+# Mezcla de rutas: páginas HTML y APIs de lectura que usan las páginas
+RUTAS = [
+    '/inicio',
+    '/fodaext',
+    '/cruzado',
+    '/estrategias',
+    '/red',
+    '/api/estrategias_foda_con_eje',
+    '/api/estrategias/jerarquia',
+    '/api/red/gantt',
+    '/api/admin/estadisticas',
+    '/admin/dashboard',
+]
+
+
+def ejecutar_carga(base, rutas, clientes, duracion, usuario, clave):
+    def siguiente(n):
+        ruta = rutas[n % len(rutas)]
+        return ruta, lambda cliente: cliente.get(ruta)
+
+    return ejecutar_concurrente(base, clientes, duracion, usuario, clave, siguiente)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', nargs='+', default=['sync', 'gthread'],
+                        help='modelos de worker a comparar (sync, gthread, gevent)')
+    parser.add_argument('--url', help='usar un servidor ya arrancado en vez de lanzar gunicorn')
+    parser.add_argument('--database-url', default=DB_POR_DEFECTO)
+    parser.add_argument('--procesos', type=int, default=2, help='WEB_CONCURRENCY')
+    parser.add_argument('--hilos', type=int, default=4, help='GUNICORN_THREADS (gthread)')
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--duracion', type=float, default=15, help='segundos por modelo')
+    parser.add_argument('--usuario', default='ANDRES')
+    parser.add_argument('--clave', default='ANDRES')
+    parser.add_argument('--rutas', nargs='+', default=RUTAS)
+    parser.add_argument('--json', help='guardar los resultados en este fichero')
+    args = parser.parse_args()
+
+    resultados = {}
+
+    if args.url:
+        crudo, segundos = ejecutar_carga(args.url, args.rutas, args.clientes, args.duracion, args.usuario, args.clave)
+        resultados[args.url] = resumir(crudo, segundos)
+        imprimir(resultados[args.url], args.url)
+    else:
+        entorno = entorno_bd(args.database_url)
+        print(f"🗄️  Base de datos: {args.database_url}")
+        inicializar_bd(entorno)
+
+        for worker in args.workers:
+            proceso, base = arrancar_gunicorn(worker, entorno, args.procesos, args.hilos)
+            try:
+                crudo, segundos = ejecutar_carga(base, args.rutas, args.clientes, args.duracion,
+                                                 args.usuario, args.clave)
+            finally:
+                detener(proceso)
+            resultados[worker] = resumir(crudo, segundos)
+            imprimir(resultados[worker], f"{worker} ({args.procesos} procesos, {args.clientes} clientes, {args.duracion:.0f}s)")
+
+        if len(resultados) > 1:
+            print("\n== Comparación (TOTAL)")
+            for worker, resumen in resultados.items():
+                total = resumen['TOTAL']
+                print(f"{worker:<10} {total['req_s']:>8} req/s   p50 {total['p50_ms']:>7} ms   "
+                      f"p99 {total['p99_ms']:>7} ms   errores {total['errores']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
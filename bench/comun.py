@@ -0,0 +1,206 @@
+"""Utilidades compartidas por los scripts de bench/ (solo biblioteca estándar)"""
+
+import http.cookiejar
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_POR_DEFECTO = f"sqlite:///{os.path.join(RAIZ, 'bench', 'carga.db')}"
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+class Cliente:
+    """Cliente HTTP con su propia cookie de sesión"""
+
+    def __init__(self, base):
+        self.base = base.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def login(self, usuario, clave, reintentos=20):
+        datos = urllib.parse.urlencode({'username': usuario, 'password': clave}).encode()
+        for _ in range(reintentos):
+            try:
+                with self.opener.open(self.base + '/login', data=datos, timeout=30) as r:
+                    r.read()
+                    if r.geturl().rstrip('/').endswith('/login'):
+                        raise RuntimeError(f"No se pudo iniciar sesión como {usuario}")
+                    return
+            except urllib.error.HTTPError as e:
+                # 503: el pool de verificación de contraseñas está lleno
+                if e.code != 503:
+                    raise
+                time.sleep(min(float(e.headers.get('Retry-After', 1)), 1.0))
+        raise RuntimeError(f"El servidor rechazó el inicio de sesión de {usuario} (503)")
+
+    def get(self, ruta):
+        with self.opener.open(self.base + ruta, timeout=60) as r:
+            r.read()
+            return r.status
+
+    def post(self, ruta, datos=None, cabeceras=None):
+        """POST con cuerpo JSON; devuelve (status, bytes leídos)"""
+        peticion = urllib.request.Request(
+            self.base + ruta,
+            data=json.dumps(datos or {}).encode(),
+            headers=dict({'Content-Type': 'application/json'}, **(cabeceras or {})),
+            method='POST'
+        )
+        with self.opener.open(peticion, timeout=120) as r:
+            return r.status, len(r.read())
+
+
+def resumir(resultados, segundos):
+    """{clave: {'latencias': [...], 'errores': n}} -> req/s y percentiles por clave y TOTAL"""
+    resumen = {}
+    todas = []
+    errores = 0
+    for clave, datos in resultados.items():
+        latencias = datos['latencias']
+        todas += latencias
+        errores += datos['errores']
+        resumen[clave] = metricas(latencias, datos['errores'], segundos)
+    resumen['TOTAL'] = metricas(todas, errores, segundos)
+    return resumen
+
+
+def metricas(latencias, errores, segundos):
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'req_s': round(len(latencias) / segundos, 1) if segundos else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 1),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 1),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 1),
+    }
+
+
+def ejecutar_concurrente(base, clientes, duracion, usuario, clave, siguiente):
+    """Lanza clientes autenticados hasta agotar la duración.
+
+    siguiente(n) devuelve (clave, operacion) para la n-ésima operación de un
+    cliente; operacion(cliente) hace las peticiones y cualquier excepción
+    cuenta como error de esa clave (ruta o escenario).
+    """
+    resultados = {}
+    lock = threading.Lock()
+    fin = time.perf_counter() + duracion
+
+    def trabajar(numero):
+        cliente = Cliente(base)
+        cliente.login(usuario, clave)
+        n = numero  # cada cliente empieza en un punto distinto de la mezcla
+        while time.perf_counter() < fin:
+            clave_op, operacion = siguiente(n)
+            n += 1
+            inicio = time.perf_counter()
+            try:
+                operacion(cliente)
+                error = False
+            except (urllib.error.URLError, OSError):
+                error = True
+            latencia = time.perf_counter() - inicio
+            with lock:
+                datos = resultados.setdefault(clave_op, {'latencias': [], 'errores': 0})
+                if error:
+                    datos['errores'] += 1
+                else:
+                    datos['latencias'].append(latencia)
+
+    hilos = [threading.Thread(target=trabajar, args=(n,)) for n in range(clientes)]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return resultados, time.perf_counter() - inicio
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(base, proceso, timeout=60):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("gunicorn terminó antes de aceptar conexiones")
+        try:
+            with urllib.request.urlopen(base + '/login', timeout=2) as r:
+                r.read()
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.3)
+    raise RuntimeError("gunicorn no respondió a tiempo")
+
+
+def entorno_bd(database_url):
+    return dict(os.environ, DATABASE_URL=database_url, INIT_DB_ON_STARTUP='False')
+
+
+def inicializar_bd(entorno):
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'],
+                   cwd=RAIZ, env=entorno, check=True, stdout=subprocess.DEVNULL)
+
+
+def arrancar_gunicorn(worker, entorno_base, workers, hilos):
+    """Arranca gunicorn con gunicorn.conf.py en un puerto libre; devuelve (proceso, url)"""
+    puerto = puerto_libre()
+    entorno = dict(entorno_base)
+    entorno.update({
+        'PORT': str(puerto),
+        'GUNICORN_WORKER_CLASS': worker,
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_THREADS': str(hilos),
+    })
+    # stderr a un fichero: un PIPE sin leer bloquearía gunicorn al llenarse
+    log = tempfile.TemporaryFile()
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=log
+    )
+    base = f'http://127.0.0.1:{puerto}'
+    try:
+        esperar_servidor(base, proceso)
+    except RuntimeError:
+        proceso.kill()
+        log.seek(0)
+        print(log.read().decode(errors='replace')[-2000:])
+        raise
+    return proceso, base
+
+
+def detener(proceso):
+    proceso.terminate()
+    try:
+        proceso.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proceso.kill()
+
+
+def imprimir(resumen, titulo, columna='ruta'):
+    ancho = max([34] + [len(clave) + 2 for clave in resumen])
+    print(f"\n== {titulo}")
+    print(f"{columna:<{ancho}}{'req':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for clave, r in resumen.items():
+        print(f"{clave:<{ancho}}{r['peticiones']:>8}{r['errores']:>6}{r['req_s']:>9}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
@@ -0,0 +1,132 @@
+"""Memoria de la exportación CSV del admin según el tamaño de la tabla
+
+Carga aspectos_ambientales hasta cada uno de los tamaños indicados (con el
+comando generar-datos) y, para cada tamaño, exporta la tabla completa con
+/api/admin/exportar_datos en un proceso nuevo. Ese proceso consume la
+respuesta bloque a bloque, como un cliente HTTP, y mide:
+
+    primer byte   tiempo hasta el primer bloque del CSV
+    total         tiempo hasta el último bloque
+    RSS base      memoria residente máxima antes de exportar (app importada, sesión iniciada)
+    RSS pico      memoria residente máxima al terminar la exportación
+
+Con la exportación en streaming (yield_per + generador) el incremento de RSS no
+debe crecer con el número de filas.
+
+Se ejecuta en proceso con el cliente de pruebas de Flask, así que mide el
+trabajo de la app y no la red. Por defecto usa una SQLite temporal; con
+--database-url se puede usar una PostgreSQL desechable (se le añaden filas).
+
+Uso (desde la raíz del repositorio):
+    python bench/exportacion.py                              # 100.000 y 1.000.000 filas
+    python bench/exportacion.py --filas 50000 200000 --comprimir
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from comun import RAIZ, entorno_bd, inicializar_bd
+
+
+def rss_maximo_mb():
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir(usuario, clave, comprimir):
+    """Se ejecuta en el proceso hijo: una exportación completa y sus métricas en JSON"""
+    sys.path.insert(0, RAIZ)
+    import app as app_modulo
+
+    cliente = app_modulo.app.test_client()
+    cliente.post('/login', data={'username': usuario, 'password': clave})
+    rss_base = rss_maximo_mb()
+
+    inicio = time.perf_counter()
+    primer_byte = None
+    total_bytes = 0
+    respuesta = cliente.post(
+        '/api/admin/exportar_datos', json={'comprimir': comprimir},
+        headers={'Accept-Encoding': 'gzip'} if comprimir else {}, buffered=False
+    )
+    assert respuesta.status_code == 200, respuesta.status_code
+    for bloque in respuesta.response:
+        if primer_byte is None:
+            primer_byte = time.perf_counter() - inicio
+        total_bytes += len(bloque)
+    respuesta.close()
+
+    print(json.dumps({
+        'primer_byte_ms': round((primer_byte or 0) * 1000, 1),
+        'total_s': round(time.perf_counter() - inicio, 2),
+        'mb': round(total_bytes / 2**20, 1),
+        'rss_base_mb': round(rss_base, 1),
+        'rss_pico_mb': round(rss_maximo_mb(), 1),
+    }))
+
+
+def contar_aspectos(entorno):
+    salida = subprocess.run(
+        [sys.executable, '-c', 'import app; from app import db, AspectoAmbiental\n'
+         'with app.app.app_context(): print(db.session.query(AspectoAmbiental).count())'],
+        cwd=RAIZ, env=entorno, check=True, capture_output=True, text=True
+    ).stdout
+    return int(salida.strip().splitlines()[-1])
+
+
+def cargar_hasta(entorno, filas):
+    faltan = filas - contar_aspectos(entorno)
+    if faltan <= 0:
+        return
+    print(f"🌱 Generando {faltan} aspectos...")
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'generar-datos', '--canva', str(faltan),
+         '--foda-ext', '0', '--foda-int', '0', '--estrategias', '0', '--semilla', str(filas)],
+        cwd=RAIZ, env=entorno, check=True, stdout=subprocess.DEVNULL
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=[100000, 1000000],
+                        help='tamaños de aspectos_ambientales a medir (ascendentes)')
+    parser.add_argument('--database-url', help='BD a usar (por defecto una SQLite temporal)')
+    parser.add_argument('--comprimir', action='store_true', help='pedir la exportación con gzip')
+    parser.add_argument('--usuario', default='ANDRES')
+    parser.add_argument('--clave', default='ANDRES')
+    parser.add_argument('--medir', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        medir(args.usuario, args.clave, args.comprimir)
+        return
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'exportacion.db')}"
+    entorno = entorno_bd(database_url)
+    inicializar_bd(entorno)
+
+    resultados = {}
+    for filas in sorted(args.filas):
+        cargar_hasta(entorno, filas)
+        comando = [sys.executable, os.path.abspath(__file__), '--medir',
+                   '--usuario', args.usuario, '--clave', args.clave]
+        if args.comprimir:
+            comando.append('--comprimir')
+        salida = subprocess.run(comando, cwd=RAIZ, env=entorno, check=True, capture_output=True, text=True).stdout
+        resultados[filas] = json.loads(salida.strip().splitlines()[-1])
+
+    print(f"\n== POST /api/admin/exportar_datos{' (gzip)' if args.comprimir else ''}")
+    print(f"{'filas':>10}{'CSV MB':>9}{'1er byte ms':>13}{'total s':>9}{'RSS base MB':>13}{'RSS pico MB':>13}{'Δ RSS MB':>10}")
+    for filas, r in resultados.items():
+        print(f"{filas:>10}{r['mb']:>9}{r['primer_byte_ms']:>13}{r['total_s']:>9}"
+              f"{r['rss_base_mb']:>13}{r['rss_pico_mb']:>13}{round(r['rss_pico_mb'] - r['rss_base_mb'], 1):>10}")
+
+
+if __name__ == '__main__':
+    main()
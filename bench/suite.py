@@ -0,0 +1,270 @@
+"""Suite de benchmarks HTTP con baselines guardadas
+
+Arranca la app con gunicorn (gunicorn.conf.py) contra una SQLite local o una
+PostgreSQL desechable, siembra datos si la base está vacía, inicia sesión con un
+usuario sembrado y ejecuta mezclas realistas de peticiones:
+
+    dashboard    polling de estadísticas y filtro de actividades del admin
+    foda         guardados de FODA externo/interno (individual y matriz)
+    estrategias  página de estrategias, árbol jerárquico y FODA cruzado
+    red          modelo de vista del Gantt
+    exportar     exportación CSV completa (streaming + gzip)
+
+Informa req/s y p50/p95/p99 por ruta y compara con una baseline guardada en
+bench/baselines/<nombre>.json; las rutas que empeoran más que la tolerancia se
+marcan como regresión.
+
+Uso (desde la raíz del repositorio):
+    python bench/suite.py                                    # todas las mezclas, compara con 'local'
+    python bench/suite.py --escenarios dashboard estrategias --duracion 20
+    python bench/suite.py --guardar-baseline local           # fija la baseline
+    python bench/suite.py --baseline local --estricto        # exit 1 si hay regresiones
+    python bench/suite.py --database-url postgresql://localhost/bench
+
+Los números dependen de la máquina: comparar siempre contra una baseline
+tomada en el mismo equipo y con los mismos parámetros. La mezcla 'foda' escribe
+en la base, así que para comparar entre ejecuciones usar --recrear (SQLite) o
+una PostgreSQL recién creada.
+
+Para volúmenes de producción, cargar antes la base con
+    DATABASE_URL=... flask --app app generar-datos --foda-ext 400000 ...
+y ejecutar la suite contra esa misma --database-url.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+
+from comun import (DB_POR_DEFECTO, RAIZ, Cliente, arrancar_gunicorn, detener, ejecutar_concurrente,
+                   entorno_bd, imprimir, inicializar_bd, resumir)
+
+DIR_BASELINES = os.path.join(RAIZ, 'bench', 'baselines')
+
+ASPECTOS_EXT = ['POLITICO', 'ECONOMICO', 'SOCIAL', 'TECNOLOGICO', 'ECOLOGICO', 'LEGAL']
+ASPECTOS_INT = ['ADMINISTRACIÓN Y GERENCIA', 'MARKETING Y VENTAS', 'OPERACIONES Y LOGÍSTICA',
+                'FINANZAS Y CONTABILIDAD', 'RECURSOS HUMANOS', 'SISTEMAS DE INFORMACIÓN', 'TECNOLOGÍA']
+EJES = ['educacion', 'salud', 'empleabilidad', 'desarrollo_economico',
+        'sostenibilidad_ambiental', 'comunicacion', 'institucional']
+
+
+def lote_matriz(n, aspectos):
+    return {'actividades': [
+        {'actividad': f'Actividad bench {random.randint(0, 10**6)}',
+         'tipo': random.choice(['Positivo', 'Negativo']),
+         'aspecto_nuevo': random.choice(aspectos)}
+        for _ in range(n)
+    ]}
+
+
+def filtro_dashboard(**extra):
+    datos = {'pagina': 1, 'por_pagina': 25, 'orden_por': 'fecha_desc', 'total': 'estimado'}
+    datos.update(extra)
+    return datos
+
+
+# Cada escenario es una lista de (peso, etiqueta, operacion(cliente))
+ESCENARIOS = {
+    'dashboard': [
+        (3, 'GET /api/admin/estadisticas', lambda c: c.get('/api/admin/estadisticas')),
+        (2, 'POST /api/admin/filtrar_actividades', lambda c: c.post('/api/admin/filtrar_actividades', filtro_dashboard())),
+        (1, 'POST /api/admin/filtrar_actividades (cursor)', lambda c: c.post(
+            '/api/admin/filtrar_actividades', filtro_dashboard(paginacion='cursor', fuente_filtro='foda_ext'))),
+        (1, 'POST /api/admin/filtrar_actividades (busqueda)', lambda c: c.post(
+            '/api/admin/filtrar_actividades', filtro_dashboard(busqueda='bench'))),
+        (1, 'GET /admin/dashboard', lambda c: c.get('/admin/dashboard')),
+    ],
+    'foda': [
+        (2, 'POST /guardar_foda_ext', lambda c: c.post('/guardar_foda_ext', {
+            'actividad': 'Aspecto bench', 'tipo': 'Positivo', 'aspecto': random.choice(ASPECTOS_EXT)})),
+        (1, 'POST /guardar_matriz_foda', lambda c: c.post('/guardar_matriz_foda', lote_matriz(20, ASPECTOS_EXT))),
+        (1, 'POST /guardar_matriz_foda_int', lambda c: c.post('/guardar_matriz_foda_int', lote_matriz(20, ASPECTOS_INT))),
+        (1, 'GET /fodaext', lambda c: c.get('/fodaext')),
+        (1, 'GET /fodaint', lambda c: c.get('/fodaint')),
+    ],
+    'estrategias': [
+        (1, 'GET /estrategias', lambda c: c.get('/estrategias')),
+        (2, 'GET /api/estrategias/jerarquia', lambda c: c.get('/api/estrategias/jerarquia')),
+        (1, 'GET /api/estrategias/jerarquia?detalle=1', lambda c: c.get('/api/estrategias/jerarquia?detalle=1')),
+        (2, 'GET /api/estrategias_foda_con_eje', lambda c: c.get('/api/estrategias_foda_con_eje')),
+        (1, 'GET /cruzado', lambda c: c.get('/cruzado')),
+    ],
+    'red': [
+        (1, 'GET /red', lambda c: c.get('/red')),
+        (3, 'GET /api/red/gantt', lambda c: c.get('/api/red/gantt')),
+        (1, 'GET /api/red/gantt?estado=completada', lambda c: c.get('/api/red/gantt?estado=completada&responsables=0')),
+    ],
+    'exportar': [
+        (1, 'POST /api/admin/exportar_datos', lambda c: c.post(
+            '/api/admin/exportar_datos', {'comprimir': True}, {'Accept-Encoding': 'gzip'})),
+    ],
+}
+
+
+def mezcla(escenarios, semilla):
+    """Secuencia determinista de operaciones según los pesos de los escenarios"""
+    operaciones = []
+    for nombre in escenarios:
+        for peso, etiqueta, operacion in ESCENARIOS[nombre]:
+            operaciones += [(etiqueta, operacion)] * peso
+    random.Random(semilla).shuffle(operaciones)
+    return operaciones
+
+
+def sembrar(base, usuario, clave, aspectos, estrategias):
+    """Carga datos de partida a través de la propia API si la base está casi vacía"""
+    cliente = Cliente(base)
+    cliente.login(usuario, clave)
+
+    with cliente.opener.open(cliente.base + '/api/admin/estadisticas') as r:
+        estadisticas = json.loads(r.read())['estadisticas']
+    if estadisticas['total_actividades'] >= aspectos and estadisticas['estrategias_foda_cruzado'] >= estrategias:
+        print(f"🌱 Datos existentes: {estadisticas['total_actividades']} aspectos, "
+              f"{estadisticas['estrategias_foda_cruzado']} estrategias")
+        return
+
+    print(f"🌱 Sembrando {aspectos} aspectos y {estrategias} estrategias...")
+    for i in range(0, aspectos, 500):
+        cliente.post('/guardar_matriz_foda', lote_matriz(min(500, aspectos - i), ASPECTOS_EXT))
+        cliente.post('/guardar_matriz_foda_int', lote_matriz(min(500, aspectos - i) // 2, ASPECTOS_INT))
+
+    # Estrategias como producto cruzado interno x externo (como la página cruzado)
+    lado = max(1, int(estrategias ** 0.5))
+    for eje in EJES[:max(1, estrategias // (lado * lado))]:
+        cliente.post('/guardar_estrategias_foda_con_eje_lote', {
+            'tipo_cruce': 'FO', 'estrategia': f'Estrategia bench {eje}', 'eje_id': eje, 'eje_texto': eje.upper(),
+            'internos': [{'id': i + 1, 'tipo': 'fortaleza', 'texto': f'Fortaleza {i}'} for i in range(lado)],
+            'externos': [{'id': i + 1, 'tipo': 'oportunidad', 'texto': f'Oportunidad {i}'} for i in range(lado)],
+        })
+
+    with cliente.opener.open(cliente.base + '/api/estrategias_foda_con_eje') as r:
+        ids = [e['id'] for e in json.loads(r.read())['estrategias']][:estrategias]
+    for estrategia_id in ids[:100]:
+        for n in range(3):
+            status, cuerpo = cliente.post('/api/agregar_actividad', {
+                'estrategia_id': estrategia_id, 'nombre': f'Táctica {n}', 'responsable': f'Responsable {n}',
+                'fecha_inicio': '2026-01-01', 'fecha_fin': '2026-06-30'})
+        with cliente.opener.open(f'{cliente.base}/api/actividades_estrategia/{estrategia_id}') as r:
+            for actividad in json.loads(r.read()).get('actividades', []):
+                for estado in ('pendiente', 'en_progreso', 'completada'):
+                    cliente.post('/api/agregar_tarea', {
+                        'actividad_id': actividad['id'], 'nombre': f'Tarea {estado}',
+                        'responsable': 'Equipo', 'estado': estado})
+
+
+def comparar(actual, baseline, tolerancia):
+    """Imprime la comparación y devuelve la lista de rutas con regresión"""
+    regresiones = []
+    print(f"\n== Comparación con la baseline (tolerancia {tolerancia:.0%})")
+    print(f"{'ruta':<48}{'req/s':>9}{'base':>9}{'p95 ms':>9}{'base':>9}  estado")
+    for ruta, r in actual.items():
+        b = baseline.get(ruta)
+        if not b:
+            print(f"{ruta:<48}{r['req_s']:>9}{'-':>9}{r['p95_ms']:>9}{'-':>9}  nueva")
+            continue
+        peor_latencia = b['p95_ms'] > 0 and r['p95_ms'] > b['p95_ms'] * (1 + tolerancia)
+        peor_throughput = b['req_s'] > 0 and r['req_s'] < b['req_s'] * (1 - tolerancia)
+        estado = 'REGRESIÓN' if (peor_latencia or peor_throughput or r['errores'] > b['errores']) else 'ok'
+        if estado != 'ok':
+            regresiones.append(ruta)
+        print(f"{ruta:<48}{r['req_s']:>9}{b['req_s']:>9}{r['p95_ms']:>9}{b['p95_ms']:>9}  {estado}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escenarios', nargs='+', default=list(ESCENARIOS), choices=list(ESCENARIOS))
+    parser.add_argument('--url', help='usar un servidor ya arrancado en vez de lanzar gunicorn')
+    parser.add_argument('--database-url', default=DB_POR_DEFECTO)
+    parser.add_argument('--recrear', action='store_true', help='borrar la SQLite de bench antes de empezar')
+    parser.add_argument('--worker', default='gthread', help='GUNICORN_WORKER_CLASS')
+    parser.add_argument('--procesos', type=int, default=2)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--clientes', type=int, default=8)
+    parser.add_argument('--duracion', type=float, default=20, help='segundos de medición')
+    parser.add_argument('--usuario', default='ANDRES')
+    parser.add_argument('--clave', default='ANDRES')
+    parser.add_argument('--aspectos', type=int, default=5000, help='aspectos mínimos a sembrar')
+    parser.add_argument('--estrategias', type=int, default=200, help='estrategias mínimas a sembrar')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--baseline', default='local', help='baseline con la que comparar')
+    parser.add_argument('--guardar-baseline', metavar='NOMBRE', help='guardar el resultado como baseline')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='empeoramiento aceptado (0.25 = 25%%)')
+    parser.add_argument('--estricto', action='store_true', help='salir con código 1 si hay regresiones')
+    args = parser.parse_args()
+
+    operaciones = mezcla(args.escenarios, args.semilla)
+
+    def siguiente(n):
+        return operaciones[n % len(operaciones)]
+
+    proceso = None
+    if args.url:
+        base = args.url
+    else:
+        if args.recrear and args.database_url.startswith('sqlite:///'):
+            ruta_db = args.database_url[len('sqlite:///'):]
+            if os.path.exists(ruta_db):
+                os.remove(ruta_db)
+        entorno = entorno_bd(args.database_url)
+        print(f"🗄️  Base de datos: {args.database_url}")
+        inicializar_bd(entorno)
+        proceso, base = arrancar_gunicorn(args.worker, entorno, args.procesos, args.hilos)
+
+    try:
+        random.seed(args.semilla)
+        sembrar(base, args.usuario, args.clave, args.aspectos, args.estrategias)
+        # Calentamiento: cachés, conexiones del pool y plantillas compiladas
+        ejecutar_concurrente(base, args.clientes, min(3, args.duracion), args.usuario, args.clave, siguiente)
+        crudo, segundos = ejecutar_concurrente(base, args.clientes, args.duracion, args.usuario, args.clave, siguiente)
+    finally:
+        if proceso:
+            detener(proceso)
+
+    resumen = resumir(dict(sorted(crudo.items())), segundos)
+    imprimir(resumen, f"{', '.join(args.escenarios)} ({args.worker}, {args.clientes} clientes, {args.duracion:.0f}s)")
+
+    parametros = {
+        'escenarios': args.escenarios,
+        'worker': args.worker,
+        'procesos': args.procesos,
+        'hilos': args.hilos,
+        'clientes': args.clientes,
+        'duracion': args.duracion,
+        'database': args.database_url.split(':', 1)[0],
+    }
+
+    regresiones = []
+    ruta_baseline = os.path.join(DIR_BASELINES, f'{args.baseline}.json')
+    if os.path.exists(ruta_baseline) and not args.guardar_baseline:
+        with open(ruta_baseline) as f:
+            baseline = json.load(f)
+        if baseline['parametros'] != parametros:
+            print(f"\n⚠️  La baseline '{args.baseline}' se tomó con otros parámetros: {baseline['parametros']}")
+        regresiones = comparar(resumen, baseline['resultados'], args.tolerancia)
+    elif not args.guardar_baseline:
+        print(f"\nℹ️  No hay baseline '{args.baseline}'. Crear una con --guardar-baseline {args.baseline}")
+
+    if args.guardar_baseline:
+        os.makedirs(DIR_BASELINES, exist_ok=True)
+        destino = os.path.join(DIR_BASELINES, f'{args.guardar_baseline}.json')
+        with open(destino, 'w') as f:
+            json.dump({
+                'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+                'maquina': f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+                'parametros': parametros,
+                'resultados': resumen,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Baseline guardada en {os.path.relpath(destino, RAIZ)}")
+
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} rutas con regresión: {', '.join(regresiones)}")
+        if args.estricto:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Configuración de gunicorn para la app (gunicorn -c gunicorn.conf.py app:app)
+#
+# Modelos de worker soportados (GUNICORN_WORKER_CLASS):
+#   gthread (por defecto)  procesos con un pool de hilos. Cada hilo atiende una
+#                          petición y toma su propia sesión/conexión del pool de
+#                          SQLAlchemy. No requiere dependencias extra.
+#   gevent                 greenlets con monkey-patching. Requiere
+#                          "pip install gevent psycogreen" para que psycopg2
+#                          ceda el control mientras espera a PostgreSQL.
+#                          El hash de contraseñas del login (CPU) va a un
+#                          ThreadPool nativo de gevent con LOGIN_HASH_HILOS
+#                          hilos del sistema, no a greenlets.
+#   sync                   un proceso por petición (comportamiento anterior).
+#
+# Variables de entorno:
+#   PORT                         puerto (por defecto 3000)
+#   WEB_CONCURRENCY              procesos worker (por defecto 2)
+#   GUNICORN_THREADS             hilos por worker en gthread (por defecto 4)
+#   GUNICORN_WORKER_CONNECTIONS  greenlets por worker en gevent (por defecto 100)
+#   GUNICORN_TIMEOUT             segundos antes de reiniciar un worker colgado
+#   GUNICORN_MAX_REQUESTS        reciclar el worker cada N peticiones (0 = nunca)
+#
+# El pool de conexiones de app.py se dimensiona con WEB_CONCURRENCY y
+# GUNICORN_THREADS (ver DB_MAX_CONNECTIONS en app.py).
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '3000')}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG')  # '-' para stdout
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+# app.py dimensiona el pool de cada worker con estas variables
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+
+if worker_class == 'gevent':
+    try:
+        import gevent  # noqa: F401
+        import psycogreen  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(
+            "GUNICORN_WORKER_CLASS=gevent requiere los paquetes gevent y psycogreen"
+        ) from e
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 es una extensión en C: sin esto bloquea el hub de gevent
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        server.log.info("psycopg2 adaptado a gevent (psycogreen)")
+
+    if server.cfg.preload_app:
+        # Con --preload el engine se creó en el master: cada worker abre sus conexiones
+        from app import app, db
+        with app.app_context():
+            db.engine.dispose(close=False)
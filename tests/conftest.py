@@ -0,0 +1,70 @@
+"""Fixtures comunes: la app contra una SQLite temporal y un contador de sentencias SQL"""
+
+import contextlib
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app.py lee la configuración al importarse: la BD temporal debe fijarse antes
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pruebas.db')}"
+os.environ['INIT_DB_ON_STARTUP'] = 'False'
+os.environ.pop('CACHE_REDIS_URL', None)
+sys.path.insert(0, RAIZ)
+
+
+@pytest.fixture(scope='session')
+def app_modulo():
+    import app as app_modulo
+    app_modulo.ejecutar_inicializacion()
+    return app_modulo
+
+
+@pytest.fixture(scope='session')
+def generar_datos(app_modulo):
+    """Ejecuta el comando generar-datos (sin vaciar=True las filas se suman a las existentes)"""
+    runner = app_modulo.app.test_cli_runner()
+    
+    def generar(canva=0, foda_ext=0, foda_int=0, estrategias=0, actividades=0, tareas=0, semilla=42, vaciar=False):
+        opciones = {
+            '--canva': canva, '--foda-ext': foda_ext, '--foda-int': foda_int, '--estrategias': estrategias,
+            '--actividades': actividades, '--tareas': tareas, '--semilla': semilla,
+        }
+        argumentos = ['generar-datos', *(str(v) for par in opciones.items() for v in par)]
+        if vaciar:
+            argumentos.append('--vaciar')
+        resultado = runner.invoke(args=argumentos, input='y\n')
+        assert resultado.exit_code == 0, resultado.output
+    
+    return generar
+
+
+@pytest.fixture(scope='session')
+def cliente(app_modulo):
+    cliente = app_modulo.app.test_client()
+    respuesta = cliente.post('/login', data={'username': 'ANDRES', 'password': 'ANDRES'})
+    assert respuesta.status_code == 302
+    return cliente
+
+
+@pytest.fixture
+def contar_sentencias(app_modulo):
+    """Context manager que cuenta las sentencias enviadas a la BD (after_cursor_execute)"""
+    
+    @contextlib.contextmanager
+    def contar():
+        sentencias = []
+        
+        def registrar(conn, cursor, statement, *args):
+            sentencias.append(statement)
+        
+        app_modulo.event.listen(app_modulo.Engine, 'after_cursor_execute', registrar)
+        try:
+            yield sentencias
+        finally:
+            app_modulo.event.remove(app_modulo.Engine, 'after_cursor_execute', registrar)
+    
+    return contar
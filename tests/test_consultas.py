@@ -0,0 +1,59 @@
+"""Número de sentencias SQL acotado en las APIs de listado (sin N+1 al leer el creador)
+
+Cada endpoint se mide dos veces: con un registro de cada tipo (un solo creador)
+y tras multiplicar los registros, repartidos entre todos los usuarios. Con carga
+perezosa del creador la segunda medición haría un SELECT más por usuario
+distinto; el número de sentencias debe ser el mismo.
+"""
+
+import pytest
+
+ENDPOINTS = [
+    ('GET', '/api/aspectos', None),
+    ('GET', '/api/aspectos?fuente=foda_ext', None),
+    ('GET', '/api/estrategias_foda', None),
+    ('GET', '/api/estrategias_foda_con_eje', None),
+    ('GET', '/api/actividades', None),
+    ('GET', '/api/tareas', None),
+    ('GET', '/api/actividades_estrategia/{estrategia}', None),
+    ('GET', '/api/tareas_actividad/{actividad}', None),
+    ('GET', '/api/red/gantt?responsables=0&incluir_tareas=1', None),
+    ('POST', '/api/admin/filtrar_actividades', {'por_pagina': 500}),
+    ('POST', '/api/admin/exportar_datos', {}),
+]
+
+
+def ultimo_id(app_modulo, modelo):
+    with app_modulo.app.app_context():
+        return app_modulo.db.session.query(app_modulo.func.max(modelo.id)).scalar()
+
+
+def medir(app_modulo, cliente, contar_sentencias, metodo, ruta, cuerpo):
+    ruta = ruta.format(
+        estrategia=ultimo_id(app_modulo, app_modulo.EstrategiaFodaCruzado),
+        actividad=ultimo_id(app_modulo, app_modulo.ActividadEstrategia),
+    )
+    
+    def pedir():
+        respuesta = cliente.open(ruta, method=metodo, json=cuerpo)
+        assert respuesta.status_code == 200, respuesta.get_data(as_text=True)[:200]
+        return respuesta.get_data()
+    
+    # La primera petición calienta las cachés de proceso (autorización, vistas, conteos)
+    pedir()
+    app_modulo._conteos_cache.clear()
+    with contar_sentencias() as sentencias:
+        datos = pedir()
+    return len(sentencias), len(datos)
+
+
+@pytest.mark.parametrize('metodo,ruta,cuerpo', ENDPOINTS)
+def test_sentencias_no_crecen_con_las_filas(app_modulo, cliente, generar_datos, contar_sentencias, metodo, ruta, cuerpo):
+    generar_datos(canva=1, foda_ext=1, foda_int=1, estrategias=1, actividades=1, tareas=1, vaciar=True)
+    pocas, tamano_pocas = medir(app_modulo, cliente, contar_sentencias, metodo, ruta, cuerpo)
+    
+    generar_datos(canva=40, foda_ext=40, foda_int=40, estrategias=20, actividades=12, tareas=12, semilla=7)
+    muchas, tamano_muchas = medir(app_modulo, cliente, contar_sentencias, metodo, ruta, cuerpo)
+    
+    assert tamano_muchas > tamano_pocas, 'la segunda medición debe devolver más filas'
+    assert muchas == pocas, f'{metodo} {ruta}: {pocas} sentencias con pocas filas y {muchas} con muchas'
@@ -0,0 +1,90 @@
+"""Elementos de las estrategias FODA cruzado al borrar los aspectos que cruzan"""
+
+import pytest
+
+
+@pytest.fixture
+def aspectos(app_modulo, generar_datos):
+    generar_datos(vaciar=True)
+    m = app_modulo
+    with m.app.app_context():
+        nuevos = {
+            'f1': m.AspectoAmbiental(actividad='Fortaleza uno', tipo='Positivo', aspecto='FINANZAS', fuente='foda_int'),
+            'f2': m.AspectoAmbiental(actividad='Fortaleza dos', tipo='Positivo', aspecto='FINANZAS', fuente='foda_int'),
+            'o1': m.AspectoAmbiental(actividad='Oportunidad uno', tipo='Positivo', aspecto='SOCIAL', fuente='foda_ext'),
+        }
+        m.db.session.add_all(nuevos.values())
+        m.db.session.commit()
+        return {clave: a.id for clave, a in nuevos.items()}
+
+
+def estrategias(cliente):
+    datos = cliente.get('/api/estrategias_foda_con_eje').get_json()
+    assert datos['success'], datos
+    return datos['estrategias']
+
+
+def test_borrar_aspecto_conserva_el_elemento_en_la_estrategia(app_modulo, cliente, aspectos):
+    respuesta = cliente.post('/guardar_estrategias_foda_con_eje_lote', json={
+        'tipo_cruce': 'FO', 'estrategia': 'Estrategia de prueba', 'eje_id': 'educacion', 'eje_texto': 'EDUCACIÓN',
+        'internos': [{'id': aspectos['f1'], 'tipo': 'fortaleza', 'texto': 'Fortaleza uno'},
+                     {'id': aspectos['f2'], 'tipo': 'fortaleza', 'texto': 'Fortaleza dos'}],
+        'externos': [{'id': aspectos['o1'], 'tipo': 'oportunidad', 'texto': 'Oportunidad uno'}],
+    })
+    assert respuesta.get_json()['success'], respuesta.get_json()
+    
+    # El texto que se conserva es el vigente al borrar, no el del momento del cruce
+    with app_modulo.app.app_context():
+        app_modulo.db.session.get(app_modulo.AspectoAmbiental, aspectos['o1']).actividad = 'Oportunidad editada'
+        app_modulo.db.session.commit()
+    
+    assert cliente.post(f"/eliminar_foda_ext/{aspectos['o1']}").get_json()['success']
+    assert cliente.post(f"/aspectos/{aspectos['f2']}/eliminar").status_code == 302
+    
+    [estrategia] = estrategias(cliente)
+    assert estrategia['elementos_internos'] == [
+        {'id': aspectos['f1'], 'tipo': 'fortaleza', 'texto': 'Fortaleza uno'},
+        {'id': aspectos['f2'], 'tipo': 'fortaleza', 'texto': 'Fortaleza dos'},
+    ]
+    assert estrategia['elementos_externos'] == [
+        {'id': aspectos['o1'], 'tipo': 'oportunidad', 'texto': 'Oportunidad editada'},
+    ]
+
+
+def fila_anterior(interno, externo, estrategia='Estrategia heredada'):
+    """Fila con el formato por pareja de versiones anteriores (sin enlaces)"""
+    return {
+        'tipo_cruce': 'FO', 'estrategia': estrategia, 'eje_id': 'salud', 'eje_texto': 'SALUD',
+        'elemento_interno_id': interno[0], 'elemento_interno_tipo': 'fortaleza', 'elemento_interno_texto': interno[1],
+        'elemento_externo_id': externo[0], 'elemento_externo_tipo': 'oportunidad', 'elemento_externo_texto': externo[1],
+        'elementos_normalizados': False,
+    }
+
+
+def test_migracion_conserva_los_elementos_que_no_se_pueden_enlazar(app_modulo, cliente, aspectos):
+    m = app_modulo
+    borrado = aspectos['o1'] + 100  # aspecto que ya no existe
+    with m.app.app_context():
+        m.db.session.execute(m.EstrategiaFodaCruzado.__table__.insert(), [
+            # Estrategia "global" de cruzado: solo se guardaba el id del primer interno
+            fila_anterior((aspectos['f1'], 'Múltiples: Fortaleza uno; Fortaleza dos'), (aspectos['o1'], 'Oportunidad uno'),
+                          'Estrategia global'),
+            # Dos parejas de la misma estrategia, una con un aspecto ya borrado
+            fila_anterior((aspectos['f1'], 'Fortaleza uno'), (aspectos['o1'], 'Oportunidad uno')),
+            fila_anterior((aspectos['f2'], 'Fortaleza dos'), (borrado, 'Oportunidad borrada')),
+        ])
+        m.db.session.commit()
+        m.preparar_estrategias()
+    
+    por_texto = {e['estrategia']: e for e in estrategias(cliente)}
+    assert set(por_texto) == {'Estrategia global', 'Estrategia heredada'}
+    
+    global_ = por_texto['Estrategia global']
+    assert global_['elementos_internos'] == [
+        {'id': aspectos['f1'], 'tipo': 'fortaleza', 'texto': 'Múltiples: Fortaleza uno; Fortaleza dos'}
+    ]
+    assert global_['elementos_externos'] == [{'id': aspectos['o1'], 'tipo': 'oportunidad', 'texto': 'Oportunidad uno'}]
+    
+    heredada = por_texto['Estrategia heredada']
+    assert [e['texto'] for e in heredada['elementos_internos']] == ['Fortaleza uno', 'Fortaleza dos']
+    assert [e['texto'] for e in heredada['elementos_externos']] == ['Oportunidad uno', 'Oportunidad borrada']
@@ -0,0 +1,61 @@
+"""Los filtros frecuentes usan los índices declarados (EXPLAIN QUERY PLAN en SQLite)
+
+Solo se comprueba el planificador de SQLite. Los planes de PostgreSQL de estas
+mismas consultas no están cubiertos: allí la elección depende de las
+estadísticas (ANALYZE) y del volumen de cada tabla.
+"""
+
+import pytest
+
+
+def consultas(m):
+    aspectos = m.AspectoAmbiental
+    return {
+        # Listados por fuente, más recientes primero (/api/aspectos?fuente=..., historiales)
+        'ix_aspectos_fuente_created_at': m.AspectoAmbiental.query.filter_by(fuente='canva').order_by(
+            aspectos.created_at.desc()
+        ),
+        # Matriz de /fodaext y /fodaint: por bloque y luego por fecha
+        'ix_aspectos_fuente_aspecto_created_desc': m.AspectoAmbiental.query.filter_by(fuente='foda_ext').order_by(
+            aspectos.aspecto, aspectos.created_at.desc()
+        ),
+        # Filtro fuente x tipo del dashboard de administración
+        'ix_aspectos_fuente_tipo': m.db.session.query(m.func.count(aspectos.id)).filter(
+            aspectos.fuente == 'foda_int', aspectos.tipo == 'Positivo'
+        ),
+        # Lista reciente sin filtro y orden por defecto del dashboard
+        'ix_aspectos_created_at': m.AspectoAmbiental.query.order_by(aspectos.created_at.desc()).limit(20),
+        # Claves foráneas: actividades de una estrategia y tareas de una actividad
+        'ix_actividades_estrategia_estrategia_id': m.ActividadEstrategia.query.filter_by(estrategia_id=1),
+        'ix_tareas_actividad_actividad_id': m.TareaActividad.query.filter_by(actividad_id=1),
+        # Estrategias de un eje por tipo de cruce (/estrategias, /red)
+        'ix_estrategias_eje_tipo_cruce': m.EstrategiaFodaCruzado.query.filter_by(eje_id='educacion', tipo_cruce='FO'),
+        # Estrategias que enlazan un aspecto
+        'ix_estrategia_elementos_aspecto': m.EstrategiaElemento.query.filter_by(aspecto_id=1),
+    }
+
+
+def plan(app_modulo, indice):
+    with app_modulo.app.app_context():
+        sql = consultas(app_modulo)[indice].statement.compile(
+            dialect=app_modulo.db.engine.dialect, compile_kwargs={'literal_binds': True}
+        )
+        filas = app_modulo.db.session.execute(app_modulo.text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        return '\n'.join(fila[-1] for fila in filas)
+
+
+@pytest.mark.parametrize('indice', [
+    'ix_aspectos_fuente_created_at',
+    'ix_aspectos_fuente_aspecto_created_desc',
+    'ix_aspectos_fuente_tipo',
+    'ix_aspectos_created_at',
+    'ix_actividades_estrategia_estrategia_id',
+    'ix_tareas_actividad_actividad_id',
+    'ix_estrategias_eje_tipo_cruce',
+    'ix_estrategia_elementos_aspecto',
+])
+def test_filtro_usa_indice(app_modulo, indice):
+    detalle = plan(app_modulo, indice)
+    assert indice in detalle, detalle
+    # El orden lo da el índice: sin ordenación aparte en memoria
+    assert 'USE TEMP B-TREE' not in detalle, detalle
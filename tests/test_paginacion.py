@@ -0,0 +1,39 @@
+"""Paginación por cursor del filtro de actividades del admin con valores NULL en la columna de orden"""
+
+import pytest
+
+
+@pytest.fixture
+def aspectos_con_fechas_nulas(app_modulo, generar_datos):
+    generar_datos(canva=30, foda_ext=0, foda_int=0, vaciar=True)
+    with app_modulo.app.app_context():
+        tabla = app_modulo.AspectoAmbiental.__table__
+        ids = [i for (i,) in app_modulo.db.session.execute(app_modulo.select(tabla.c.id).order_by(tabla.c.id))]
+        # Registros antiguos sin fecha de creación, repartidos por la tabla
+        app_modulo.db.session.execute(tabla.update().where(tabla.c.id.in_(ids[::4])).values(created_at=None))
+        app_modulo.db.session.commit()
+    return ids
+
+
+def recorrer(cliente, orden_por, por_pagina):
+    vistos = []
+    cursor = None
+    for _ in range(100):
+        respuesta = cliente.post('/api/admin/filtrar_actividades', json={
+            'paginacion': 'cursor', 'orden_por': orden_por, 'por_pagina': por_pagina,
+            'total': 'no', 'cursor': cursor,
+        })
+        datos = respuesta.get_json()
+        assert datos['success'], datos
+        vistos += [a['id'] for a in datos['actividades']]
+        cursor = datos['siguiente_cursor']
+        if not cursor:
+            return vistos
+    pytest.fail('la paginación no termina')
+
+
+@pytest.mark.parametrize('orden_por', ['fecha_desc', 'fecha_asc', 'actividad_asc'])
+@pytest.mark.parametrize('por_pagina', [1, 4, 7])
+def test_cursor_recorre_todas_las_filas_una_vez(cliente, aspectos_con_fechas_nulas, orden_por, por_pagina):
+    vistos = recorrer(cliente, orden_por, por_pagina)
+    assert sorted(vistos) == aspectos_con_fechas_nulas
@@ -0,0 +1,22 @@
+"""Modelo de vista del Gantt de la página red (/api/red/gantt)"""
+
+
+def test_incluir_tareas_devuelve_solo_las_de_las_actividades_filtradas(app_modulo, cliente, generar_datos):
+    generar_datos(foda_ext=20, foda_int=20, estrategias=10, actividades=3, tareas=4, vaciar=True)
+    
+    todas = cliente.get('/api/red/gantt?responsables=0&incluir_tareas=1').get_json()
+    assert todas['success'], todas
+    assert len(todas['tareas']) == todas['resumen']['total_tareas'] == 120
+    
+    completadas = cliente.get('/api/red/gantt?responsables=0&incluir_tareas=1&estado=completada').get_json()
+    ids = {a['id'] for a in completadas['actividades']}
+    assert 0 < len(ids) < len(todas['actividades'])
+    assert {t['actividad_id'] for t in completadas['tareas']} == ids
+    assert len(completadas['tareas']) == completadas['resumen']['total_tareas']
+    
+    # Con ventana de filas, solo las tareas de esa ventana
+    pagina = cliente.get('/api/red/gantt?responsables=0&incluir_tareas=1&inicio=5&limite=4').get_json()
+    assert {t['actividad_id'] for t in pagina['tareas']} == {a['id'] for a in pagina['actividades']}
+    
+    sin_tareas = cliente.get('/api/red/gantt?responsables=0').get_json()
+    assert 'tareas' not in sin_tareas